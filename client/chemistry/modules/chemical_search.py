@@ -3,31 +3,231 @@ Chemical Search Engine Module
 SciFinder Lite style compound search tool
 
 Features:
-- PubChem API integration (PubChemPy)
-- Search by compound name
+- PubChem PUG-REST integration over the shared, rate-limited HTTP client
+- Local compound store: repeat lookups, popular chemicals and offline mode need no network
+- One round trip per search (properties, synonyms and depiction fetched concurrently);
+  SDF/JSON records are only downloaded when their button is clicked
+- Search by compound name or CAS number, with as-you-type suggestions from a local name index;
+  PubChem is only asked about names the index cannot place
+- Batch lookup of a pasted list or CSV column of names / CAS numbers, streamed into a table
+  and exported as CSV or SDF
 - Basic property info (Mol. Weight, Formula, IUPAC Name)
 - 2D structure image display
 - Isomer and synonym check
 """
 
 import streamlit as st
-import pubchempy as pcp
-import requests
-from PIL import Image
+import pandas as pd
+import time
 from io import BytesIO
+from . import pubchem
+from .http_client import get_client
+from .compound_store import get_compound_store, OfflineMiss
+from .name_index import get_name_index, cas_check_digit_ok
+from .typeahead import typeahead
+
+try:
+    from rdkit import Chem
+    from rdkit.Chem import Draw
+except ImportError:
+    Chem = None
+
+SEARCH_MODES = ["🔍 Single Compound", "📋 Batch Lookup"]
+
+BATCH_SOURCE_LABELS = {
+    "cache": "📦 Stored",
+    "network": "🌐 PubChem",
+    "stale": "⚠️ Stored (expired)",
+    "miss": "❌ Not found",
+    "offline": "📴 Not stored",
+    "error": "❌ Network error",
+}
+
+# Seconds between table redraws while a batch is streaming in
+BATCH_REDRAW_SECONDS = 0.5
+
+POPULAR_CHEMICALS = ["Acetaminophen", "Ibuprofen", "Benzene", "Ethanol", "Glucose", "ATP"]
+
+STORE_SOURCE_LABELS = {
+    "cache": "📦 Served from the local compound store",
+    "network": "🌐 Fetched from PubChem and saved to the local compound store",
+    "stale": "⚠️ PubChem unreachable or offline - showing the stored copy",
+}
+
+
+def _local_depiction(smiles):
+    """2D depiction drawn with RDKit, for when PubChem's is not stored and cannot be fetched"""
+    if Chem is None or not smiles:
+        return None
+    mol = Chem.MolFromSmiles(smiles)
+    if mol is None:
+        return None
+    buffer = BytesIO()
+    Draw.MolToImage(mol, size=(400, 400)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _suggestions(index, text):
+    rows = []
+    for row in index.suggest(text):
+        detail = " · ".join(part for part in (
+            f"CID {row['cid']}" if row["cid"] else None,
+            row["cas"],
+            "similar" if row["match"] == "fuzzy" else None,
+        ) if part)
+        rows.append({"label": row["name"], "value": row["name"], "detail": detail})
+    return rows
+
+
+def _open(name):
+    """Show name as the result and put it in the search box"""
+    st.session_state["chem_result"] = name
+    st.session_state["chem_prefill"] = {"text": name, "nonce": time.time()}
+
+
+def _batch_row(query, cid, props, synonyms, source):
+    return {
+        "Query": query,
+        "CID": cid,
+        "Name": synonyms[0] if synonyms else None,
+        "CAS": next((name for name in synonyms if cas_check_digit_ok(name)), None),
+        "Formula": props.get("MolecularFormula"),
+        "Molecular Weight": props.get("MolecularWeight"),
+        "SMILES": props.get("SMILES"),
+        "Status": BATCH_SOURCE_LABELS[source],
+    }
+
+
+def _batch_frame(rows):
+    frame = pd.DataFrame(rows)
+    frame["CID"] = frame["CID"].astype("Int64")
+    return frame
+
+
+def _batch_lookup(store):
+    """Resolve a whole reagent list; results stream into the table as PubChem answers"""
+    pasted = st.text_area(
+        "Names or CAS numbers, one per line", height=180, placeholder="Aspirin\n58-08-2\nSodium chloride",
+        key="chem_batch_text"
+    )
+    queries = pasted.splitlines()
+    upload = st.file_uploader("...or a CSV file", type=["csv"], key="chem_batch_csv")
+    if upload is not None:
+        try:
+            frame = pd.read_csv(upload, dtype=str)
+            column = st.selectbox("Column with names / CAS numbers", list(frame.columns))
+            queries += frame[column].dropna().tolist()
+        except Exception as e:
+            st.error(f"❌ Could not read CSV: {e}")
+    queries = list(dict.fromkeys(query.strip() for query in queries if query.strip()))
+
+    offline = st.checkbox(
+        "📴 Offline mode", value=store.offline, key="chem_batch_offline",
+        help="Answer from the local compound store only (expired entries included)"
+    )
+    run = st.button(f"Resolve {len(queries)} Entries 🚀", disabled=not queries)
+    table = st.empty()
+
+    if run:
+        order = {query: i for i, query in enumerate(queries)}
+        rows = []
+        progress = st.progress(0.0, text="Resolving...")
+        redrawn = time.monotonic()
+        try:
+            for result in store.lookup_many(queries, offline):
+                rows.append(_batch_row(*result))
+                if time.monotonic() - redrawn > BATCH_REDRAW_SECONDS:
+                    table.dataframe(_batch_frame(rows), use_container_width=True, hide_index=True)
+                    progress.progress(len(rows) / len(queries), text=f"Resolved {len(rows)} / {len(queries)}")
+                    redrawn = time.monotonic()
+        except Exception as e:
+            st.error(f"❌ Error occurred during batch lookup: {e}")
+        progress.empty()
+        rows.sort(key=lambda row: order[row["Query"]])
+        st.session_state["chem_batch"] = {"rows": rows, "offline": offline}
+
+    batch = st.session_state.get("chem_batch")
+    if not batch or not batch["rows"]:
+        return
+    results = _batch_frame(batch["rows"])
+    table.dataframe(results, use_container_width=True, hide_index=True)
+    found = results["CID"].notna().sum()
+    st.caption(f"✅ {found} of {len(results)} entries resolved")
+
+    cids = [int(cid) for cid in results["CID"].dropna().unique()]
+    col_d1, col_d2 = st.columns(2)
+    with col_d1:
+        st.download_button("📥 Download Results (CSV)", results.to_csv(index=False), "batch_lookup.csv", "text/csv")
+    with col_d2:
+        # Records are fetched (many per request, through the store) only when the button is clicked
+        st.download_button(
+            "📥 Download Structures (SDF)",
+            data=lambda: store.sdf_file(cids, batch["offline"]),
+            file_name="batch_lookup.sdf",
+            mime="chemical/x-mdl-sdfile",
+            on_click="ignore",
+            disabled=not cids,
+        )
+
+
+def _store_footer(store):
+    store_stats = store.stats()
+    st.caption(
+        f"📦 Compound store: {store_stats['compounds']} compounds, {store_stats['names']} names, "
+        f"{store_stats['bytes'] / 1e6:.1f} / {store_stats['max_bytes'] / 1e6:.0f} MB"
+    )
+
+    # Shared HTTP client metrics (all sessions of this process)
+    http_stats = get_client().stats()
+    if http_stats:
+        with st.expander("📡 Network Statistics"):
+            st.dataframe(pd.DataFrame.from_dict(http_stats, orient="index"), use_container_width=True)
+            transport = get_client().transport
+            if transport is not None:
+                replay = transport.stats()
+                st.caption(
+                    f"🎞️ Replay transport ({replay['mode']}): {replay['hits']} replayed, {replay['misses']} not recorded, "
+                    f"{replay['recorded']} recorded, {replay['injected_faults']} injected faults"
+                )
+
+
+def _record_button(store, cid, kind, label, offline):
+    """Download button whose record is fetched (through the store) only when it is clicked"""
+    if offline and not store.has_blob(cid, kind):
+        st.caption(f"{label}: not stored (offline mode)")
+        return
+    st.download_button(
+        label,
+        data=lambda: store.blob(cid, kind, offline) or b"",
+        file_name=f"{cid}.{kind}",
+        on_click="ignore",
+        key=f"chem_download_{kind}"
+    )
 
 def show():
     st.title("🔍 Chemical Search Engine")
     st.markdown("### PubChem-based Chemical Search")
+    store = get_compound_store()
+
+    mode = st.radio("Mode", SEARCH_MODES, horizontal=True, key="chem_mode")
+    if mode == SEARCH_MODES[1]:
+        _batch_lookup(store)
+        st.markdown("---")
+        _store_footer(store)
+        return
     
     # Search bar
     col1, col2 = st.columns([4, 1])
     
+    index = get_name_index()
     with col1:
-        search_query = st.text_input(
+        search_query, submitted = typeahead(
             "Enter Chemical Name or CAS Number",
+            lambda text: _suggestions(index, text),
             placeholder="Ex: Aspirin, Caffeine, 50-78-2",
-            help="Searching by English name is most accurate."
+            hint="Searching by English name is most accurate.",
+            value=st.session_state.get("chem_prefill"),
+            key="chem_query"
         )
     
     with col2:
@@ -35,44 +235,71 @@ def show():
         st.write("")
         search_btn = st.button("Search 🚀", use_container_width=True)
 
-    if search_btn and search_query:
-        with st.spinner(f"Searching for '{search_query}'..."):
+    offline = st.checkbox(
+        "📴 Offline mode", value=store.offline,
+        help="Answer from the local compound store only (expired entries included)"
+    )
+
+    # Names the index or the store can place (and valid CAS numbers) are searched directly;
+    # anything else first offers the closest known names, so a typo costs no PubChem round trip
+    if (search_btn or submitted) and search_query.strip():
+        if (index.exact(search_query) or store.knows(search_query) or cas_check_digit_ok(search_query)
+                or not index.suggest(search_query)):
+            st.session_state["chem_result"] = search_query
+        else:
+            st.session_state.pop("chem_result", None)
+            st.info(f"🤔 '{search_query}' is not a known name. Did you mean:")
+            matches = index.suggest(search_query)
+            cols_match = st.columns(len(matches) + 1)
+            for i, row in enumerate(matches):
+                cols_match[i].button(row["name"], key=f"chem_match_{i}", on_click=_open, args=(row["name"],))
+            cols_match[-1].button(
+                "Search PubChem anyway", key="chem_match_remote", on_click=_open, args=(search_query,), disabled=offline
+            )
+
+    # The shown result survives reruns (download clicks, other widgets); the store answers those locally
+    result_query = st.session_state.get("chem_result")
+
+    if result_query:
+        with st.spinner(f"Searching for '{result_query}'..."):
             try:
-                # PubChem search
-                compounds = pcp.get_compounds(search_query, 'name')
+                # Local compound store first, PubChem on a miss
+                result = store.lookup(result_query, offline)
                 
-                if not compounds:
+                if result is None:
                     st.warning("❌ No results found. Check spelling or try IUPAC name.")
+                    st.session_state.pop("chem_result", None)
                 else:
-                    # Use the first result (most accurate)
-                    compound = compounds[0]
-                    cid = compound.cid
+                    # First result (most accurate)
+                    cid, props, synonyms, image, source = result
                     
                     st.success(f"✅ Search successful! (CID: {cid})")
+                    st.caption(STORE_SOURCE_LABELS[source])
                     
                     # Layout split
                     info_col, img_col = st.columns([2, 1])
                     
                     with img_col:
                         # Get PubChem image
-                        img_url = f"https://pubchem.ncbi.nlm.nih.gov/image/imagefly.cgi?cid={cid}&width=400&height=400"
-                        st.image(img_url, caption="2D Structure", use_column_width=True)
+                        image = image or _local_depiction(props.get("SMILES"))
+                        if image:
+                            st.image(image, caption="2D Structure", use_column_width=True)
                         
                         # 3D Viewer Link
-                        st.markdown(f"[🧬 View 3D Structure (PubChem)](https://pubchem.ncbi.nlm.nih.gov/compound/{cid}#section=3D-Conformer)")
+                        st.markdown(f"[🧬 View 3D Structure (PubChem)]({pubchem.COMPOUND_URL.format(cid=cid)}#section=3D-Conformer)")
                     
                     with info_col:
-                        st.markdown(f"### **{compound.synonyms[0] if compound.synonyms else search_query}**")
+                        st.markdown(f"### **{synonyms[0] if synonyms else result_query}**")
                         
                         # Basic property table
                         properties = {
-                            "Formula": compound.molecular_formula,
-                            "Molecular Weight": f"{compound.molecular_weight} g/mol",
-                            "IUPAC Name": compound.iupac_name,
-                            "SMILES (Isomeric)": compound.isomeric_smiles,
-                            "LogP (XLogP)": compound.xlogp,
-                            "TPSA": f"{compound.tpsa} Å²",
-                            "Charge": compound.charge
+                            "Formula": props.get("MolecularFormula"),
+                            "Molecular Weight": f"{props.get('MolecularWeight')} g/mol",
+                            "IUPAC Name": props.get("IUPACName"),
+                            "SMILES (Isomeric)": props.get("SMILES"),
+                            "LogP (XLogP)": props.get("XLogP"),
+                            "TPSA": f"{props.get('TPSA')} Å²",
+                            "Charge": props.get("Charge")
                         }
                         
                         for key, value in properties.items():
@@ -83,36 +310,31 @@ def show():
                     tab1, tab1_2 = st.tabs(["Synonyms", "Download"])
                     
                     with tab1:
-                        if compound.synonyms:
-                            st.write(", ".join(compound.synonyms[:10]) + " ...")
+                        if synonyms:
+                            st.write(", ".join(synonyms[:10]) + " ...")
                         else:
                             st.info("No synonym information available")
                             
                     with tab1_2:
                         col_d1, col_d2 = st.columns(2)
                         with col_d1:
-                            st.download_button(
-                                "📥 Download SDF File", 
-                                data=requests.get(f"https://pubchem.ncbi.nlm.nih.gov/rest/pug/compound/cid/{cid}/SDF").content,
-                                file_name=f"{cid}.sdf"
-                            )
+                            _record_button(store, cid, "sdf", "📥 Download SDF File", offline)
                         with col_d2:
-                            st.download_button(
-                                "📥 Download JSON Data",
-                                data=requests.get(f"https://pubchem.ncbi.nlm.nih.gov/rest/pug/compound/cid/{cid}/JSON").content,
-                                file_name=f"{cid}.json"
-                            )
+                            _record_button(store, cid, "json", "📥 Download JSON Data", offline)
 
+            except OfflineMiss as e:
+                st.warning(f"📴 {e}")
+                st.session_state.pop("chem_result", None)
             except Exception as e:
                 st.error(f"❌ Error occurred during search: {e}")
+                st.session_state.pop("chem_result", None)
 
     # Popular Searches
     st.markdown("---")
     st.markdown("#### 🔥 Popular Chemicals")
-    popular_chemicals = ["Acetaminophen", "Ibuprofen", "Benzene", "Ethanol", "Glucose", "ATP"]
-    
-    cols_popular = st.columns(len(popular_chemicals))
-    for i, chem in enumerate(popular_chemicals):
-        if cols_popular[i].button(chem):
-            # Message only due to Streamlit structure
-            st.info(f"Enter '{chem}' in the search bar and click Search!")
+    # Pre-seeded in the compound store, so these answer without a network round trip
+    cols_popular = st.columns(len(POPULAR_CHEMICALS))
+    for i, chem in enumerate(POPULAR_CHEMICALS):
+        cols_popular[i].button(chem, on_click=_open, args=(chem,))
+
+    _store_footer(store)
@@ -0,0 +1,547 @@
+"""
+Compound Store Module
+Local SQLite cache of PubChem compounds for the chemical search
+
+Features:
+- Compounds indexed by CID, name, synonym and CAS number
+- Properties and synonyms kept for PROPERTY_TTL, depictions and SDF/JSON records for BLOB_TTL
+- Names PubChem does not know are remembered for MISS_TTL (no repeated failing lookups)
+- Size-bounded LRU eviction (bundled compounds are pinned)
+- Offline mode: answers from the store only, expired entries included
+- Pre-seeded with the classroom "Popular Chemicals" (compound_bundle/popular.json)
+- Result-page data (properties, synonyms, depiction) fetched concurrently; records only on demand
+- Batch lookups: names resolved concurrently, properties/synonyms/SDF fetched many CIDs per request
+"""
+
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+
+import requests
+
+from . import pubchem
+
+COMPOUND_DIR = os.environ.get("CHEMLAB_COMPOUND_DIR", os.path.join(os.path.expanduser("~"), ".chemlab", "compounds"))
+BUNDLE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "compound_bundle", "popular.json"
+)
+BUNDLE_FORMAT = "chemlab-compounds/1"
+
+PROPERTY_TTL = 30 * 24 * 3600
+BLOB_TTL = 30 * 24 * 3600
+MISS_TTL = 24 * 3600
+MAX_STORE_BYTES = 256 * 1024 * 1024
+
+# Synonyms indexed per compound (PubChem lists hundreds for common compounds, best first)
+MAX_INDEXED_SYNONYMS = 200
+
+# Concurrent PubChem requests of one lookup (the HTTP client's rate limit still applies)
+FETCH_WORKERS = 8
+
+# CIDs whose properties a batch lookup fetches together; smaller than PubChem's limit so results stream
+BATCH_CIDS = 25
+
+# Rows bound per SQL statement (SQLite's host parameter limit)
+SQL_CHUNK = 500
+
+CAS_PATTERN = re.compile(r"^\d{2,7}-\d{2}-\d$")
+
+# Blob kinds and how to fetch them
+BLOB_FETCHERS = {
+    "png": lambda cid: pubchem.depiction(cid),
+    "sdf": lambda cid: pubchem.record(cid, "SDF"),
+    "json": lambda cid: pubchem.record(cid, "JSON"),
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS compounds (
+    cid INTEGER PRIMARY KEY,
+    properties TEXT NOT NULL,
+    synonyms TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    fetched_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    pinned INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS names (
+    name_key TEXT NOT NULL,
+    cid INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    rank INTEGER NOT NULL,
+    PRIMARY KEY (name_key, cid)
+);
+CREATE INDEX IF NOT EXISTS names_cid ON names (cid);
+CREATE TABLE IF NOT EXISTS blobs (
+    cid INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    data BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    fetched_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (cid, kind)
+);
+CREATE INDEX IF NOT EXISTS blobs_lru ON blobs (accessed_at);
+CREATE TABLE IF NOT EXISTS misses (
+    name_key TEXT PRIMARY KEY,
+    checked_at REAL NOT NULL
+);
+"""
+
+
+class OfflineMiss(LookupError):
+    """Raised in offline mode for data the store does not hold"""
+
+
+_fetch_pool = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="pubchem")
+
+
+def _quietly(future):
+    """Result of an optional fetch, None if it failed"""
+    try:
+        return future.result()
+    except Exception:
+        return None
+
+
+def name_key(name):
+    """Lookup key of a name or CAS number: case, surrounding space and inner runs of space ignored"""
+    return " ".join((name or "").lower().split())
+
+
+def is_cas(text):
+    return bool(CAS_PATTERN.match((text or "").strip()))
+
+
+class CompoundStore:
+    """Compound cache shared by every session of the app process"""
+
+    def __init__(self, root=COMPOUND_DIR, bundle_path=BUNDLE_PATH, max_bytes=MAX_STORE_BYTES, offline=None):
+        self.root = root
+        self.bundle_path = bundle_path
+        self.max_bytes = max_bytes
+        self.offline = os.environ.get("CHEMLAB_OFFLINE") == "1" if offline is None else offline
+        os.makedirs(root, exist_ok=True)
+        self._path = os.path.join(root, "compounds.sqlite")
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self._listeners = []
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(_SCHEMA)
+        self._seed()
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self._path, timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def _key_lock(self, key):
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _seed(self):
+        """Load the bundled compounds once (pinned; refreshed from PubChem after PROPERTY_TTL when online)"""
+        if not os.path.exists(self.bundle_path):
+            return
+        with open(self.bundle_path, encoding="utf-8") as f:
+            bundle = json.load(f)
+        if bundle.get("format") != BUNDLE_FORMAT:
+            return
+        with self._connect() as db:
+            have = {row[0] for row in db.execute("SELECT cid FROM compounds WHERE pinned = 1")}
+        for item in bundle["compounds"]:
+            cid = item["properties"]["CID"]
+            if cid not in have:
+                self.put(cid, item["properties"], item["synonyms"], pinned=True, names=[item["query"]])
+
+    def put(self, cid, properties, synonyms, pinned=False, names=()):
+        """Record a compound and index its names, synonyms and CAS numbers"""
+        properties_json = json.dumps(properties)
+        synonyms_json = json.dumps(synonyms)
+        now = time.time()
+        entries = {}
+        for rank, name in enumerate([properties.get("IUPACName")] + list(synonyms[:MAX_INDEXED_SYNONYMS]) + list(names)):
+            key = name_key(name)
+            if key and key not in entries:
+                entries[key] = ("cas" if is_cas(name) else "iupac" if rank == 0 else "synonym", rank)
+        with self._connect() as db:
+            row = db.execute("SELECT pinned FROM compounds WHERE cid = ?", (cid,)).fetchone()
+            pinned = pinned or bool(row and row[0])
+            db.execute(
+                "INSERT OR REPLACE INTO compounds VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (cid, properties_json, synonyms_json, len(properties_json) + len(synonyms_json), now, now, int(pinned))
+            )
+            # Names users searched by ("query") survive a refresh of the synonym list
+            db.execute("DELETE FROM names WHERE cid = ? AND kind != 'query'", (cid,))
+            db.executemany(
+                "INSERT OR REPLACE INTO names VALUES (?, ?, ?, ?)",
+                [(key, cid, kind, rank) for key, (kind, rank) in entries.items()]
+            )
+            db.executemany("DELETE FROM misses WHERE name_key = ?", [(key,) for key in entries])
+        self.evict()
+        for listener in list(self._listeners):
+            try:
+                listener(cid, properties, synonyms)
+            except Exception:
+                # A failing listener must not lose a compound that is already stored
+                pass
+
+    def subscribe(self, listener):
+        """Call listener(cid, properties, synonyms) whenever a compound is recorded"""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def all_compounds(self):
+        """(cid, properties, synonyms) of every stored compound"""
+        with self._connect() as db:
+            rows = db.execute("SELECT cid, properties, synonyms FROM compounds").fetchall()
+        for cid, properties, synonyms in rows:
+            yield cid, json.loads(properties), json.loads(synonyms)
+
+    def knows(self, query):
+        """True if the store can answer query without asking PubChem (stored name or remembered miss)"""
+        key = name_key(query)
+        with self._connect() as db:
+            return bool(
+                db.execute("SELECT 1 FROM names WHERE name_key = ? LIMIT 1", (key,)).fetchone()
+                or db.execute("SELECT 1 FROM misses WHERE name_key = ?", (key,)).fetchone()
+            )
+
+    def _offline(self, offline):
+        return self.offline if offline is None else offline
+
+    def resolve(self, query, offline=None):
+        """
+        CIDs for a name, synonym or CAS number, best match first, and where they came from:
+        "cache", "network" or "miss" (known unknown). Offline, a name the store lacks raises OfflineMiss.
+        """
+        key = name_key(query)
+        if not key:
+            return [], "miss"
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT cid FROM names WHERE name_key = ? ORDER BY rank, cid", (key,)
+            ).fetchall()
+            miss = db.execute("SELECT checked_at FROM misses WHERE name_key = ?", (key,)).fetchone()
+        if rows:
+            return [row[0] for row in rows], "cache"
+        if miss and (self._offline(offline) or time.time() - miss[0] < MISS_TTL):
+            return [], "miss"
+        if self._offline(offline):
+            raise OfflineMiss(f"'{query}' is not in the local compound store (offline mode)")
+
+        with self._key_lock(("name", key)):
+            cids = pubchem.find_cids(query)
+            with self._connect() as db:
+                if cids:
+                    # The query itself becomes a name of the best match, even before its synonyms arrive
+                    db.execute("INSERT OR IGNORE INTO names VALUES (?, ?, 'query', ?)", (key, cids[0], -1))
+                else:
+                    db.execute("INSERT OR REPLACE INTO misses VALUES (?, ?)", (key, time.time()))
+        return cids, "network" if cids else "miss"
+
+    def compound(self, cid, offline=None):
+        """
+        (properties, synonyms, source) of one CID; source is "cache", "network" or "stale"
+        (expired, served because PubChem is unreachable or offline mode is on)
+        """
+        with self._key_lock(("cid", cid)):
+            with self._connect() as db:
+                row = db.execute("SELECT properties, synonyms, fetched_at FROM compounds WHERE cid = ?", (cid,)).fetchone()
+                if row:
+                    db.execute("UPDATE compounds SET accessed_at = ? WHERE cid = ?", (time.time(), cid))
+            if row and time.time() - row[2] < PROPERTY_TTL:
+                return json.loads(row[0]), json.loads(row[1]), "cache"
+            if self._offline(offline):
+                if row:
+                    return json.loads(row[0]), json.loads(row[1]), "stale"
+                raise OfflineMiss(f"CID {cid} is not in the local compound store (offline mode)")
+            try:
+                synonyms = _fetch_pool.submit(pubchem.synonyms, cid)
+                properties = pubchem.properties(cid)
+                synonyms = synonyms.result()
+            except requests.RequestException:
+                if row:
+                    return json.loads(row[0]), json.loads(row[1]), "stale"
+                raise
+            if not properties:
+                raise LookupError(f"PubChem has no compound with CID {cid}")
+            self.put(cid, properties, synonyms)
+            return properties, synonyms, "network"
+
+    def blob(self, cid, kind, offline=None):
+        """Depiction ("png") or full record ("sdf", "json") bytes, or None if PubChem has none"""
+        with self._key_lock(("blob", cid, kind)):
+            with self._connect() as db:
+                row = db.execute("SELECT data, fetched_at FROM blobs WHERE cid = ? AND kind = ?", (cid, kind)).fetchone()
+                if row:
+                    db.execute("UPDATE blobs SET accessed_at = ? WHERE cid = ? AND kind = ?", (time.time(), cid, kind))
+            if row and (self._offline(offline) or time.time() - row[1] < BLOB_TTL):
+                return bytes(row[0])
+            if self._offline(offline):
+                raise OfflineMiss(f"No stored {kind.upper()} for CID {cid} (offline mode)")
+            try:
+                data = BLOB_FETCHERS[kind](cid)
+            except requests.RequestException:
+                if row:
+                    return bytes(row[0])
+                raise
+            if data is not None:
+                self._put_blob(cid, kind, data)
+            return data
+
+    def _put_blob(self, cid, kind, data):
+        now = time.time()
+        with self._connect() as db:
+            db.execute("INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?)", (cid, kind, data, len(data), now, now))
+        self.evict()
+
+    def has_blob(self, cid, kind):
+        with self._connect() as db:
+            return db.execute("SELECT 1 FROM blobs WHERE cid = ? AND kind = ?", (cid, kind)).fetchone() is not None
+
+    def lookup(self, query, offline=None):
+        """
+        Everything a result page shows, in one round trip of latency:
+        (cid, properties, synonyms, depiction PNG or None, source), or None when nothing matches.
+        A known name fetches properties/synonyms and the depiction concurrently by CID; an unknown
+        one asks PubChem for all three by name at once, skipping the separate name-to-CID call.
+        """
+        key = name_key(query)
+        if not key:
+            return None
+        with self._connect() as db:
+            row = db.execute("SELECT cid FROM names WHERE name_key = ? ORDER BY rank, cid LIMIT 1", (key,)).fetchone()
+        if row:
+            cid = row[0]
+            depiction = _fetch_pool.submit(self.blob, cid, "png", offline)
+            properties, synonyms, source = self.compound(cid, offline)
+            return cid, properties, synonyms, _quietly(depiction), source
+
+        if self._offline(offline):
+            # Not stored: None for a known miss, OfflineMiss otherwise
+            self.resolve(query, offline=True)
+            return None
+        with self._key_lock(("name", key)):
+            with self._connect() as db:
+                miss = db.execute("SELECT checked_at FROM misses WHERE name_key = ?", (key,)).fetchone()
+            if miss and time.time() - miss[0] < MISS_TTL:
+                return None
+            synonyms = _fetch_pool.submit(pubchem.synonym_lists, query, "name")
+            depiction = _fetch_pool.submit(pubchem.depiction, query, "name")
+            properties = pubchem.properties(query, "name")
+            if not properties:
+                with self._connect() as db:
+                    db.execute("INSERT OR REPLACE INTO misses VALUES (?, ?)", (key, time.time()))
+                return None
+            cid = properties["CID"]
+            synonyms = synonyms.result().get(cid, [])
+            self.put(cid, properties, synonyms)
+            with self._connect() as db:
+                db.execute("INSERT OR REPLACE INTO names VALUES (?, ?, 'query', ?)", (key, cid, -1))
+            depiction = _quietly(depiction)
+            if depiction is not None:
+                self._put_blob(cid, "png", depiction)
+        return cid, properties, synonyms, depiction, "network"
+
+    def _stored(self, cids):
+        """{cid: (properties, synonyms, fetched_at)} of the stored ones among cids"""
+        cids = list(cids)
+        found = {}
+        with self._connect() as db:
+            for i in range(0, len(cids), SQL_CHUNK):
+                chunk = cids[i:i + SQL_CHUNK]
+                rows = db.execute(
+                    f"SELECT cid, properties, synonyms, fetched_at FROM compounds WHERE cid IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall()
+                for cid, properties, synonyms, fetched_at in rows:
+                    found[cid] = (json.loads(properties), json.loads(synonyms), fetched_at)
+        return found
+
+    def _fetch_batch(self, batch, stored):
+        """Properties and synonyms of batch {cid: [queries]} in one multi-CID request each; yields lookup_many rows"""
+        if not batch:
+            return
+        cids = list(batch)
+        try:
+            synonyms = _fetch_pool.submit(pubchem.synonym_table, cids)
+            properties = pubchem.property_table(cids)
+            synonyms = synonyms.result()
+        except requests.RequestException:
+            for cid, queries in batch.items():
+                row = stored.get(cid)
+                for query in queries:
+                    yield (query, cid, row[0], row[1], "stale") if row else (query, cid, {}, [], "error")
+            return
+        for cid, queries in batch.items():
+            if cid in properties:
+                self.put(cid, properties[cid], synonyms.get(cid, []))
+            for query in queries:
+                if cid in properties:
+                    yield query, cid, properties[cid], synonyms.get(cid, []), "network"
+                else:
+                    yield query, cid, {}, [], "miss"
+
+    def lookup_many(self, queries, offline=None):
+        """
+        Resolve a list of names / CAS numbers, yielding (query, cid, properties, synonyms, source) as each
+        is answered. source is as for compound(), or "miss" (PubChem does not know it), "offline" (not
+        stored, offline mode) or "error". Stored compounds come first; other names are resolved to CIDs
+        concurrently (PubChem takes one name per request; the HTTP client's rate limit still applies)
+        and their properties and synonyms fetched BATCH_CIDS compounds per request.
+        """
+        offline = self._offline(offline)
+        queries = list(dict.fromkeys(query.strip() for query in queries if name_key(query)))
+        known = {}
+        with self._connect() as db:
+            for query in queries:
+                row = db.execute(
+                    "SELECT cid FROM names WHERE name_key = ? ORDER BY rank, cid LIMIT 1", (name_key(query),)
+                ).fetchone()
+                if row:
+                    known[query] = row[0]
+        stored = self._stored(set(known.values()))
+
+        batch = {}
+        for query, cid in known.items():
+            row = stored.get(cid)
+            if row and time.time() - row[2] < PROPERTY_TTL:
+                yield query, cid, row[0], row[1], "cache"
+            elif offline:
+                yield (query, cid, row[0], row[1], "stale") if row else (query, cid, {}, [], "offline")
+            else:
+                batch.setdefault(cid, []).append(query)
+
+        unknown = [query for query in queries if query not in known]
+        pool = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="pubchem-batch")
+        try:
+            futures = {pool.submit(self.resolve, query, offline): query for query in unknown}
+            for future in as_completed(futures):
+                query = futures[future]
+                try:
+                    cids, _ = future.result()
+                except OfflineMiss:
+                    yield query, None, {}, [], "offline"
+                    continue
+                except requests.RequestException:
+                    yield query, None, {}, [], "error"
+                    continue
+                if not cids:
+                    yield query, None, {}, [], "miss"
+                    continue
+                row = self._stored([cids[0]]).get(cids[0])
+                if row and time.time() - row[2] < PROPERTY_TTL:
+                    yield query, cids[0], row[0], row[1], "cache"
+                    continue
+                if row:
+                    stored[cids[0]] = row
+                batch.setdefault(cids[0], []).append(query)
+                if len(batch) >= BATCH_CIDS:
+                    yield from self._fetch_batch(batch, stored)
+                    batch = {}
+            yield from self._fetch_batch(batch, stored)
+        finally:
+            # A caller that stops reading does not wait for the names still queued
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def sdf_file(self, cids, offline=None):
+        """
+        One SDF file with the records of cids (in order): stored records as they are,
+        missing or expired ones fetched pubchem.MAX_CIDS_PER_REQUEST at a time and stored.
+        Offline or unreachable, compounds without a stored record are left out.
+        """
+        cids = list(dict.fromkeys(cids))
+        records, expired = {}, set()
+        with self._connect() as db:
+            for i in range(0, len(cids), SQL_CHUNK):
+                chunk = cids[i:i + SQL_CHUNK]
+                rows = db.execute(
+                    f"SELECT cid, data, fetched_at FROM blobs WHERE kind = 'sdf' AND cid IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall()
+                for cid, data, fetched_at in rows:
+                    records[cid] = bytes(data)
+                    if time.time() - fetched_at >= BLOB_TTL:
+                        expired.add(cid)
+        missing = [cid for cid in cids if cid not in records or cid in expired]
+        if missing and not self._offline(offline):
+            chunks = [missing[i:i + pubchem.MAX_CIDS_PER_REQUEST] for i in range(0, len(missing), pubchem.MAX_CIDS_PER_REQUEST)]
+            futures = [_fetch_pool.submit(pubchem.sdf_records, chunk) for chunk in chunks]
+            # A failed chunk leaves its compounds out (or their expired records in)
+            for fetched in map(_quietly, futures):
+                for cid, data in (fetched or {}).items():
+                    self._put_blob(cid, "sdf", data)
+                    records[cid] = data
+        return b"".join(records[cid] for cid in cids if cid in records)
+
+    def evict(self):
+        """Drop least recently used blobs, then unpinned compounds, until the store fits max_bytes"""
+        with self._connect() as db:
+            total = db.execute(
+                "SELECT (SELECT COALESCE(SUM(size), 0) FROM blobs) + (SELECT COALESCE(SUM(size), 0) FROM compounds)"
+            ).fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            for cid, kind, size in db.execute("SELECT cid, kind, size FROM blobs ORDER BY accessed_at").fetchall():
+                if total <= self.max_bytes:
+                    return
+                db.execute("DELETE FROM blobs WHERE cid = ? AND kind = ?", (cid, kind))
+                total -= size
+            for cid, size in db.execute("SELECT cid, size FROM compounds WHERE pinned = 0 ORDER BY accessed_at").fetchall():
+                if total <= self.max_bytes:
+                    return
+                db.execute("DELETE FROM compounds WHERE cid = ?", (cid,))
+                db.execute("DELETE FROM names WHERE cid = ?", (cid,))
+                total -= size
+
+    def stats(self):
+        with self._connect() as db:
+            compounds, compound_bytes = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM compounds").fetchone()
+            blobs, blob_bytes = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs").fetchone()
+            names = db.execute("SELECT COUNT(*) FROM names").fetchone()[0]
+        return {"compounds": compounds, "names": names, "blobs": blobs,
+                "bytes": compound_bytes + blob_bytes, "max_bytes": self.max_bytes}
+
+
+_default_store = None
+_default_store_guard = threading.Lock()
+
+
+def get_compound_store():
+    """Process-wide store, so every Streamlit session shares one cache"""
+    global _default_store
+    with _default_store_guard:
+        if _default_store is None:
+            _default_store = CompoundStore()
+        return _default_store
+
+
+def seed_bundle(queries, bundle_path=BUNDLE_PATH):
+    """Resolve compounds on PubChem and write them to the bundle file (run once, online)"""
+    compounds = []
+    for query in queries:
+        cids = pubchem.find_cids(query)
+        if not cids:
+            print(f"Skipped {query}: not found")
+            continue
+        compounds.append({"query": query, "properties": pubchem.properties(cids[0]), "synonyms": pubchem.synonyms(cids[0])[:20]})
+        print(f"Seeded {query} (CID {cids[0]})")
+    os.makedirs(os.path.dirname(bundle_path), exist_ok=True)
+    with open(bundle_path, "w", encoding="utf-8") as f:
+        json.dump({"format": BUNDLE_FORMAT, "compounds": compounds}, f, indent=1, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    # python -m modules.compound_store Acetaminophen Ibuprofen Benzene Ethanol Glucose ATP
+    seed_bundle(sys.argv[1:] or ["Acetaminophen", "Ibuprofen", "Benzene", "Ethanol", "Glucose", "ATP"])
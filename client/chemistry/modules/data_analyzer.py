@@ -3,11 +3,16 @@ Data Analyzer Module
 Origin-alternative Data Analysis Tool
 
 Features:
-- CSV/Excel file upload
+- CSV/Excel file upload (streamed, sheet/range selective)
 - Scatter plot generation
 - Linear/Non-linear regression analysis
 - R-squared calculation
 - Trendline display
+- Asymptotic and bootstrap confidence intervals / prediction bands
+- Pearson/Spearman correlation with clustered ordering for wide tables
+- Global rate-law fitting for reaction kinetics (shared k or Arrhenius A, Ea)
+- Spectral pipeline: smoothing, ALS baseline, peak finding and peak fitting
+- User-defined model fitting with compiled expressions and symbolic Jacobians
 """
 
 import streamlit as st
@@ -16,8 +21,881 @@ import numpy as np
 import plotly.graph_objects as go
 import plotly.express as px
 from scipy import stats
-from scipy.optimize import curve_fit
+from scipy import sparse
+from scipy.optimize import curve_fit, least_squares
+from scipy.linalg import solveh_banded
+from scipy.signal import savgol_filter, find_peaks
+from scipy.cluster.hierarchy import linkage, leaves_list
+from scipy.spatial.distance import squareform
+from plotly.colors import unlabel_rgb
+import sympy as sp
+from sympy.parsing.sympy_parser import parse_expr, standard_transformations, convert_xor
+import hashlib
 import io
+import os
+import re
+import time
+from functools import lru_cache
+from .workbook import file_digest, list_sheets, read_sheet
+from .worker_pool import parallel_map
+
+# Upper bound on the number of array elements materialized per bootstrap batch
+BOOTSTRAP_BATCH_ELEMENTS = 4_000_000
+
+# Replicate counts offered in the regression tab
+BOOTSTRAP_REPLICATES = [500, 1000, 2000, 5000, 10000]
+# Nonlinear bootstraps with fewer refitted points than this (replicates x data points) run in-process
+BOOTSTRAP_PARALLEL_POINTS = 100_000
+
+# Above this many columns the correlation heatmap is drawn as an image without cell labels
+CORRELATION_ANNOTATION_LIMIT = 25
+# Column names shown along each axis of the image heatmap (every k-th column beyond this)
+CORRELATION_TICK_LIMIT = 40
+
+
+# Models fitted by linear least squares (after transforming x and/or y)
+LINEARIZED_MODELS = ("Linear", "Polynomial", "Logarithmic", "Power")
+
+# Names a user-typed model may use as functions/constants; every other identifier is a symbol
+MODEL_FUNCTIONS = {
+    'exp': sp.exp, 'log': sp.log, 'ln': sp.log, 'log10': lambda v: sp.log(v, 10), 'sqrt': sp.sqrt,
+    'sin': sp.sin, 'cos': sp.cos, 'tan': sp.tan, 'sinh': sp.sinh, 'cosh': sp.cosh, 'tanh': sp.tanh,
+    'asin': sp.asin, 'acos': sp.acos, 'atan': sp.atan, 'abs': sp.Abs, 'pi': sp.pi,
+}
+
+
+@lru_cache(maxsize=128)
+def compile_model(expression, variables=('x',), parameters=None):
+    """
+    Parse a model expression once and compile it, and its symbolic Jacobian, to NumPy.
+    Parameters are every symbol that is not a variable (alphabetical) unless given.
+    Cached by expression text, so refits skip parsing and differentiation.
+    """
+    names = set(re.findall(r'[A-Za-z_]\w*', expression))
+    local_dict = {name: sp.Symbol(name) for name in names if name not in MODEL_FUNCTIONS}
+    local_dict.update({name: func for name, func in MODEL_FUNCTIONS.items() if name in names})
+    for name in variables + tuple(parameters or ()):
+        local_dict.setdefault(name, sp.Symbol(name))
+    expr = parse_expr(expression, local_dict=local_dict, transformations=standard_transformations + (convert_xor,))
+
+    var_symbols = [local_dict[v] for v in variables]
+    if parameters is None:
+        param_symbols = sorted(expr.free_symbols - set(var_symbols), key=lambda sym: sym.name)
+    else:
+        param_symbols = [local_dict[name] for name in parameters]
+        unknown = expr.free_symbols - set(var_symbols) - set(param_symbols)
+        if unknown:
+            raise ValueError(f"Unknown symbols in model: {', '.join(sorted(map(str, unknown)))}")
+    if not param_symbols:
+        raise ValueError("Model has no parameters to fit")
+
+    args = var_symbols + param_symbols
+    value = sp.lambdify(args, expr, 'numpy')
+    gradient = sp.lambdify(args, [sp.diff(expr, sym) for sym in param_symbols], 'numpy')
+
+    def f(*values):
+        shape = np.broadcast(*values).shape
+        return np.broadcast_to(np.asarray(value(*values), dtype=float), shape)
+
+    def jac(*values):
+        # (points, parameters); constant derivatives are broadcast to full columns
+        shape = np.broadcast(*values).shape
+        return np.stack([np.broadcast_to(np.asarray(d, dtype=float), shape) for d in gradient(*values)], axis=-1)
+
+    return {
+        "expr": expr,
+        "params": [sym.name for sym in param_symbols],
+        "f": f,
+        "jac": jac,
+    }
+
+
+def parse_initial_guesses(text):
+    """'a=1, b=0.1' -> {'a': 1.0, 'b': 0.1}; ValueError naming the entry that is not name=number"""
+    guesses = {}
+    for item in text.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        name, sep, value = (part.strip() for part in item.partition('='))
+        if not sep or not name or '=' in value:
+            raise ValueError(f"'{item}' is not of the form name=value")
+        try:
+            guesses[name] = float(value)
+        except ValueError:
+            raise ValueError(f"'{value}' in '{item}' is not a number") from None
+    return guesses
+
+
+def exp_func(x, a, b):
+    # y = a * exp(b * x)
+    return a * np.exp(b * x)
+
+
+def _exp_jacobian(x, a, b):
+    e = np.exp(b * x)
+    return np.stack([e, a * x * e], axis=-1)
+
+
+def nonlinear_model(regression_type, expression=None):
+    """
+    (function, Jacobian, parameter names) of a nonlinear model:
+    the built-in Exponential model, or a "Custom" model given by its y(x) expression.
+    """
+    if regression_type == "Exponential":
+        return exp_func, _exp_jacobian, ["a", "b"]
+    if regression_type != "Custom" or not expression:
+        raise ValueError(f"{regression_type} is not a nonlinear model (Custom models need an expression)")
+    model = compile_model(expression)
+    return model["f"], model["jac"], model["params"]
+
+
+def _design_matrix(regression_type, x, degree=2):
+    """Design matrix of the (linearized) least-squares problem"""
+    if regression_type == "Linear":
+        return np.column_stack([x, np.ones_like(x)])
+    if regression_type == "Polynomial":
+        return np.vander(x, degree + 1)
+    if regression_type in ("Logarithmic", "Power"):
+        return np.column_stack([np.ones_like(x), np.log(x)])
+    raise ValueError(f"{regression_type} regression is not linear in its parameters")
+
+
+def _response(regression_type, y):
+    # Power law is fitted as log(y) = log(a) + b * log(x)
+    return np.log(y) if regression_type == "Power" else y
+
+
+def _predict_fit_space(regression_type, params, x, degree=2, expression=None):
+    """Model values on the fitting scale; params may be a (p,) vector or a (B, p) batch"""
+    params = np.asarray(params)
+    if regression_type not in LINEARIZED_MODELS:
+        f, _, names = nonlinear_model(regression_type, expression)
+        return f(x, *(params[..., j:j + 1] for j in range(len(names))))
+    return params @ _design_matrix(regression_type, x, degree).T
+
+
+def predict_regression(regression_type, params, x, degree=2, expression=None):
+    z = _predict_fit_space(regression_type, params, x, degree, expression)
+    return np.exp(z) if regression_type == "Power" else z
+
+
+def _fit_jacobian(regression_type, params, x, degree=2, expression=None):
+    if regression_type not in LINEARIZED_MODELS:
+        _, jac, _ = nonlinear_model(regression_type, expression)
+        return jac(x, *params)
+    return _design_matrix(regression_type, x, degree)
+
+
+def parameter_names(regression_type, degree=2, expression=None):
+    if regression_type == "Linear":
+        return ["slope", "intercept"]
+    if regression_type == "Polynomial":
+        return [f"c{k} (x^{k})" for k in range(degree, -1, -1)]
+    if regression_type not in LINEARIZED_MODELS:
+        return nonlinear_model(regression_type, expression)[2]
+    return ["a", "b"]
+
+
+def _natural_params(regression_type, params):
+    # Power law is fitted with log(a); every other model reports its fitted parameters
+    params = np.array(params, dtype=float)
+    if regression_type == "Power":
+        params[..., 0] = np.exp(params[..., 0])
+    return params
+
+
+def _format_equation(regression_type, params, expression=None):
+    if regression_type == "Linear":
+        return f"y = {params[0]:.4f}x + {params[1]:.4f}"
+    if regression_type == "Polynomial":
+        return str(np.poly1d(params)).replace('\n', '')
+    if regression_type == "Exponential":
+        return f"y = {params[0]:.4f} * exp({params[1]:.4f} * x)"
+    if regression_type == "Logarithmic":
+        return f"y = {params[0]:.4f} + {params[1]:.4f} * log(x)"
+    if regression_type == "Custom":
+        model = compile_model(expression)
+        values = {sp.Symbol(name): sp.Float(v, 5) for name, v in zip(model["params"], params)}
+        return f"y = {model['expr'].subs(values)}"
+    a, b = _natural_params(regression_type, params)
+    return f"y = {a:.4f} * x^{b:.4f}"
+
+
+def fit_regression(regression_type, X, Y, degree=2, p0=None, expression=None):
+    """
+    Fit one of the built-in regression models, or ("Custom") the y(x) model expression.
+    R² is reported on the fitting scale (log scale for the Power model).
+    """
+    if regression_type in ("Logarithmic", "Power"):
+        keep = X > 0
+        if regression_type == "Power":
+            keep &= Y > 0
+        X, Y = X[keep], Y[keep]
+
+    if regression_type not in LINEARIZED_MODELS:
+        f, jac, names = nonlinear_model(regression_type, expression)
+        if p0 is None:
+            p0 = (1, 0.1) if regression_type == "Exponential" else np.ones(len(names))
+        params, _ = curve_fit(f, X, Y, p0=p0, jac=jac)
+    else:
+        params = np.linalg.lstsq(_design_matrix(regression_type, X, degree), _response(regression_type, Y), rcond=None)[0]
+
+    z = _response(regression_type, Y)
+    z_pred = _predict_fit_space(regression_type, params, X, degree, expression)
+    ss_res = np.sum((z - z_pred) ** 2)
+    ss_tot = np.sum((z - np.mean(z)) ** 2)
+
+    X_fit = np.linspace(X.min(), X.max(), 100)
+
+    return {
+        "type": regression_type,
+        "expression": expression,
+        "degree": degree,
+        "params": params,
+        "x": X,
+        "y": Y,
+        "y_pred": predict_regression(regression_type, params, X, degree, expression),
+        "residuals_fit_space": z - z_pred,
+        "x_fit": X_fit,
+        "y_fit": predict_regression(regression_type, params, X_fit, degree, expression),
+        "r_squared": 1 - (ss_res / ss_tot),
+        "equation": _format_equation(regression_type, params, expression),
+    }
+
+
+def asymptotic_intervals(fit, level=0.95):
+    """Wald intervals from the linearized covariance s² (JᵀJ)⁻¹, plus delta-method bands"""
+    regression_type, degree, params, expression = fit["type"], fit["degree"], fit["params"], fit["expression"]
+    J = _fit_jacobian(regression_type, params, fit["x"], degree, expression)
+    n, p = J.shape
+    dof = max(n - p, 1)
+
+    resid = fit["residuals_fit_space"]
+    s2 = resid @ resid / dof
+    cov = s2 * np.linalg.pinv(J.T @ J)
+    t_crit = stats.t.ppf(0.5 + level / 2, dof)
+    se = np.sqrt(np.diag(cov))
+
+    J_fit = _fit_jacobian(regression_type, params, fit["x_fit"], degree, expression)
+    z_fit = _predict_fit_space(regression_type, params, fit["x_fit"], degree, expression)
+    se_mean = np.sqrt(np.einsum('ij,jk,ik->i', J_fit, cov, J_fit))
+    se_obs = np.sqrt(se_mean ** 2 + s2)
+
+    to_y = np.exp if regression_type == "Power" else (lambda z: z)
+    return {
+        "lower": _natural_params(regression_type, params - t_crit * se),
+        "upper": _natural_params(regression_type, params + t_crit * se),
+        "std_err": se,
+        "conf_band": (to_y(z_fit - t_crit * se_mean), to_y(z_fit + t_crit * se_mean)),
+        "pred_band": (to_y(z_fit - t_crit * se_obs), to_y(z_fit + t_crit * se_obs)),
+    }
+
+
+def _batched_solve(AtA, Atz):
+    try:
+        return np.linalg.solve(AtA, Atz[..., None])[..., 0]
+    except np.linalg.LinAlgError:
+        # A degenerate resample (e.g. every draw on the same x) makes its block singular
+        return (np.linalg.pinv(AtA) @ Atz[..., None])[..., 0]
+
+
+def _bootstrap_linear(A, z, n_boot, rng):
+    """
+    Bootstrap the least-squares solution as batched matrix products.
+    A resample is represented by its multinomial draw counts W, so that
+    AᵀWA and AᵀWz for every replicate come from two matrix multiplications.
+    """
+    n, p = A.shape
+    # Column scaling keeps the normal equations well conditioned (high polynomial degrees)
+    scale = np.linalg.norm(A, axis=0)
+    scale[scale == 0] = 1.0
+    A = A / scale
+
+    outer = (A[:, :, None] * A[:, None, :]).reshape(n, p * p)
+    Az = A * z[:, None]
+
+    params = np.empty((n_boot, p))
+    batch = max(1, BOOTSTRAP_BATCH_ELEMENTS // max(n, p * p))
+    for start in range(0, n_boot, batch):
+        stop = min(start + batch, n_boot)
+        W = rng.multinomial(n, np.full(n, 1.0 / n), size=stop - start).astype(float)
+        params[start:stop] = _batched_solve((W @ outer).reshape(-1, p, p), W @ Az)
+    return params / scale
+
+
+def _refit_nonlinear(args):
+    regression_type, expression, x, y, resamples, p0 = args
+    # Expression models are recompiled (once, cached) inside each worker process
+    f, jac, _ = nonlinear_model(regression_type, expression)
+    params = np.full((len(resamples), len(p0)), np.nan)
+    for i, rows in enumerate(resamples):
+        try:
+            params[i], _ = curve_fit(f, x[rows], y[rows], p0=p0, jac=jac, maxfev=2000)
+        except (RuntimeError, ValueError):
+            pass
+    return params
+
+
+def _bootstrap_nonlinear(regression_type, expression, x, y, n_boot, p0, rng):
+    """Refit the resamples in worker processes, warm-started from the full-data fit"""
+    resamples = rng.integers(0, len(x), size=(n_boot, len(x)))
+    workers = os.cpu_count() or 1
+    if workers == 1 or resamples.size < BOOTSTRAP_PARALLEL_POINTS:
+        return _refit_nonlinear((regression_type, expression, x, y, resamples, p0))
+
+    chunks = np.array_split(resamples, workers * 4)
+    return np.vstack(parallel_map(_refit_nonlinear, [(regression_type, expression, x, y, chunk, p0) for chunk in chunks]))
+
+
+def bootstrap_intervals(fit, n_boot=2000, level=0.95, seed=0):
+    """Case-resampling bootstrap percentile intervals and bands"""
+    regression_type, degree, expression = fit["type"], fit["degree"], fit["expression"]
+    x, y, x_fit = fit["x"], fit["y"], fit["x_fit"]
+    rng = np.random.default_rng(seed)
+
+    if regression_type not in LINEARIZED_MODELS:
+        boot = _bootstrap_nonlinear(regression_type, expression, x, y, n_boot, tuple(fit["params"]), rng)
+    else:
+        A = _design_matrix(regression_type, x, degree)
+        boot = _bootstrap_linear(A, _response(regression_type, y), n_boot, rng)
+    boot = boot[np.all(np.isfinite(boot), axis=1)]
+
+    q = [50 * (1 - level), 50 * (1 + level)]
+    lower, upper = np.percentile(_natural_params(regression_type, boot), q, axis=0)
+
+    # Every replicate curve at once: (B, p) @ (p, m)
+    z_curves = _predict_fit_space(regression_type, boot, x_fit, degree, expression)
+    z_obs = z_curves + rng.choice(fit["residuals_fit_space"], size=z_curves.shape)
+
+    to_y = np.exp if regression_type == "Power" else (lambda z: z)
+    conf = to_y(np.percentile(z_curves, q, axis=0))
+    pred = to_y(np.percentile(z_obs, q, axis=0))
+    return {
+        "lower": lower,
+        "upper": upper,
+        "std_err": boot.std(axis=0, ddof=1),
+        "n_valid": len(boot),
+        "conf_band": (conf[0], conf[1]),
+        "pred_band": (pred[0], pred[1]),
+    }
+
+
+@st.cache_data(show_spinner=False)
+def confidence_intervals(regression_type, X, Y, degree, method, level, n_boot, p0=None, expression=None):
+    fit = fit_regression(regression_type, X, Y, degree, p0, expression)
+    if method == "Bootstrap":
+        return bootstrap_intervals(fit, n_boot=n_boot, level=level)
+    return asymptotic_intervals(fit, level=level)
+
+def _pairwise_pearson(X):
+    """
+    Pearson correlation between the columns of every (rows, columns) slab in X.
+    Missing values are excluded pair by pair, using masked cross-products.
+    """
+    mask = ~np.isnan(X)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if mask.all():
+            Xc = X - X.mean(axis=-2, keepdims=True)
+            cov = Xc.swapaxes(-1, -2) @ Xc
+            d = np.sqrt(np.diagonal(cov, axis1=-2, axis2=-1))
+            corr = cov / (d[..., :, None] * d[..., None, :])
+        else:
+            M = mask.astype(float)
+            X0 = np.where(mask, X - np.nanmean(X, axis=-2, keepdims=True), 0.0)
+            Xt = X0.swapaxes(-1, -2)
+            n = M.swapaxes(-1, -2) @ M
+            # sx[i, j]: sum of column i over the rows where columns i and j are both present
+            sx = Xt @ M
+            sxx = (Xt ** 2) @ M
+            cov = Xt @ X0 - sx * sx.swapaxes(-1, -2) / n
+            var = sxx - sx ** 2 / n
+            corr = cov / np.sqrt(var * var.swapaxes(-1, -2))
+    return np.clip(corr, -1.0, 1.0)
+
+
+def correlation_matrices(values):
+    """
+    Pearson and Spearman matrices of a (rows, columns) array in one vectorized pass.
+    Spearman ranks each column over its own non-missing values, which matches
+    pandas exactly when nothing is missing.
+    """
+    values = np.asarray(values, dtype=float)
+    ranks = stats.rankdata(values, axis=0, nan_policy='omit')
+    pearson, spearman = _pairwise_pearson(np.stack([values, ranks]))
+    return pearson, spearman
+
+
+def cluster_order(corr):
+    """Leaf order of an average-linkage clustering on 1 - |r|"""
+    k = len(corr)
+    if k < 3:
+        return np.arange(k)
+    dist = 1 - np.abs(np.nan_to_num(corr))
+    dist = np.clip((dist + dist.T) / 2, 0, None)
+    np.fill_diagonal(dist, 0)
+    Z = linkage(squareform(dist, checks=False), method='average', optimal_ordering=k <= 300)
+    return leaves_list(Z)
+
+
+def frame_digest(df):
+    return hashlib.sha1(pd.util.hash_pandas_object(df, index=False).values.tobytes()).hexdigest()
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def correlation_analysis(digest, columns, _values):
+    # Keyed by data digest and column set; the raw array itself is not hashed
+    pearson, spearman = correlation_matrices(_values)
+    return {
+        "Pearson": (pearson, cluster_order(pearson)),
+        "Spearman": (spearman, cluster_order(spearman)),
+    }
+
+
+def strongest_pairs(corr, columns, top=15):
+    i, j = np.triu_indices(len(columns), k=1)
+    r = corr[i, j]
+    keep = ~np.isnan(r)
+    i, j, r = i[keep], j[keep], r[keep]
+    best = np.argsort(-np.abs(r))[:top]
+    return pd.DataFrame({
+        "Variable 1": np.asarray(columns)[i[best]],
+        "Variable 2": np.asarray(columns)[j[best]],
+        "r": r[best],
+    })
+
+
+def _correlation_image(corr):
+    # Map r ∈ [-1, 1] onto a blue-white-red RGB image; missing values are grey
+    stops = np.array([unlabel_rgb(c) for c in px.colors.diverging.RdBu_r])
+    positions = np.linspace(-1, 1, len(stops))
+    filled = np.nan_to_num(corr, nan=0.0)
+    img = np.stack([np.interp(filled, positions, stops[:, c]) for c in range(3)], axis=-1)
+    img[np.isnan(corr)] = 64
+    return img.astype(np.uint8)
+
+# ---- Reaction kinetics ----
+
+GAS_CONSTANT = 8.314462618  # J/(mol·K)
+
+# Independent-run fits are dispatched to worker processes from this many runs on
+KINETICS_PARALLEL_RUNS = 16
+
+
+def _zero_order(t, C0, k):
+    # C = C0 - k t
+    return C0 - k * t, np.ones_like(t), -t
+
+
+def _first_order(t, C0, k):
+    # C = C0 exp(-k t)
+    e = np.exp(-k * t)
+    return C0 * e, e, -t * C0 * e
+
+
+def _second_order(t, C0, k):
+    # C = C0 / (1 + k C0 t)
+    d = 1 + k * C0 * t
+    return C0 / d, 1 / d ** 2, -(C0 ** 2) * t / d ** 2
+
+
+RATE_LAWS = {
+    "Zero order": _zero_order,
+    "First order": _first_order,
+    "Second order": _second_order,
+}
+
+
+def compile_rate_law(expression):
+    """
+    Compile an integrated rate law C(t; C0, k) typed by the user.
+    Returns a function giving (C, ∂C/∂C0, ∂C/∂k), differentiated symbolically.
+    """
+    model = compile_model(expression, variables=('t',), parameters=('C0', 'k'))
+
+    def rate_law(t, C0, k):
+        dC = model["jac"](t, C0, k)
+        return model["f"](t, C0, k), dC[..., 0], dC[..., 1]
+
+    return rate_law
+
+
+def _rate_law(law):
+    return RATE_LAWS[law] if law in RATE_LAWS else compile_rate_law(law)
+
+
+def _initial_guess(law, t, c):
+    first = np.argmin(t)
+    C0 = c[first] if c[first] != 0 else np.max(np.abs(c))
+    span = max(np.ptp(t), 1e-12)
+    if law == "Zero order":
+        k = (C0 - c[np.argmax(t)]) / span
+    elif law == "Second order":
+        k = 1 / (abs(C0) * span) if C0 else 1 / span
+    else:
+        k = 1 / span
+    return C0, k if k > 0 else 1 / span
+
+
+def _fit_single_run(args):
+    law, t, c = args
+    f = _rate_law(law)
+
+    def residuals(p):
+        return f(t, p[0], p[1])[0] - c
+
+    def jacobian(p):
+        _, dC0, dk = f(t, p[0], p[1])
+        return np.column_stack([dC0, dk])
+
+    sol = least_squares(residuals, _initial_guess(law, t, c), jac=jacobian, x_scale='jac')
+    dof = max(len(t) - 2, 1)
+    cov = (sol.fun @ sol.fun / dof) * np.linalg.pinv(sol.jac.T @ sol.jac)
+    return sol.x, np.sqrt(np.diag(cov)), sol.fun @ sol.fun
+
+
+def fit_kinetics_runs(law, runs):
+    """Fit (C0, k) for every run separately; runs are independent and solved in parallel"""
+    tasks = [(law, t, c) for t, c in runs]
+    workers = os.cpu_count() or 1
+    if workers == 1 or len(tasks) < KINETICS_PARALLEL_RUNS:
+        results = [_fit_single_run(task) for task in tasks]
+    else:
+        results = parallel_map(_fit_single_run, tasks, chunksize=max(1, len(tasks) // (workers * 4)))
+
+    params = np.array([r[0] for r in results])
+    std_err = np.array([r[1] for r in results])
+    return {
+        "C0": params[:, 0],
+        "k": params[:, 1],
+        "C0_err": std_err[:, 0],
+        "k_err": std_err[:, 1],
+        "rss": sum(r[2] for r in results),
+    }
+
+
+def fit_kinetics_global(law, runs, temperatures=None):
+    """
+    Global fit of every run at once with per-run C0 and shared kinetics.
+    Without temperatures a single k is shared; with temperatures (K) k follows
+    Arrhenius, k = k_ref exp(-Ea/R (1/T - 1/T_ref)), sharing k_ref and Ea.
+    The Jacobian is assembled analytically as a sparse block matrix.
+    """
+    f = _rate_law(law)
+    n_runs = len(runs)
+    lengths = [len(t) for t, _ in runs]
+    t_all = np.concatenate([t for t, _ in runs])
+    c_all = np.concatenate([c for _, c in runs])
+    run_of = np.repeat(np.arange(n_runs), lengths)
+    n_points = len(t_all)
+
+    arrhenius = temperatures is not None
+    n_shared = 2 if arrhenius else 1
+    if arrhenius:
+        temperatures = np.asarray(temperatures, dtype=float)
+        T_ref = temperatures.mean()
+        inv_T = 1 / temperatures[run_of] - 1 / T_ref
+
+    def rate_constants(theta):
+        if arrhenius:
+            # theta[1] is Ea in kJ/mol
+            return np.exp(theta[0] - theta[1] * 1000 / GAS_CONSTANT * inv_T)
+        return np.full(n_points, theta[0])
+
+    def residuals(theta):
+        return f(t_all, theta[n_shared:][run_of], rate_constants(theta))[0] - c_all
+
+    rows = np.tile(np.arange(n_points), n_shared + 1)
+    cols = np.concatenate([np.full(n_points, j) for j in range(n_shared)] + [n_shared + run_of])
+
+    def jacobian(theta):
+        k = rate_constants(theta)
+        _, dC0, dk = f(t_all, theta[n_shared:][run_of], k)
+        if arrhenius:
+            shared = [dk * k, dk * k * (-1000 / GAS_CONSTANT) * inv_T]
+        else:
+            shared = [dk]
+        values = np.concatenate(shared + [dC0])
+        return sparse.csr_matrix((values, (rows, cols)), shape=(n_points, n_shared + n_runs))
+
+    guesses = [_initial_guess(law, t, c) for t, c in runs]
+    k0 = np.median([g[1] for g in guesses])
+    theta0 = np.concatenate([[np.log(k0), 50.0] if arrhenius else [k0], [g[0] for g in guesses]])
+
+    sol = least_squares(residuals, theta0, jac=jacobian, x_scale='jac', tr_solver='lsmr')
+
+    J = sol.jac.toarray() if sparse.issparse(sol.jac) else sol.jac
+    dof = max(n_points - len(theta0), 1)
+    cov = (sol.fun @ sol.fun / dof) * np.linalg.pinv(J.T @ J)
+    std_err = np.sqrt(np.diag(cov))
+
+    result = {
+        "C0": sol.x[n_shared:],
+        "C0_err": std_err[n_shared:],
+        "rss": sol.fun @ sol.fun,
+        "success": sol.success,
+    }
+    if arrhenius:
+        Ea = sol.x[1]
+        result["k"] = np.exp(sol.x[0] - Ea * 1000 / GAS_CONSTANT * (1 / temperatures - 1 / T_ref))
+        result["Ea"], result["Ea_err"] = Ea, std_err[1]
+        # ln A = ln k_ref + Ea / (R T_ref)
+        result["lnA"] = sol.x[0] + Ea * 1000 / (GAS_CONSTANT * T_ref)
+        result["lnA_err"] = np.sqrt(cov[0, 0] + 2 * cov[0, 1] * (1000 / (GAS_CONSTANT * T_ref)) + cov[1, 1] * (1000 / (GAS_CONSTANT * T_ref)) ** 2)
+    else:
+        result["k"] = np.full(n_runs, sol.x[0])
+        result["k_shared"], result["k_err"] = sol.x[0], std_err[0]
+    return result
+
+
+def predict_kinetics(law, t, C0, k):
+    return _rate_law(law)(t, C0, k)[0]
+
+# ---- Spectral processing ----
+
+# Spectra are fitted in worker processes from this many spectra on
+SPECTRA_PARALLEL_FITS = 16
+
+# Traces are min/max decimated to this many points before being sent to the browser
+SPECTRUM_DISPLAY_POINTS = 20000
+
+
+def smooth_spectra(Y, window=11, polyorder=3):
+    """Savitzky–Golay smoothing along the last axis of a (spectra, points) array"""
+    window = min(window, Y.shape[-1] - (1 - Y.shape[-1] % 2))
+    if window <= polyorder:
+        return Y
+    return savgol_filter(Y, window, polyorder, axis=-1, mode='interp')
+
+
+@lru_cache(maxsize=8)
+def _difference_penalty_bands(n, lam):
+    # λ DᵀD for the second-difference operator D, in upper banded (pentadiagonal) storage
+    bands = np.zeros((3, n))
+    bands[0, 2:] = 1
+    bands[1, 1:] = -4
+    bands[1, [1, -1]] = -2
+    bands[2] = 6
+    bands[2, [0, -1]] = 1
+    bands[2, [1, -2]] = 5
+    return lam * bands
+
+
+def als_baseline(y, lam=1e5, p=0.01, n_iter=10):
+    """
+    Asymmetric least squares baseline (Eilers & Boelens).
+    Each iteration solves (W + λDᵀD) z = W y with a banded Cholesky solver, O(n).
+    """
+    n = len(y)
+    if n < 4:
+        return np.full(n, y.min())
+    bands = _difference_penalty_bands(n, float(lam))
+    ab = bands.copy()
+    w = np.ones(n)
+    z = y
+    for _ in range(n_iter):
+        ab[2] = bands[2] + w
+        z = solveh_banded(ab, w * y, check_finite=False)
+        w_new = np.where(y > z, p, 1 - p)
+        if np.array_equal(w_new, w):
+            break
+        w = w_new
+    return z
+
+
+def _gaussian_peaks(x, params):
+    A, mu, sigma = params[0::3, None], params[1::3, None], params[2::3, None]
+    u = (x - mu) / sigma
+    e = np.exp(-0.5 * u ** 2)
+    value = (A * e).sum(axis=0)
+    # Columns ordered (A, μ, σ) per peak, matching the parameter vector
+    jac = np.stack([e, A * e * u / sigma, A * e * u ** 2 / sigma], axis=1).reshape(-1, len(x)).T
+    return value, jac
+
+
+def _lorentzian_peaks(x, params):
+    A, mu, gamma = params[0::3, None], params[1::3, None], params[2::3, None]
+    dx = x - mu
+    d = dx ** 2 + gamma ** 2
+    shape = gamma ** 2 / d
+    value = (A * shape).sum(axis=0)
+    jac = np.stack([shape, 2 * A * shape * dx / d, 2 * A * gamma * dx ** 2 / d ** 2], axis=1).reshape(-1, len(x)).T
+    return value, jac
+
+
+PEAK_SHAPES = {
+    "Gaussian": _gaussian_peaks,
+    "Lorentzian": _lorentzian_peaks,
+}
+
+
+def find_spectrum_peaks(x, y, prominence=0.05, max_peaks=20):
+    """
+    Peaks of a baseline-corrected spectrum, strongest first.
+    A peak must rise a fraction of the signal range above the zero baseline and be
+    at least that prominent; the cheap height test discards noise maxima before
+    the (costly) prominences are computed.
+    """
+    span = np.ptp(y)
+    min_prominence = prominence * span if span > 0 else None
+    idx, props = find_peaks(y, height=min_prominence, prominence=min_prominence, width=1)
+    keep = np.argsort(props["prominences"])[::-1][:max_peaks]
+    idx = idx[keep]
+    step = np.abs(np.median(np.diff(x))) if len(x) > 1 else 1.0
+    return {
+        "index": idx,
+        "position": x[idx],
+        "height": y[idx],
+        "fwhm": props["widths"][keep] * step,
+    }
+
+
+def fit_peaks(x, y, peaks, shape="Gaussian"):
+    """
+    Fit a sum of peaks with an analytic Jacobian.
+    Only points within three widths of a peak enter the fit.
+    """
+    if len(peaks["index"]) == 0:
+        return None
+    model = PEAK_SHAPES[shape]
+    fwhm = np.maximum(peaks["fwhm"], 1e-12)
+    width0 = fwhm / 2.3548 if shape == "Gaussian" else fwhm / 2
+
+    near = np.zeros(len(x), dtype=bool)
+    for pos, w in zip(peaks["position"], fwhm):
+        lo, hi = np.searchsorted(x, [pos - 3 * w, pos + 3 * w]) if x[0] <= x[-1] else (0, len(x))
+        near[lo:hi] = True
+    if not near.any():
+        near[:] = True
+    xf, yf = x[near], y[near]
+
+    p0 = np.column_stack([np.maximum(peaks["height"], 1e-12), peaks["position"], width0]).ravel()
+    lower = np.tile([0, -np.inf, 1e-12], len(peaks["index"]))
+
+    sol = least_squares(
+        lambda p: model(xf, p)[0] - yf,
+        p0,
+        jac=lambda p: model(xf, p)[1],
+        bounds=(lower, np.inf),
+        x_scale='jac'
+    )
+    params = sol.x.reshape(-1, 3)
+    if shape == "Gaussian":
+        fitted_fwhm = params[:, 2] * 2.3548
+        area = params[:, 0] * params[:, 2] * np.sqrt(2 * np.pi)
+    else:
+        fitted_fwhm = params[:, 2] * 2
+        area = params[:, 0] * params[:, 2] * np.pi
+    return {
+        "params": sol.x,
+        "amplitude": params[:, 0],
+        "center": params[:, 1],
+        "fwhm": fitted_fwhm,
+        "area": area,
+        "rss": sol.fun @ sol.fun,
+    }
+
+
+def _process_one_spectrum(args):
+    x, y, lam, p, prominence, shape = args
+    timings = {}
+
+    start = time.perf_counter()
+    baseline = als_baseline(y, lam=lam, p=p)
+    timings["Baseline"] = time.perf_counter() - start
+
+    corrected = y - baseline
+
+    start = time.perf_counter()
+    peaks = find_spectrum_peaks(x, corrected, prominence=prominence)
+    timings["Peak Finding"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    fit = fit_peaks(x, corrected, peaks, shape) if shape in PEAK_SHAPES else None
+    timings["Peak Fitting"] = time.perf_counter() - start
+
+    return baseline, peaks, fit, timings
+
+
+def process_spectra(x, Y, window=11, polyorder=3, lam=1e5, p=0.01, prominence=0.05, shape="Gaussian"):
+    """
+    Smoothing → ALS baseline → peak finding → multi-peak fitting for a batch of spectra.
+    Y is a (spectra, points) array sharing the axis x; float64 input is used without copying.
+    Returns per-spectrum results and the time spent in each stage.
+    """
+    x = np.asarray(x, dtype=float)
+    Y = np.atleast_2d(np.asarray(Y, dtype=float))
+    if x[0] > x[-1]:
+        # IR wavenumber axes are usually descending; reversed views keep the data in place
+        x, Y = x[::-1], Y[:, ::-1]
+
+    timings = {}
+    start = time.perf_counter()
+    smoothed = smooth_spectra(Y, window, polyorder)
+    timings["Smoothing"] = time.perf_counter() - start
+
+    tasks = [(x, smoothed[i], lam, p, prominence, shape) for i in range(len(smoothed))]
+    workers = os.cpu_count() or 1
+    if workers == 1 or len(tasks) < SPECTRA_PARALLEL_FITS:
+        results = [_process_one_spectrum(task) for task in tasks]
+    else:
+        results = parallel_map(_process_one_spectrum, tasks, chunksize=max(1, len(tasks) // (workers * 4)))
+
+    # Per-spectrum stages are summed over the batch (CPU time when run in parallel)
+    for stage in ("Baseline", "Peak Finding", "Peak Fitting"):
+        timings[stage] = sum(r[3][stage] for r in results)
+
+    baselines = np.array([r[0] for r in results])
+    return {
+        "x": x,
+        "raw": Y,
+        "smoothed": smoothed,
+        "baseline": baselines,
+        "corrected": smoothed - baselines,
+        "peaks": [r[1] for r in results],
+        "fits": [r[2] for r in results],
+        "timings": timings,
+    }
+
+
+def decimate_for_display(x, y, max_points=SPECTRUM_DISPLAY_POINTS):
+    """Min/max decimation that preserves peaks when drawing very long traces"""
+    n = len(x)
+    if n <= max_points:
+        return x, y
+    size = int(np.ceil(n / (max_points // 2)))
+    m = n // size * size
+    blocks = y[:m].reshape(-1, size)
+    base = np.arange(len(blocks)) * size
+    idx = np.concatenate([base + blocks.argmin(axis=1), base + blocks.argmax(axis=1), np.arange(m, n)])
+    idx.sort()
+    return x[idx], y[idx]
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def processed_spectra(digest, window, polyorder, lam, p, prominence, shape, _x, _Y):
+    # Keyed by data digest and settings; the arrays themselves are not hashed
+    return process_spectra(_x, _Y, window, polyorder, lam, p, prominence, shape)
+
+# ---- Workbook loading ----
+
+def _workbook_source(name, data):
+    # The file name tells the shared reader whether this is a legacy .xls workbook
+    source = io.BytesIO(data)
+    source.name = name
+    return source
+
+
+@st.cache_data(show_spinner=False)
+def workbook_sheets(digest, name, _data):
+    return list_sheets(_workbook_source(name, _data))
+
+
+@st.cache_data(show_spinner="Reading sheet...", max_entries=8)
+def workbook_sheet(digest, name, sheet, cell_range, _data):
+    # Parsed sheets are cached by file hash, so reruns and other sessions skip parsing
+    return read_sheet(_workbook_source(name, _data), sheet, cell_range)
+
 
 def show():
     st.title("📊 Data Analyzer")
@@ -48,7 +926,19 @@ def show():
             if uploaded_file.name.endswith('.csv'):
                 df = pd.read_csv(uploaded_file)
             else:
-                df = pd.read_excel(uploaded_file)
+                data = uploaded_file.getvalue()
+                digest = file_digest(data)
+                sheets = workbook_sheets(digest, uploaded_file.name, data)
+                if not sheets:
+                    raise ValueError("the workbook has no worksheets (chart sheets hold no data)")
+                
+                sheet_col, range_col = st.columns([2, 1])
+                with sheet_col:
+                    sheet = st.selectbox("Sheet", sheets) if len(sheets) > 1 else sheets[0]
+                with range_col:
+                    cell_range = st.text_input("Cell Range (optional)", placeholder="A1:F500", help="Load only this block of the sheet").strip()
+                
+                df = workbook_sheet(digest, uploaded_file.name, sheet, cell_range or None, data)
             
             st.success(f"✅ File uploaded: {uploaded_file.name}")
         
@@ -57,7 +947,7 @@ def show():
     
     if df is not None:
         # Tab configuration
-        tab1, tab1_2, tab2 = st.tabs(["Data Preview", "Scatter Plot & Regression", "Statistical Analysis"])
+        tab1, tab1_2, tab2, tab3, tab4 = st.tabs(["Data Preview", "Scatter Plot & Regression", "Statistical Analysis", "Kinetics", "Spectra"])
         
         # Data Preview Tab
         with tab1:
@@ -99,10 +989,44 @@ def show():
                     "Polynomial",
                     "Exponential",
                     "Logarithmic",
-                    "Power"
+                    "Power",
+                    "Custom"
                 ]
             )
             
+            degree = 2
+            if regression_type == "Polynomial":
+                degree = st.slider("Polynomial Degree", 2, 5, 2)
+            
+            expression = None
+            guesses, guess_error = {}, None
+            if regression_type == "Custom":
+                model_col1, model_col2 = st.columns(2)
+                with model_col1:
+                    expression = st.text_input(
+                        "Model y(x)",
+                        value="a*exp(-b*x) + c",
+                        help="Use x as the variable; every other name is a fitted parameter. Available: exp, log, sqrt, sin, cos, tan, ^"
+                    ).strip()
+                with model_col2:
+                    guess_text = st.text_input("Initial Guesses (optional)", placeholder="a=10, b=0.1, c=0", help="Parameters not listed start at 1")
+                    try:
+                        guesses = parse_initial_guesses(guess_text)
+                    except ValueError as e:
+                        guess_error = str(e)
+                        st.error(f"❌ {guess_error}")
+
+            ci_col1, ci_col2, ci_col3 = st.columns(3)
+            with ci_col1:
+                show_ci = st.checkbox("Show Confidence & Prediction Bands")
+            with ci_col2:
+                ci_method = st.selectbox("Interval Method", ["Asymptotic", "Bootstrap"], disabled=not show_ci)
+            with ci_col3:
+                ci_level = st.select_slider("Confidence Level", [0.80, 0.90, 0.95, 0.99], value=0.95, disabled=not show_ci)
+            n_boot = 2000
+            if show_ci and ci_method == "Bootstrap":
+                n_boot = st.select_slider("Bootstrap Replicates", BOOTSTRAP_REPLICATES, value=2000)
+            
             try:
                 X = df[x_column].values
                 Y = df[y_column].values
@@ -116,89 +1040,48 @@ def show():
                     st.error("Insufficient valid data points")
                     return
                 
-                # Perform regression analysis
-                if regression_type == "Linear":
-                    # Linear regression
-                    slope, intercept, r_value, p_value, std_err = stats.linregress(X_clean, Y_clean)
-                    
-                    # Prediction values
-                    X_fit = np.linspace(X_clean.min(), X_clean.max(), 100)
-                    Y_fit = slope * X_fit + intercept
-                    
-                    equation = f"y = {slope:.4f}x + {intercept:.4f}"
-                    r_squared = r_value ** 2
-                
-                elif regression_type == "Polynomial":
-                    degree = st.slider("Polynomial Degree", 2, 5, 2)
-                    
-                    # Polynomial regression
-                    coeffs = np.polyfit(X_clean, Y_clean, degree)
-                    poly = np.poly1d(coeffs)
-                    
-                    X_fit = np.linspace(X_clean.min(), X_clean.max(), 100)
-                    Y_fit = poly(X_fit)
-                    
-                    # R-squared calculation
-                    Y_pred = poly(X_clean)
-                    ss_res = np.sum((Y_clean - Y_pred) ** 2)
-                    ss_tot = np.sum((Y_clean - np.mean(Y_clean)) ** 2)
-                    r_squared = 1 - (ss_res / ss_tot)
-                    
-                    equation = str(poly).replace('\n', '')
+                if regression_type == "Custom" and not expression:
+                    st.warning("Please enter a model expression")
+                    return
+                if guess_error:
+                    st.warning("⚠️ Fix the initial guesses to fit the model")
+                    return
                 
-                elif regression_type == "Exponential":
-                    # y = a * exp(b * x)
-                    def exp_func(x, a, b):
-                        return a * np.exp(b * x)
-                    
-                    popt, _ = curve_fit(exp_func, X_clean, Y_clean, p0=(1, 0.1))
-                    
-                    X_fit = np.linspace(X_clean.min(), X_clean.max(), 100)
-                    Y_fit = exp_func(X_fit, *popt)
-                    
-                    # R-squared
-                    Y_pred = exp_func(X_clean, *popt)
-                    ss_res = np.sum((Y_clean - Y_pred) ** 2)
-                    ss_tot = np.sum((Y_clean - np.mean(Y_clean)) ** 2)
-                    r_squared = 1 - (ss_res / ss_tot)
-                    
-                    equation = f"y = {popt[0]:.4f} * exp({popt[1]:.4f} * x)"
+                p0 = None
+                if regression_type == "Custom":
+                    p0 = tuple(guesses.get(name, 1.0) for name in compile_model(expression)["params"])
                 
-                elif regression_type == "Logarithmic":
-                    # y = a + b * log(x)
-                    X_log = np.log(X_clean[X_clean > 0])
-                    Y_log = Y_clean[X_clean > 0]
-                    
-                    slope, intercept, r_value, _, _ = stats.linregress(X_log, Y_log)
-                    
-                    X_fit = np.linspace(X_clean[X_clean > 0].min(), X_clean.max(), 100)
-                    Y_fit = intercept + slope * np.log(X_fit)
-                    
-                    r_squared = r_value ** 2
-                    equation = f"y = {intercept:.4f} + {slope:.4f} * log(x)"
+                # Perform regression analysis
+                fit = fit_regression(regression_type, X_clean, Y_clean, degree, p0, expression)
+                X_fit, Y_fit = fit["x_fit"], fit["y_fit"]
+                equation = fit["equation"]
+                r_squared = fit["r_squared"]
                 
-                else:  # Power
-                    # y = a * x^b
-                    X_power = X_clean[X_clean > 0]
-                    Y_power = Y_clean[X_clean > 0]
-                    
-                    log_x = np.log(X_power)
-                    log_y = np.log(Y_power)
-                    
-                    slope, intercept, r_value, _, _ = stats.linregress(log_x, log_y)
-                    
-                    a = np.exp(intercept)
-                    b = slope
-                    
-                    X_fit = np.linspace(X_power.min(), X_clean.max(), 100)
-                    Y_fit = a * X_fit ** b
-                    
-                    r_squared = r_value ** 2
-                    equation = f"y = {a:.4f} * x^{b:.4f}"
+                intervals = None
+                if show_ci:
+                    with st.spinner("Computing confidence intervals..."):
+                        intervals = confidence_intervals(regression_type, X_clean, Y_clean, degree, ci_method, ci_level, n_boot, p0, expression)
                 
                 # Plotly Plot
                 fig = go.Figure()
                 
+                # Confidence / prediction bands (drawn first so data stays on top)
+                if intervals is not None:
+                    for band, name, color in [
+                        ("pred_band", f"{ci_level:.0%} Prediction Band", 'rgba(157, 78, 221, 0.15)'),
+                        ("conf_band", f"{ci_level:.0%} Confidence Band", 'rgba(6, 255, 165, 0.25)'),
+                    ]:
+                        lower, upper = intervals[band]
+                        fig.add_trace(go.Scatter(
+                            x=np.concatenate([X_fit, X_fit[::-1]]),
+                            y=np.concatenate([upper, lower[::-1]]),
+                            fill='toself',
+                            fillcolor=color,
+                            line=dict(width=0),
+                            hoverinfo='skip',
+                            name=name
+                        ))
+                
                 # Original Data
                 fig.add_trace(go.Scatter(
                     x=X_clean,
@@ -249,13 +1132,28 @@ def show():
                 else:
                     st.error("❌ Weak correlation (R² < 0.5)")
                 
+                # Parameter Confidence Intervals
+                if intervals is not None:
+                    st.markdown(f"##### 📐 Parameter Estimates ({ci_level:.0%} {ci_method} CI)")
+                    st.dataframe(pd.DataFrame({
+                        "Parameter": parameter_names(regression_type, degree, expression),
+                        "Estimate": _natural_params(regression_type, fit["params"]),
+                        "Std. Error": intervals["std_err"],
+                        "Lower": intervals["lower"],
+                        "Upper": intervals["upper"],
+                    }), use_container_width=True, hide_index=True)
+                    if regression_type == "Power":
+                        st.caption("Std. Error of `a` is reported on the log scale (the Power model is fitted as log y = log a + b·log x).")
+                    if ci_method == "Bootstrap":
+                        st.caption(f"{intervals['n_valid']:,} of {n_boot:,} bootstrap refits converged.")
+                
                 # Residual Plot
                 if st.checkbox("Show Residual Plot"):
-                    residuals = Y_clean - (slope * X_clean + intercept if regression_type == "Linear" else Y_pred)
+                    residuals = fit["y"] - fit["y_pred"]
                     
                     fig_residuals = go.Figure()
                     fig_residuals.add_trace(go.Scatter(
-                        x=X_clean,
+                        x=fit["x"],
                         y=residuals,
                         mode='markers',
                         name='Residuals',
@@ -281,37 +1179,87 @@ def show():
         with tab2:
             st.markdown("#### 📊 Statistical Analysis")
             
-            selected_columns = st.multiselect(
-                "Select Columns to Analyze",
-                df.columns,
-                default=list(df.columns[:min(3, len(df.columns))])
-            )
+            numeric_columns = list(df.select_dtypes(include='number').columns)
+            
+            use_all = st.checkbox(f"Use all numeric columns ({len(numeric_columns)})")
+            if use_all:
+                selected_columns = numeric_columns
+            else:
+                selected_columns = st.multiselect(
+                    "Select Columns to Analyze",
+                    df.columns,
+                    default=list(df.columns[:min(3, len(df.columns))])
+                )
             
             if selected_columns:
                 # Correlation Matrix
                 st.markdown("##### 📈 Correlation Matrix")
                 
-                corr_matrix = df[selected_columns].corr()
-                
-                fig_corr = go.Figure(data=go.Heatmap(
-                    z=corr_matrix.values,
-                    x=corr_matrix.columns,
-                    y=corr_matrix.columns,
-                    colorscale='RdBu',
-                    zmid=0,
-                    text=corr_matrix.values.round(3),
-                    texttemplate='%{text}',
-                    textfont={"size": 10},
-                    colorbar=dict(title="Correlation")
-                ))
+                corr_columns = [c for c in selected_columns if c in numeric_columns]
+                skipped = len(selected_columns) - len(corr_columns)
+                if skipped:
+                    st.caption(f"{skipped} non-numeric column(s) excluded from the correlation matrix.")
                 
-                fig_corr.update_layout(
-                    title="Pearson Correlation Coefficient",
-                    template="plotly_dark",
-                    height=500
-                )
+                opt_col1, opt_col2 = st.columns(2)
+                with opt_col1:
+                    corr_method = st.radio("Method", ["Pearson", "Spearman"], horizontal=True)
+                with opt_col2:
+                    clustered = st.checkbox("Order by hierarchical clustering", value=len(corr_columns) > 3)
                 
-                st.plotly_chart(fig_corr, use_container_width=True)
+                if len(corr_columns) >= 2:
+                    corr_data = df[corr_columns]
+                    analysis = correlation_analysis(frame_digest(corr_data), tuple(corr_columns), corr_data.to_numpy(dtype=float))
+                    corr, order = analysis[corr_method]
+                    if not clustered:
+                        order = np.arange(len(corr_columns))
+                    
+                    corr = corr[np.ix_(order, order)]
+                    labels = [corr_columns[i] for i in order]
+                    
+                    if len(labels) <= CORRELATION_ANNOTATION_LIMIT:
+                        fig_corr = go.Figure(data=go.Heatmap(
+                            z=corr,
+                            x=labels,
+                            y=labels,
+                            colorscale='RdBu',
+                            zmid=0,
+                            text=corr.round(3),
+                            texttemplate='%{text}',
+                            textfont={"size": 10},
+                            colorbar=dict(title="Correlation")
+                        ))
+                    else:
+                        # Wide tables: a single PNG instead of one annotated cell per pair
+                        fig_corr = px.imshow(_correlation_image(corr), binary_string=True)
+                        step = -(-len(labels) // CORRELATION_TICK_LIMIT)
+                        ticks = dict(tickmode='array', tickvals=list(range(0, len(labels), step)),
+                                     ticktext=labels[::step], tickfont={"size": 9})
+                        fig_corr.update_xaxes(tickangle=-60, **ticks)
+                        fig_corr.update_yaxes(**ticks)
+                    
+                    fig_corr.update_layout(
+                        title=f"{corr_method} Correlation Coefficient",
+                        template="plotly_dark",
+                        height=500 if len(labels) <= CORRELATION_ANNOTATION_LIMIT else 700
+                    )
+                    
+                    st.plotly_chart(fig_corr, use_container_width=True)
+                    
+                    if len(labels) > CORRELATION_ANNOTATION_LIMIT:
+                        thinned = f" (1 in {step} labelled)" if step > 1 else ""
+                        st.caption(f"{len(labels)} columns{thinned} · blue = -1, white = 0, red = +1, grey = undefined")
+                        with st.expander("🔍 Look Up a Pair"):
+                            pair_col1, pair_col2 = st.columns(2)
+                            with pair_col1:
+                                first = st.selectbox("First Column", range(len(labels)), format_func=labels.__getitem__, key="corr_pair_first")
+                            with pair_col2:
+                                second = st.selectbox("Second Column", range(len(labels)), index=1, format_func=labels.__getitem__, key="corr_pair_second")
+                            r = corr[first, second]
+                            st.metric(f"{corr_method} r", "undefined" if np.isnan(r) else f"{r:.3f}")
+                        with st.expander("🔗 Strongest Correlations"):
+                            st.dataframe(strongest_pairs(corr, labels), use_container_width=True, hide_index=True)
+                else:
+                    st.info("Select at least two numeric columns for a correlation matrix.")
                 
                 # Histogram
                 st.markdown("##### 📊 Distribution Histogram")
@@ -334,6 +1282,185 @@ def show():
                 )
                 
                 st.plotly_chart(fig_hist, use_container_width=True)
+        
+        # Kinetics Tab
+        with tab3:
+            st.markdown("#### ⏱️ Reaction Kinetics")
+            st.caption("Long-format data: one row per measurement, with an optional run identifier and temperature.")
+            
+            none_option = "(none)"
+            kcol1, kcol2 = st.columns(2)
+            with kcol1:
+                time_column = st.selectbox("Time Column", df.columns, index=0, key="kin_time")
+                run_column = st.selectbox("Run Column", [none_option] + list(df.columns), key="kin_run")
+            with kcol2:
+                conc_column = st.selectbox("Concentration Column", df.columns, index=min(1, len(df.columns)-1), key="kin_conc")
+                temp_column = st.selectbox("Temperature Column", [none_option] + list(df.columns), key="kin_temp")
+            
+            kcol3, kcol4 = st.columns(2)
+            with kcol3:
+                law_choice = st.selectbox("Rate Law", list(RATE_LAWS) + ["Custom"], index=1)
+                if law_choice == "Custom":
+                    law = st.text_input(
+                        "Integrated Rate Law C(t)",
+                        value="C0/(1 + k*C0*t)**2",
+                        help="Use t (time), C0 (initial concentration) and k (rate constant)"
+                    )
+                else:
+                    law = law_choice
+            with kcol4:
+                fit_modes = ["Global (shared k)", "Independent runs"]
+                if temp_column != none_option:
+                    fit_modes.insert(1, "Global (Arrhenius: shared A, Ea)")
+                fit_mode = st.selectbox("Fitting Mode", fit_modes)
+                temp_unit = st.radio("Temperature Unit", ["°C", "K"], horizontal=True) if temp_column != none_option else "K"
+            
+            if law and st.button("⚙️ Fit Kinetics", use_container_width=True):
+                try:
+                    columns = [time_column, conc_column] + [c for c in (run_column, temp_column) if c != none_option]
+                    kin_df = df[list(dict.fromkeys(columns))].dropna()
+                    group_key = kin_df[run_column] if run_column != none_option else np.zeros(len(kin_df))
+                    groups = [g for _, g in kin_df.groupby(group_key, sort=True)]
+                    run_labels = [str(g[run_column].iloc[0]) if run_column != none_option else "Run 1" for g in groups]
+                    runs = [(g[time_column].to_numpy(dtype=float), g[conc_column].to_numpy(dtype=float)) for g in groups]
+                    
+                    temperatures = None
+                    if temp_column != none_option:
+                        temperatures = np.array([g[temp_column].astype(float).mean() for g in groups])
+                        if temp_unit == "°C":
+                            temperatures = temperatures + 273.15
+                    
+                    with st.spinner(f"Fitting {len(runs)} run(s)..."):
+                        if fit_mode == "Independent runs":
+                            kin = fit_kinetics_runs(law, runs)
+                        elif fit_mode.startswith("Global (Arrhenius"):
+                            kin = fit_kinetics_global(law, runs, temperatures)
+                        else:
+                            kin = fit_kinetics_global(law, runs)
+                    
+                    # Shared parameters
+                    if "Ea" in kin:
+                        mcol1, mcol2 = st.columns(2)
+                        mcol1.metric("Activation Energy Ea", f"{kin['Ea']:.2f} ± {kin['Ea_err']:.2f} kJ/mol")
+                        mcol2.metric("Pre-exponential Factor A", f"{np.exp(kin['lnA']):.4g}", help=f"ln A = {kin['lnA']:.3f} ± {kin['lnA_err']:.3f}")
+                    elif "k_shared" in kin:
+                        st.metric("Shared Rate Constant k", f"{kin['k_shared']:.5g} ± {kin['k_err']:.2g}")
+                    
+                    run_table = pd.DataFrame({"Run": run_labels, "C0": kin["C0"], "C0 Std. Error": kin["C0_err"], "k": kin["k"]})
+                    if "k_err" in kin and np.ndim(kin["k_err"]):
+                        run_table["k Std. Error"] = kin["k_err"]
+                    if temperatures is not None:
+                        run_table.insert(1, "T (K)", temperatures)
+                    st.dataframe(run_table, use_container_width=True, hide_index=True)
+                    st.caption(f"Residual sum of squares: {kin['rss']:.4g}")
+                    
+                    # Data and fitted curves per run
+                    fig_kin = go.Figure()
+                    colors = px.colors.qualitative.Plotly
+                    for i, ((t, c), label) in enumerate(zip(runs, run_labels)):
+                        color = colors[i % len(colors)]
+                        t_curve = np.linspace(0, t.max(), 200)
+                        fig_kin.add_trace(go.Scatter(x=t, y=c, mode='markers', name=label, legendgroup=label, marker=dict(size=7, color=color)))
+                        fig_kin.add_trace(go.Scatter(
+                            x=t_curve,
+                            y=predict_kinetics(law, t_curve, kin["C0"][i], kin["k"][i]),
+                            mode='lines', legendgroup=label, showlegend=False, line=dict(color=color, width=2)
+                        ))
+                    fig_kin.update_layout(
+                        title=f"{law_choice} Kinetics ({fit_mode})",
+                        xaxis_title=time_column,
+                        yaxis_title=conc_column,
+                        template="plotly_dark",
+                        height=500
+                    )
+                    st.plotly_chart(fig_kin, use_container_width=True)
+                
+                except Exception as e:
+                    st.error(f"❌ Kinetics fitting error: {str(e)}")
+        
+        # Spectra Tab
+        with tab4:
+            st.markdown("#### 🌈 Spectral Processing")
+            st.caption("Wide-format data: one spectral axis column (wavelength, wavenumber or ppm) and one column per spectrum.")
+            
+            numeric_columns = list(df.select_dtypes(include='number').columns)
+            
+            if len(numeric_columns) < 2:
+                st.info("At least two numeric columns (axis + one spectrum) are required.")
+            else:
+                axis_column = st.selectbox("Spectral Axis Column", numeric_columns, index=0, key="spec_axis")
+                candidates = [c for c in numeric_columns if c != axis_column]
+                spectrum_columns = st.multiselect("Spectra", candidates, default=candidates, key="spec_cols")
+                
+                scol1, scol2, scol3 = st.columns(3)
+                with scol1:
+                    sg_window = st.slider("Savitzky–Golay Window", 5, 101, 11, step=2)
+                    sg_order = st.slider("Polynomial Order", 1, 5, 3)
+                with scol2:
+                    als_log_lambda = st.slider("Baseline Stiffness log₁₀(λ)", 2.0, 16.0, 5.0, step=0.5, help="Longer spectra need a stiffer baseline (λ grows roughly with the fourth power of the point count)")
+                    als_p = st.select_slider("Baseline Asymmetry p", [0.001, 0.005, 0.01, 0.05, 0.1], value=0.01)
+                with scol3:
+                    peak_prominence = st.slider("Peak Prominence (fraction of range)", 0.01, 0.5, 0.05)
+                    peak_shape = st.selectbox("Peak Shape", list(PEAK_SHAPES) + ["None (detect only)"])
+                
+                if spectrum_columns:
+                    try:
+                        spec_df = df[[axis_column] + spectrum_columns].dropna()
+                        with st.spinner(f"Processing {len(spectrum_columns)} spectra..."):
+                            spectra = processed_spectra(
+                                frame_digest(spec_df), sg_window, sg_order, 10 ** als_log_lambda, als_p, peak_prominence, peak_shape,
+                                spec_df[axis_column].to_numpy(dtype=float),
+                                spec_df[spectrum_columns].to_numpy(dtype=float).T
+                            )
+                        
+                        timing_cols = st.columns(len(spectra["timings"]))
+                        for col, (stage, seconds) in zip(timing_cols, spectra["timings"].items()):
+                            col.metric(stage, f"{seconds * 1000:.1f} ms")
+                        
+                        shown = st.selectbox("Spectrum to Display", spectrum_columns, key="spec_shown")
+                        i = spectrum_columns.index(shown)
+                        x_axis = spectra["x"]
+                        
+                        fig_spec = go.Figure()
+                        for trace, name, color in [
+                            (spectra["raw"][i], "Raw", '#4A9EFF'),
+                            (spectra["baseline"][i], "Baseline", '#FFB703'),
+                            (spectra["corrected"][i], "Corrected", '#06FFA5'),
+                        ]:
+                            xd, yd = decimate_for_display(x_axis, trace)
+                            fig_spec.add_trace(go.Scattergl(x=xd, y=yd, mode='lines', name=name, line=dict(color=color, width=1.5)))
+                        
+                        fit = spectra["fits"][i]
+                        if fit is not None:
+                            xd, _ = decimate_for_display(x_axis, spectra["corrected"][i])
+                            fig_spec.add_trace(go.Scattergl(
+                                x=xd, y=PEAK_SHAPES[peak_shape](xd, fit["params"])[0],
+                                mode='lines', name=f"{peak_shape} Fit", line=dict(color='#9D4EDD', width=2, dash='dash')
+                            ))
+                        
+                        peaks = spectra["peaks"][i]
+                        fig_spec.add_trace(go.Scatter(
+                            x=peaks["position"], y=peaks["height"],
+                            mode='markers', name='Peaks', marker=dict(size=9, color='#FF006E', symbol='triangle-down')
+                        ))
+                        
+                        fig_spec.update_layout(
+                            title=f"{shown} ({len(x_axis):,} points)",
+                            xaxis_title=axis_column,
+                            yaxis_title="Intensity",
+                            template="plotly_dark",
+                            height=500
+                        )
+                        st.plotly_chart(fig_spec, use_container_width=True)
+                        
+                        if fit is not None:
+                            peak_table = pd.DataFrame({"Center": fit["center"], "Amplitude": fit["amplitude"], "FWHM": fit["fwhm"], "Area": fit["area"]})
+                        else:
+                            peak_table = pd.DataFrame({"Position": peaks["position"], "Height": peaks["height"], "FWHM": peaks["fwhm"]})
+                        st.dataframe(peak_table.sort_values(peak_table.columns[0]), use_container_width=True, hide_index=True)
+                    
+                    except Exception as e:
+                        st.error(f"❌ Spectral processing error: {str(e)}")
     
     else:
         st.info("👆 Upload a data file or use sample data")
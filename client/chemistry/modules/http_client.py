@@ -0,0 +1,237 @@
+"""
+HTTP Client Module
+Shared HTTP layer for PubChem and RCSB requests
+
+Features:
+- One keep-alive connection pool per process (requests.Session + pooled adapter)
+- Per-host token-bucket rate limiting (PubChem: 5 requests/s, as its usage policy asks)
+- Retries with exponential backoff and full jitter; Retry-After is honoured
+- Identical in-flight GETs coalesced into one request
+- Per-host latency, retry, throttle and error metrics
+- Host overrides (CHEMLAB_HTTP_OVERRIDES) to point everything at a local stand-in server
+- Pluggable transport: record/replay fixtures with injected latency and errors
+  (CHEMLAB_HTTP_TRANSPORT, see http_replay.py)
+"""
+
+import os
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import Future
+from urllib.parse import urlsplit, urlunsplit
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+from .http_replay import ReplayAdapter, ReplayMiss, transport_from_env
+
+DEFAULT_TIMEOUT = (5, 30)  # (connect, read) seconds
+POOL_CONNECTIONS = 8
+POOL_MAXSIZE = 16
+
+# host: (requests per second, burst)
+HOST_LIMITS = {
+    "pubchem.ncbi.nlm.nih.gov": (5.0, 5),
+    "files.rcsb.org": (10.0, 10),
+}
+DEFAULT_LIMIT = (10.0, 10)
+
+MAX_RETRIES = 4
+BACKOFF_BASE = 0.5  # seconds; attempt n waits up to BACKOFF_BASE * 2**n
+BACKOFF_CAP = 20.0
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# Latency samples kept per host for the percentiles in stats()
+LATENCY_SAMPLES = 500
+
+USER_AGENT = "chemlab/1.0 (+https://pubchem.ncbi.nlm.nih.gov/docs/programmatic-access)"
+
+
+def parse_overrides(text):
+    """ "host=http://127.0.0.1:8000,host2=..." -> {host: (scheme, netloc)} """
+    overrides = {}
+    for item in filter(None, (part.strip() for part in (text or "").split(","))):
+        host, _, target = item.partition("=")
+        target = urlsplit(target)
+        overrides[host.strip()] = (target.scheme, target.netloc)
+    return overrides
+
+
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a token is available"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token; returns the seconds spent waiting"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Reserve the token now (possibly going negative) and sleep outside the lock,
+            # so waiting callers queue up in arrival order
+            self._tokens -= 1.0
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class HostMetrics:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.coalesced = 0
+        self.throttled_seconds = 0.0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+
+class HttpClient:
+    """Pooled, rate-limited, retrying HTTP client shared by every session of the app process"""
+
+    def __init__(self, limits=None, overrides=None, timeout=DEFAULT_TIMEOUT, max_retries=MAX_RETRIES,
+                 backoff_base=BACKOFF_BASE, backoff_cap=BACKOFF_CAP, transport=None):
+        self.limits = dict(HOST_LIMITS if limits is None else limits)
+        self.overrides = parse_overrides(os.environ.get("CHEMLAB_HTTP_OVERRIDES")) if overrides is None else overrides
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = USER_AGENT
+        # Retries are handled here, where they can be rate limited and counted
+        pool = {"pool_connections": POOL_CONNECTIONS, "pool_maxsize": POOL_MAXSIZE, "max_retries": 0}
+        adapter = transport or transport_from_env(**pool) or HTTPAdapter(**pool)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.transport = adapter if isinstance(adapter, ReplayAdapter) else None
+        self._buckets = {}
+        self._metrics = defaultdict(HostMetrics)
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, host):
+        with self._lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(*self.limits.get(host, DEFAULT_LIMIT))
+            return self._buckets[host]
+
+    def _resolve(self, url):
+        """URL actually requested, after host overrides"""
+        parts = urlsplit(url)
+        if parts.hostname in self.overrides:
+            scheme, netloc = self.overrides[parts.hostname]
+            return urlunsplit((scheme, netloc, parts.path, parts.query, parts.fragment))
+        return url
+
+    def _backoff(self, attempt, response=None):
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.backoff_cap)
+        # Full jitter: clients that failed together do not retry together
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    def _send(self, method, url, **kwargs):
+        host = urlsplit(url).hostname
+        metrics = self._metrics[host]
+        bucket = self._bucket(host)
+        kwargs.setdefault("timeout", self.timeout)
+        target = self._resolve(url)
+        for attempt in range(self.max_retries + 1):
+            metrics.throttled_seconds += bucket.acquire()
+            metrics.requests += 1
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, target, **kwargs)
+            except ReplayMiss:
+                # Asking again cannot find a recording
+                metrics.errors += 1
+                raise
+            except (requests.ConnectionError, requests.Timeout):
+                metrics.errors += 1
+                if attempt == self.max_retries:
+                    raise
+                metrics.retries += 1
+                time.sleep(self._backoff(attempt))
+                continue
+            metrics.latencies.append(time.perf_counter() - started)
+            if response.status_code in RETRY_STATUS and attempt < self.max_retries:
+                metrics.retries += 1
+                time.sleep(self._backoff(attempt, response))
+                continue
+            if response.status_code >= 400:
+                metrics.errors += 1
+            return response
+
+    def request(self, method, url, **kwargs):
+        """
+        Send a request through the shared pool. Throttling, retries and backoff happen here;
+        the final response is returned whatever its status (check it with raise_for_status).
+        """
+        method = method.upper()
+        if method != "GET" or kwargs.get("stream"):
+            return self._send(method, url, **kwargs)
+
+        # Identical GETs already in flight share their response
+        key = (url, repr(sorted((kwargs.get("params") or {}).items())), repr(sorted((kwargs.get("headers") or {}).items())))
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+        if not leader:
+            self._metrics[urlsplit(url).hostname].coalesced += 1
+            return future.result()
+        try:
+            response = self._send(method, url, **kwargs)
+            future.set_result(response)
+            return response
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def stats(self):
+        """Per-host request counts, retries, coalesced calls, throttle time and latency percentiles (ms)"""
+        rows = {}
+        for host, m in list(self._metrics.items()):
+            latencies = np.array(m.latencies) * 1000.0
+            rows[host] = {
+                "requests": m.requests,
+                "errors": m.errors,
+                "retries": m.retries,
+                "coalesced": m.coalesced,
+                "throttled_s": round(m.throttled_seconds, 3),
+                "p50_ms": float(np.percentile(latencies, 50)) if len(latencies) else None,
+                "p95_ms": float(np.percentile(latencies, 95)) if len(latencies) else None,
+            }
+        return rows
+
+
+_default_client = None
+_default_client_guard = threading.Lock()
+
+
+def get_client():
+    """Process-wide client, so every session shares one pool and one rate limit per host"""
+    global _default_client
+    with _default_client_guard:
+        if _default_client is None:
+            _default_client = HttpClient()
+        return _default_client
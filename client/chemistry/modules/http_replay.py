@@ -0,0 +1,229 @@
+"""
+HTTP Replay Module
+Record/replay transport for the shared HTTP client (PubChem, RCSB)
+
+Features:
+- Record mode: real responses are passed through and saved to a fixture directory
+- Replay mode: responses served from the fixtures only, no network needed; an unrecorded
+  request fails like an unreachable server, never like a resource that does not exist
+- Auto mode: replay what is recorded, record what is not
+- Injected latency with jitter, and errors (HTTP status or dropped connection) at a set rate
+- Latency longer than the request's read timeout raises a timeout, as a slow server would
+- Seeded, so a benchmark run is repeatable
+- Configured with CHEMLAB_HTTP_TRANSPORT, e.g.
+  "mode=replay,fixtures=/data/chemlab-fixtures,latency=0.25,jitter=0.1,error_rate=0.05,seed=1"
+"""
+
+import base64
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+MODES = ("record", "replay", "auto")
+FIXTURE_DIR = os.path.join(os.path.expanduser("~"), ".chemlab", "http_fixtures")
+FIXTURE_FORMAT = "chemlab-http-fixture/1"
+
+# Response headers worth keeping in a fixture (the rest describe the original connection)
+KEPT_HEADERS = ("Content-Type", "Retry-After", "Last-Modified", "ETag")
+
+# Responses not worth recording: transient failures would be replayed as permanent ones
+TRANSIENT_STATUS = {429, 500, 502, 503, 504}
+
+# Status of an injected HTTP error (the client retries it like a real one)
+ERROR_STATUS = 503
+
+
+def parse_transport(text):
+    """ "mode=replay,fixtures=DIR,latency=0.2,..." -> ReplayAdapter keyword arguments """
+    options = {}
+    for item in filter(None, (part.strip() for part in (text or "").split(","))):
+        name, _, value = item.partition("=")
+        name, value = name.strip(), value.strip()
+        if name == "mode":
+            options[name] = value
+        elif name == "fixtures":
+            options[name] = os.path.expanduser(value)
+        elif name in ("seed", "error_status"):
+            options[name] = int(value)
+        else:
+            options[name] = float(value)
+    return options
+
+
+def request_key(method, url, body=None):
+    """Fixture key of a request: method, URL with sorted query parameters, and a body digest"""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    normalized = urlunsplit((parts.scheme, parts.netloc, parts.path, query, ""))
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    digest = hashlib.sha256(body or b"").hexdigest()
+    return hashlib.sha256(f"{method.upper()} {normalized} {digest}".encode("utf-8")).hexdigest()[:24]
+
+
+class ReplayMiss(requests.ConnectionError):
+    """
+    Replay-mode request with no recorded response. A ConnectionError, so callers take their
+    offline path (stored copy or error) instead of caching a "not found" that PubChem or RCSB never said.
+    """
+
+
+class FixtureStore:
+    """Recorded responses, one JSON file per request under <root>/<host>/"""
+
+    def __init__(self, root=FIXTURE_DIR):
+        self.root = root
+
+    def _path(self, host, key):
+        return os.path.join(self.root, host or "_", f"{key}.json")
+
+    def get(self, host, key):
+        path = self._path(host, key)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            fixture = json.load(f)
+        return fixture if fixture.get("format") == FIXTURE_FORMAT else None
+
+    def put(self, host, key, method, url, response):
+        path = self._path(host, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fixture = {
+            "format": FIXTURE_FORMAT,
+            "method": method,
+            "url": url,
+            "status": response.status_code,
+            "reason": response.reason,
+            "headers": {name: response.headers[name] for name in KEPT_HEADERS if name in response.headers},
+            "body": base64.b64encode(response.content).decode("ascii"),
+            "recorded_at": time.time(),
+        }
+        # Written whole, then renamed, so a concurrent replay never reads half a fixture
+        partial = f"{path}.{threading.get_ident()}.part"
+        with open(partial, "w", encoding="utf-8") as f:
+            json.dump(fixture, f, indent=1)
+        os.replace(partial, path)
+
+    def stats(self):
+        """{host: fixture count}"""
+        if not os.path.isdir(self.root):
+            return {}
+        return {
+            host: sum(name.endswith(".json") for name in os.listdir(os.path.join(self.root, host)))
+            for host in sorted(os.listdir(self.root)) if os.path.isdir(os.path.join(self.root, host))
+        }
+
+
+class ReplayAdapter(HTTPAdapter):
+    """
+    Transport adapter mounted on the client's session in place of the plain pooled one.
+    Replay misses raise ReplayMiss.
+    """
+
+    def __init__(self, mode="replay", fixtures=FIXTURE_DIR, latency=0.0, jitter=0.0, error_rate=0.0,
+                 drop_rate=0.0, error_status=ERROR_STATUS, seed=None, **kwargs):
+        if mode not in MODES:
+            raise ValueError(f"Unknown transport mode '{mode}' (expected one of {', '.join(MODES)})")
+        super().__init__(**kwargs)
+        self.mode = mode
+        self.fixtures = FixtureStore(fixtures)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.error_status = error_status
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+        self.injected = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _draw(self):
+        """(delay, fault) of one request; fault is None, "error" or "drop" """
+        with self._lock:
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            roll = self._random.random()
+        fault = "drop" if roll < self.drop_rate else "error" if roll < self.drop_rate + self.error_rate else None
+        return delay, fault
+
+    def _wait(self, delay, timeout, request):
+        """Sleep the injected latency, or raise the timeout it would have caused"""
+        read_timeout = timeout[1] if isinstance(timeout, tuple) else timeout
+        if read_timeout is not None and delay > read_timeout:
+            time.sleep(read_timeout)
+            raise requests.ReadTimeout(f"Injected latency {delay:.2f}s exceeds the {read_timeout}s read timeout",
+                                       request=request)
+        time.sleep(delay)
+
+    def _response(self, request, status, content, headers=None, reason=None):
+        response = requests.Response()
+        response.status_code = status
+        response.reason = reason or ("OK" if status < 400 else "Error")
+        response.headers = CaseInsensitiveDict(headers or {})
+        response._content = content
+        response._content_consumed = True
+        response.url = request.url
+        response.request = request
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        return response
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        host = urlsplit(request.url).hostname
+        key = request_key(request.method, request.url, request.body)
+        delay, fault = self._draw()
+
+        fixture = self.fixtures.get(host, key) if self.mode != "record" else None
+        if fixture is None and self.mode != "replay":
+            # Recording: the real round trip is the latency; nothing is injected
+            response = super().send(request, stream=False, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
+            if response.status_code not in TRANSIENT_STATUS:
+                self.fixtures.put(host, key, request.method, request.url, response)
+                with self._lock:
+                    self.recorded += 1
+            return response
+
+        self._wait(delay, timeout, request)
+        if fault:
+            with self._lock:
+                self.injected += 1
+            if fault == "drop":
+                raise requests.ConnectionError("Injected connection failure", request=request)
+            return self._response(request, self.error_status, b"", {"Retry-After": "0"})
+        with self._lock:
+            if fixture is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if fixture is None:
+            raise ReplayMiss(f"No recorded response for {request.method} {request.url}", request=request)
+        return self._response(
+            request, fixture["status"], base64.b64decode(fixture["body"]), fixture["headers"], fixture["reason"]
+        )
+
+    def stats(self):
+        return {"mode": self.mode, "hits": self.hits, "misses": self.misses, "recorded": self.recorded,
+                "injected_faults": self.injected, "fixtures": self.fixtures.stats()}
+
+
+def transport_from_env(**adapter_kwargs):
+    """ReplayAdapter configured by CHEMLAB_HTTP_TRANSPORT, or None when it is not set"""
+    options = parse_transport(os.environ.get("CHEMLAB_HTTP_TRANSPORT"))
+    if not options:
+        return None
+    return ReplayAdapter(**options, **adapter_kwargs)
+
+
+if __name__ == '__main__':
+    # python -m modules.http_replay [fixture dir]: recorded responses per host
+    for host, count in FixtureStore(sys.argv[1] if len(sys.argv) > 1 else FIXTURE_DIR).stats().items():
+        print(f"{host}: {count} fixtures")
@@ -0,0 +1,201 @@
+"""
+Name Index Module
+Local name / synonym / CAS resolution for the chemical search box
+
+Features:
+- Character trie with the best suggestions precomputed per node (prefix lookups in O(prefix))
+- Every word of a name is a trie entry too ("sulfate" finds "Copper(II) sulfate")
+- Trigram index for typo-tolerant matches (Dice similarity)
+- Built from the compound store and a bundled reagent dictionary (compound_bundle/names.tsv)
+- Updated as compounds enter the store
+- CAS numbers validated by their check digit
+"""
+
+import os
+import re
+import threading
+from collections import Counter
+
+from .compound_store import BUNDLE_PATH, get_compound_store, is_cas, name_key
+
+DICTIONARY_PATH = os.path.join(os.path.dirname(BUNDLE_PATH), "names.tsv")
+
+SUGGESTIONS = 8
+# Synonyms of a stored compound that are offered as suggestions (PubChem lists hundreds)
+INDEXED_SYNONYMS = 20
+# Trigram matches below this Dice similarity are not suggested
+MIN_SIMILARITY = 0.35
+
+# Entry weights: stored compounds rank above dictionary-only names, titles above synonyms
+TITLE_WEIGHT = 3.0
+SYNONYM_WEIGHT = 2.0
+DICTIONARY_WEIGHT = 1.0
+
+_WORD_START = re.compile(r"(?<=[\s,\-(])(?=\w)")
+
+
+def cas_check_digit_ok(text):
+    """True for a well-formed CAS Registry Number whose check digit matches"""
+    text = (text or "").strip()
+    if not is_cas(text):
+        return False
+    digits = text.replace("-", "")
+    total = sum((i + 1) * int(d) for i, d in enumerate(reversed(digits[:-1])))
+    return total % 10 == int(digits[-1])
+
+
+def trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _Node:
+    __slots__ = ("children", "top")
+
+    def __init__(self):
+        self.children = {}
+        self.top = []
+
+
+class NameIndex:
+    """
+    Suggestion index over names. Each entry is (name, cid or None, cas or None, weight);
+    an entry is reachable from its name, every word of it, and its CAS number.
+    """
+
+    def __init__(self, limit=SUGGESTIONS):
+        self.limit = limit
+        self._entries = []
+        self._by_key = {}
+        self._root = _Node()
+        self._grams = {}
+        self._gram_counts = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _offer(self, node, entry_id):
+        top = node.top
+        if entry_id not in top:
+            top.append(entry_id)
+        top.sort(key=lambda i: -self._entries[i][3])
+        del top[self.limit:]
+
+    def _insert(self, key, entry_id):
+        node = self._root
+        for ch in key:
+            node = node.children.setdefault(ch, _Node())
+            self._offer(node, entry_id)
+
+    def add(self, name, cid=None, cas=None, weight=DICTIONARY_WEIGHT):
+        """Add a name; an existing name keeps the higher weight and gains a CID/CAS it lacked"""
+        key = name_key(name)
+        if not key:
+            return
+        with self._lock:
+            entry_id = self._by_key.get(key)
+            if entry_id is not None:
+                old = self._entries[entry_id]
+                if weight <= old[3] and (old[1] or cid is None):
+                    return
+                self._entries[entry_id] = (old[0], old[1] or cid, old[2] or cas, max(weight, old[3]))
+            else:
+                entry_id = len(self._entries)
+                self._entries.append((name, cid, cas, weight))
+                self._by_key[key] = entry_id
+                grams = trigrams(key)
+                self._gram_counts.append(len(grams))
+                for gram in grams:
+                    self._grams.setdefault(gram, []).append(entry_id)
+            keys = {key[m.start():] for m in _WORD_START.finditer(key)} | {key}
+            if cas:
+                keys.add(name_key(cas))
+                self._by_key.setdefault(name_key(cas), entry_id)
+            for k in keys:
+                self._insert(k, entry_id)
+
+    def add_compound(self, cid, properties, synonyms):
+        """Index a stored compound: its title, first synonyms and CAS number"""
+        cas = next((s for s in synonyms if cas_check_digit_ok(s)), None)
+        names = [s for s in synonyms[:INDEXED_SYNONYMS] if not is_cas(s)]
+        title = names[0] if names else properties.get("IUPACName")
+        if title:
+            self.add(title, cid, cas, TITLE_WEIGHT)
+        for rank, name in enumerate(names[1:]):
+            self.add(name, cid, cas, SYNONYM_WEIGHT - rank / INDEXED_SYNONYMS)
+
+    def _row(self, entry_id, match, score):
+        name, cid, cas, _ = self._entries[entry_id]
+        return {"name": name, "cid": cid, "cas": cas, "match": match, "score": score}
+
+    def exact(self, text):
+        """The entry whose name or CAS number is exactly text (case and spacing ignored), or None"""
+        entry_id = self._by_key.get(name_key(text))
+        return self._row(entry_id, "exact", 1.0) if entry_id is not None else None
+
+    def prefix(self, text, limit=None):
+        node = self._root
+        for ch in name_key(text):
+            node = node.children.get(ch)
+            if node is None:
+                return []
+        return [self._row(i, "prefix", 1.0) for i in node.top[:limit or self.limit]]
+
+    def fuzzy(self, text, limit=None, min_similarity=MIN_SIMILARITY):
+        """Entries ranked by trigram Dice similarity to text"""
+        key = name_key(text)
+        grams = trigrams(key)
+        if len(key) < 3:
+            return []
+        counts = Counter()
+        for gram in grams:
+            counts.update(self._grams.get(gram, ()))
+        scored = []
+        for entry_id, common in counts.items():
+            score = 2.0 * common / (len(grams) + self._gram_counts[entry_id])
+            if score >= min_similarity:
+                scored.append((score, self._entries[entry_id][3], entry_id))
+        scored.sort(reverse=True)
+        return [self._row(i, "fuzzy", round(s, 3)) for s, _, i in scored[:limit or self.limit]]
+
+    def suggest(self, text, limit=None):
+        """Prefix matches first, then fuzzy ones; one suggestion per compound"""
+        limit = limit or self.limit
+        rows, seen = [], set()
+        for row in self.prefix(text, limit) + self.fuzzy(text, limit):
+            identity = row["cid"] or row["cas"] or name_key(row["name"])
+            if identity not in seen:
+                seen.add(identity)
+                rows.append(row)
+        return rows[:limit]
+
+
+def load_dictionary(index, path=DICTIONARY_PATH):
+    if not os.path.exists(path):
+        return
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("#") or not line.strip():
+                continue
+            name, _, cas = line.rstrip("\n").partition("\t")
+            index.add(name.strip(), cas=cas.strip() or None)
+
+
+_default_index = None
+_default_index_guard = threading.Lock()
+
+
+def get_name_index():
+    """Process-wide index: bundled dictionary plus every stored compound, kept current by the store"""
+    global _default_index
+    with _default_index_guard:
+        if _default_index is None:
+            index = NameIndex()
+            load_dictionary(index)
+            store = get_compound_store()
+            for cid, properties, synonyms in store.all_compounds():
+                index.add_compound(cid, properties, synonyms)
+            store.subscribe(index.add_compound)
+            _default_index = index
+        return _default_index
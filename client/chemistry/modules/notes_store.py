@@ -0,0 +1,318 @@
+"""
+Notes Store Module
+SQLite storage for the study notes
+
+Features:
+- One row per note: adding or deleting a note touches that note only
+- WAL journal, so concurrent sessions read while one writes and no write is lost
+- Collision-free note IDs (AUTOINCREMENT, never reused)
+- Per-user namespaces
+- One-time import of the old study_notes.json (into the default user's notes)
+- Full-text search over titles and content (SQLite FTS5, kept current by triggers):
+  BM25 ranking with titles weighted up, prefix matching, highlighted snippets
+- Keyset-paginated previews: every page costs the same, however deep, and carries
+  only the start of each note's content
+"""
+
+import html
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+NOTES_DIR = os.environ.get("CHEMLAB_NOTES_DIR", os.path.join(os.path.expanduser("~"), ".chemlab", "notes"))
+# Written by earlier versions to the working directory
+LEGACY_NOTES_FILE = "study_notes.json"
+
+DEFAULT_USER = "default"
+DATE_FORMAT = "%Y-%m-%d %H:%M"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS notes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user TEXT NOT NULL,
+    title TEXT NOT NULL,
+    category TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    version INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS notes_user_created ON notes (user, created_at, id);
+CREATE INDEX IF NOT EXISTS notes_user_category_created ON notes (user, category, created_at, id);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# External-content index over notes: rows are indexed and unindexed by triggers in the same transaction
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE notes_fts USING fts5(
+    title, content, content='notes', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER notes_fts_insert AFTER INSERT ON notes BEGIN
+    INSERT INTO notes_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+END;
+CREATE TRIGGER notes_fts_delete AFTER DELETE ON notes BEGIN
+    INSERT INTO notes_fts (notes_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+END;
+CREATE TRIGGER notes_fts_update AFTER UPDATE OF title, content ON notes BEGIN
+    INSERT INTO notes_fts (notes_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+    INSERT INTO notes_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+END;
+INSERT INTO notes_fts (notes_fts) VALUES ('rebuild');
+"""
+
+PAGE_SIZE = 20
+# Characters of content in a page preview
+PREVIEW_CHARS = 280
+
+# BM25 column weights (title, content): a match in the title ranks above one in the text
+TITLE_RANK_WEIGHT = 5.0
+CONTENT_RANK_WEIGHT = 1.0
+# Tokens around the matches in a content snippet
+SNIPPET_TOKENS = 24
+SEARCH_LIMIT = 50
+
+# Placeholders for highlight marks, swapped for <mark> after the text is HTML-escaped
+_MARK_OPEN, _MARK_CLOSE = "\x02", "\x03"
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+_COLUMNS = "id, user, title, category, content, created_at, updated_at, version"
+
+
+def fts_query(text):
+    """FTS5 query matching every word of text as a prefix ("sodium chlo" -> "sodium"* AND "chlo"*)"""
+    return " ".join(f'"{token}"*' for token in _TOKEN.findall(text))
+
+
+def _marked_html(text):
+    """HTML-escaped text with the search highlights as <mark> elements"""
+    return html.escape(text).replace(_MARK_OPEN, "<mark>").replace(_MARK_CLOSE, "</mark>")
+
+
+def _note(row):
+    note_id, user, title, category, content, created_at, updated_at, version = row
+    return {
+        "id": note_id,
+        "user": user,
+        "title": title,
+        "category": category,
+        "content": content,
+        "date": datetime.fromtimestamp(created_at).strftime(DATE_FORMAT),
+        "created_at": created_at,
+        "updated_at": updated_at,
+        "version": version,
+    }
+
+
+class NoteStore:
+    """Notes of every user, shared by every session of the app process"""
+
+    def __init__(self, root=NOTES_DIR, legacy_path=LEGACY_NOTES_FILE):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._path = os.path.join(root, "notes.sqlite")
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(_SCHEMA)
+            self.full_text = self._create_fts(db)
+        if legacy_path:
+            self.migrate_json(legacy_path)
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self._path, timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    @staticmethod
+    def _create_fts(db):
+        """Create the search index (built from any existing notes) if missing; False without FTS5"""
+        if db.execute("SELECT 1 FROM sqlite_master WHERE name = 'notes_fts'").fetchone():
+            return True
+        try:
+            db.executescript(_FTS_SCHEMA)
+        except sqlite3.OperationalError:
+            # Created meanwhile by another process, or SQLite built without FTS5
+            # (search then falls back to substring matching)
+            return db.execute("SELECT 1 FROM sqlite_master WHERE name = 'notes_fts'").fetchone() is not None
+        return True
+
+    def migrate_json(self, path, user=DEFAULT_USER):
+        """
+        Import a study_notes.json written by earlier versions, once; the file is then renamed
+        to <name>.migrated. Returns the number of notes imported.
+        """
+        path = os.path.abspath(path)
+        if not os.path.exists(path):
+            return 0
+        with open(path, encoding="utf-8") as f:
+            try:
+                notes = json.load(f)
+            except json.JSONDecodeError:
+                return 0
+        fallback = os.path.getmtime(path)
+        rows = []
+        # The file lists the newest note first; insert oldest first so IDs keep the order
+        for note in reversed(notes if isinstance(notes, list) else []):
+            try:
+                created_at = datetime.strptime(note.get("date", ""), DATE_FORMAT).timestamp()
+            except ValueError:
+                created_at = fallback
+            rows.append((user, note.get("title", ""), note.get("category", "Other"), note.get("content", ""),
+                         created_at, created_at))
+        with self._connect() as db:
+            # Taken before the check, so two sessions starting together import the file once
+            db.execute("BEGIN IMMEDIATE")
+            if db.execute("SELECT 1 FROM meta WHERE key = ?", (f"migrated:{path}",)).fetchone():
+                return 0
+            db.executemany(
+                "INSERT INTO notes (user, title, category, content, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            db.execute("INSERT INTO meta VALUES (?, ?)", (f"migrated:{path}", str(time.time())))
+        try:
+            os.replace(path, path + ".migrated")
+        except OSError:
+            # Read-only directory: the meta row still keeps the file from being imported again
+            pass
+        return len(rows)
+
+    def add(self, user, title, category, content):
+        now = time.time()
+        with self._connect() as db:
+            cursor = db.execute(
+                "INSERT INTO notes (user, title, category, content, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (user, title, category, content, now, now)
+            )
+            row = db.execute(f"SELECT {_COLUMNS} FROM notes WHERE id = ?", (cursor.lastrowid,)).fetchone()
+        return _note(row)
+
+    def delete(self, user, note_id):
+        """True if the note existed (in this user's namespace) and was deleted"""
+        with self._connect() as db:
+            return db.execute("DELETE FROM notes WHERE id = ? AND user = ?", (note_id, user)).rowcount > 0
+
+    def get(self, user, note_id):
+        with self._connect() as db:
+            row = db.execute(f"SELECT {_COLUMNS} FROM notes WHERE id = ? AND user = ?", (note_id, user)).fetchone()
+        return _note(row) if row else None
+
+    def notes(self, user, category=None):
+        """A user's notes, newest first, optionally of one category"""
+        sql = f"SELECT {_COLUMNS} FROM notes WHERE user = ?"
+        params = [user]
+        if category:
+            sql += " AND category = ?"
+            params.append(category)
+        with self._connect() as db:
+            rows = db.execute(sql + " ORDER BY created_at DESC, id DESC", params).fetchall()
+        return [_note(row) for row in rows]
+
+    def page(self, user, category=None, before=None, limit=PAGE_SIZE):
+        """
+        One page of a user's notes, newest first, as previews: "content" holds at most PREVIEW_CHARS
+        characters and "truncated" says whether there is more (get() has the rest).
+        before is the cursor returned with the previous page (None for the first);
+        returns (notes, cursor of the next page or None on the last page).
+        """
+        sql = (
+            "SELECT id, user, title, category, substr(content, 1, ?), created_at, updated_at, version, "
+            "length(content) > ? FROM notes WHERE user = ?"
+        )
+        params = [PREVIEW_CHARS, PREVIEW_CHARS, user]
+        if category:
+            sql += " AND category = ?"
+            params.append(category)
+        if before:
+            # Seek past the previous page on the (user, [category,] created_at, id) index instead of OFFSET
+            sql += " AND (created_at, id) < (?, ?)"
+            params.extend(before)
+        sql += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        params.append(limit + 1)
+        with self._connect() as db:
+            rows = db.execute(sql, params).fetchall()
+        notes = []
+        for row in rows[:limit]:
+            note = _note(row[:8])
+            note["truncated"] = bool(row[8])
+            notes.append(note)
+        cursor = (notes[-1]["created_at"], notes[-1]["id"]) if len(rows) > limit else None
+        return notes, cursor
+
+    def search(self, user, text, category=None, limit=SEARCH_LIMIT):
+        """
+        A user's notes matching every word of text (as a prefix) in the title or content, best first.
+        Each note gains "title_html" and "snippet_html": escaped HTML with the matches in <mark>.
+        """
+        query = fts_query(text)
+        if not query:
+            return []
+        if not self.full_text:
+            return self._search_substring(user, text, category, limit)
+        columns = ", ".join(f"notes.{column.strip()}" for column in _COLUMNS.split(","))
+        sql = (
+            f"SELECT {columns}, "
+            f"highlight(notes_fts, 0, '{_MARK_OPEN}', '{_MARK_CLOSE}'), "
+            f"snippet(notes_fts, 1, '{_MARK_OPEN}', '{_MARK_CLOSE}', '…', {SNIPPET_TOKENS}) "
+            "FROM notes_fts JOIN notes ON notes.id = notes_fts.rowid "
+            "WHERE notes_fts MATCH ? AND notes.user = ?"
+        )
+        params = [query, user]
+        if category:
+            sql += " AND notes.category = ?"
+            params.append(category)
+        sql += f" ORDER BY bm25(notes_fts, {TITLE_RANK_WEIGHT}, {CONTENT_RANK_WEIGHT}) LIMIT ?"
+        params.append(limit)
+        with self._connect() as db:
+            rows = db.execute(sql, params).fetchall()
+        results = []
+        for row in rows:
+            note = _note(row[:8])
+            note["title_html"] = _marked_html(row[8])
+            note["snippet_html"] = _marked_html(row[9])
+            results.append(note)
+        return results
+
+    def _search_substring(self, user, text, category, limit):
+        words = _TOKEN.findall(text.lower())
+        results = []
+        for note in self.notes(user, category):
+            haystack = f"{note['title']} {note['content']}".lower()
+            if all(word in haystack for word in words):
+                note["title_html"] = html.escape(note["title"])
+                note["snippet_html"] = html.escape(note["content"][:200])
+                results.append(note)
+                if len(results) == limit:
+                    break
+        return results
+
+    def count(self, user, category=None):
+        sql, params = "SELECT COUNT(*) FROM notes WHERE user = ?", [user]
+        if category:
+            sql += " AND category = ?"
+            params.append(category)
+        with self._connect() as db:
+            return db.execute(sql, params).fetchone()[0]
+
+
+_default_store = None
+_default_store_guard = threading.Lock()
+
+
+def get_note_store():
+    """Process-wide store, so every Streamlit session shares one database"""
+    global _default_store
+    with _default_store_guard:
+        if _default_store is None:
+            _default_store = NoteStore()
+        return _default_store
@@ -0,0 +1,128 @@
+"""
+PubChem Module
+PUG-REST access for the chemical search, over the shared HTTP client
+
+Features:
+- Name / CAS / synonym lookup to CIDs
+- Computed properties, synonyms and 2D depiction by CID, or straight from a name
+  (so a first search needs no separate name-to-CID round trip)
+- Full records (SDF, JSON) for downloads
+- Many CIDs per request for properties, synonyms and SDF records (batch lookups)
+"""
+
+from urllib.parse import quote
+
+from .http_client import get_client
+
+PUG_REST = "https://pubchem.ncbi.nlm.nih.gov/rest/pug"
+COMPOUND_URL = "https://pubchem.ncbi.nlm.nih.gov/compound/{cid}"
+
+# PUG-REST property names shown on a result page
+PROPERTIES = ["MolecularFormula", "MolecularWeight", "IUPACName", "SMILES", "XLogP", "TPSA", "Charge"]
+
+# CIDs sent in one multi-CID request (POSTed, so the list is not limited by URL length)
+MAX_CIDS_PER_REQUEST = 100
+
+SDF_RECORD_END = b"$$$$"
+
+
+def _compound(identifier, namespace):
+    return f"compound/{namespace}/{quote(str(identifier).strip(), safe='')}"
+
+
+def _get(path, client=None, params=None):
+    response = (client or get_client()).get(f"{PUG_REST}/{path}", params=params)
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    return response
+
+
+def _post_cids(operation, cids, client=None):
+    """POST a CID list to compound/cid/<operation>; None when none of them exist"""
+    response = (client or get_client()).post(
+        f"{PUG_REST}/compound/cid/{operation}", data={"cid": ",".join(str(int(cid)) for cid in cids)}
+    )
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    return response
+
+
+def find_cids(query, client=None):
+    """CIDs matching a name, synonym or CAS number (best match first); [] when nothing matches"""
+    response = _get(f"{_compound(query, 'name')}/cids/JSON", client)
+    return response.json().get("IdentifierList", {}).get("CID", []) if response is not None else []
+
+
+def properties(identifier, namespace="cid", client=None):
+    """
+    Dict of PROPERTIES (with its CID) for a CID, or for the best match of a name
+    with namespace="name"; {} when nothing matches
+    """
+    response = _get(f"{_compound(identifier, namespace)}/property/{','.join(PROPERTIES)}/JSON", client)
+    if response is None:
+        return {}
+    rows = response.json().get("PropertyTable", {}).get("Properties", [])
+    return rows[0] if rows else {}
+
+
+def synonym_lists(identifier, namespace="cid", client=None):
+    """{CID: synonyms} for a CID or for every match of a name"""
+    response = _get(f"{_compound(identifier, namespace)}/synonyms/JSON", client)
+    if response is None:
+        return {}
+    info = response.json().get("InformationList", {}).get("Information", [])
+    return {item["CID"]: item.get("Synonym", []) for item in info}
+
+
+def property_table(cids, client=None):
+    """{CID: PROPERTIES} for up to MAX_CIDS_PER_REQUEST CIDs in one request; unknown CIDs are left out"""
+    response = _post_cids(f"property/{','.join(PROPERTIES)}/JSON", cids, client)
+    if response is None:
+        return {}
+    return {row["CID"]: row for row in response.json().get("PropertyTable", {}).get("Properties", [])}
+
+
+def synonym_table(cids, client=None):
+    """{CID: synonyms} for up to MAX_CIDS_PER_REQUEST CIDs in one request"""
+    response = _post_cids("synonyms/JSON", cids, client)
+    if response is None:
+        return {}
+    info = response.json().get("InformationList", {}).get("Information", [])
+    return {item["CID"]: item.get("Synonym", []) for item in info}
+
+
+def synonyms(cid, client=None):
+    return synonym_lists(cid, client=client).get(int(cid), [])
+
+
+def depiction(identifier, namespace="cid", size=400, client=None):
+    """PNG bytes of the 2D structure (best match for a name), or None"""
+    response = _get(f"{_compound(identifier, namespace)}/PNG", client, params={"image_size": f"{size}x{size}"})
+    return response.content if response is not None else None
+
+
+def record(cid, fmt="SDF", client=None):
+    """Full record as bytes, fmt "SDF" or "JSON" """
+    response = _get(f"compound/cid/{cid}/{fmt}", client)
+    return response.content if response is not None else None
+
+
+def sdf_records(cids, client=None):
+    """{CID: SDF record bytes} for up to MAX_CIDS_PER_REQUEST CIDs in one request"""
+    response = _post_cids("SDF", cids, client)
+    if response is None:
+        return {}
+    return split_sdf(response.content)
+
+
+def split_sdf(data):
+    """{CID: record} of a multi-record SDF file; PubChem puts the CID on each record's first line"""
+    records = {}
+    for chunk in data.split(SDF_RECORD_END):
+        chunk = chunk.lstrip(b"\r\n")
+        title = chunk.split(b"\n", 1)[0].strip()
+        if title.isdigit():
+            records[int(title)] = chunk + SDF_RECORD_END + b"\n"
+    return records
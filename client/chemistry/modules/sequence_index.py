@@ -0,0 +1,520 @@
+"""
+Sequence Index Module
+Sequence search over locally stored structures (structure store and a PDB mirror directory)
+
+Features:
+- Chain sequences extracted from parsed structures (modified residues mapped to their parents)
+- k-mer inverted index (protein 3-mers, nucleic 8-mers) kept in memory as sorted posting arrays
+- Candidate chains chosen by k-mer hits sharing an alignment diagonal
+- Banded Smith–Waterman (affine gaps, BLOSUM62) scored for all candidates at once
+- Incremental updates: new structures become delta segments, removed ones are tombstoned
+- Chain table persisted in SQLite, so the index is rebuilt without re-parsing any file
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from .structure_io import WATER_RESIDUES, parse_structure, structure_format
+from .structure_analysis import first_model, residue_index
+from .structure_store import STORE_DIR, get_store
+
+MIRROR_DIR = os.environ.get("CHEMLAB_PDB_MIRROR", os.path.join(os.path.expanduser("~"), ".chemlab", "mirror"))
+MIRROR_EXTENSIONS = (".pdb", ".ent", ".cif", ".mmcif")
+
+PROTEIN_ALPHABET = "ARNDCQEGHILKMFPSTWYVX"
+NUCLEIC_ALPHABET = "ACGTN"
+
+THREE_TO_ONE = {
+    "ALA": "A", "ARG": "R", "ASN": "N", "ASP": "D", "CYS": "C", "GLN": "Q", "GLU": "E", "GLY": "G",
+    "HIS": "H", "ILE": "I", "LEU": "L", "LYS": "K", "MET": "M", "PHE": "F", "PRO": "P", "SER": "S",
+    "THR": "T", "TRP": "W", "TYR": "Y", "VAL": "V",
+    # Common modified residues, scored as their parent amino acid
+    "MSE": "M", "SEP": "S", "TPO": "T", "PTR": "Y", "CSO": "C", "CSD": "C", "CME": "C", "OCS": "C",
+    "HYP": "P", "MLY": "K", "M3L": "K", "KCX": "K", "LLP": "K", "PCA": "E", "HIC": "H", "NEP": "H",
+    "SEC": "C", "PYL": "K", "ASX": "X", "GLX": "X", "UNK": "X",
+}
+NUCLEIC_TO_ONE = {
+    "DA": "A", "DC": "C", "DG": "G", "DT": "T", "DU": "T", "DI": "N",
+    "A": "A", "C": "C", "G": "G", "U": "T", "T": "T", "I": "N", "N": "N",
+    # Modified nucleotides
+    "PSU": "T", "5MC": "C", "5MU": "T", "OMC": "C", "OMG": "G", "1MA": "A", "2MG": "G", "7MG": "G", "H2U": "T",
+}
+
+# k-mer length per chain kind; chains shorter than MIN_CHAIN_LENGTH residues are not indexed
+KMER_LENGTH = {"protein": 3, "nucleic": 8}
+MIN_CHAIN_LENGTH = {"protein": 10, "nucleic": 6}
+
+# BLOSUM62 (Henikoff & Henikoff 1992) over PROTEIN_ALPHABET
+BLOSUM62_TEXT = """
+   A  R  N  D  C  Q  E  G  H  I  L  K  M  F  P  S  T  W  Y  V  X
+A  4 -1 -2 -2  0 -1 -1  0 -2 -1 -1 -1 -1 -2 -1  1  0 -3 -2  0  0
+R -1  5  0 -2 -3  1  0 -2  0 -3 -2  2 -1 -3 -2 -1 -1 -3 -2 -3 -1
+N -2  0  6  1 -3  0  0  0  1 -3 -3  0 -2 -3 -2  1  0 -4 -2 -3 -1
+D -2 -2  1  6 -3  0  2 -1 -1 -3 -4 -1 -3 -3 -1  0 -1 -4 -3 -3 -1
+C  0 -3 -3 -3  9 -3 -4 -3 -3 -1 -1 -3 -1 -2 -3 -1 -1 -2 -2 -1 -2
+Q -1  1  0  0 -3  5  2 -2  0 -3 -2  1  0 -3 -1  0 -1 -2 -1 -2 -1
+E -1  0  0  2 -4  2  5 -2  0 -3 -3  1 -2 -3 -1  0 -1 -3 -2 -2 -1
+G  0 -2  0 -1 -3 -2 -2  6 -2 -4 -4 -2 -3 -3 -2  0 -2 -2 -3 -3 -1
+H -2  0  1 -1 -3  0  0 -2  8 -3 -3 -1 -2 -1 -2 -1 -2 -2  2 -3 -1
+I -1 -3 -3 -3 -1 -3 -3 -4 -3  4  2 -3  1  0 -3 -2 -1 -3 -1  3 -1
+L -1 -2 -3 -4 -1 -2 -3 -4 -3  2  4 -2  2  0 -3 -2 -1 -2 -1  1 -1
+K -1  2  0 -1 -3  1  1 -2 -1 -3 -2  5 -1 -3 -1  0 -1 -3 -2 -2 -1
+M -1 -1 -2 -3 -1  0 -2 -3 -2  1  2 -1  5  0 -2 -1 -1 -1 -1  1 -1
+F -2 -3 -3 -3 -2 -3 -3 -3 -1  0  0 -3  0  6 -4 -2 -2  1  3 -1 -1
+P -1 -2 -2 -1 -3 -1 -1 -2 -2 -3 -3 -1 -2 -4  7 -1 -1 -4 -3 -2 -2
+S  1 -1  1  0 -1  0  0  0 -1 -2 -2  0 -1 -2 -1  4  1 -3 -2 -2  0
+T  0 -1  0 -1 -1 -1 -1 -2 -2 -1 -1 -1 -1 -2 -1  1  5 -2 -2  0  0
+W -3 -3 -4 -4 -2 -2 -3 -2 -2 -3 -2 -3 -1  1 -4 -3 -2 11  2 -3 -2
+Y -2 -2 -2 -3 -2 -1 -2 -3  2 -1 -1 -2 -1  3 -3 -2 -2  2  7 -1 -1
+V  0 -3 -3 -3 -1 -2 -2 -3 -3  3  1 -2  1 -1 -2 -2  0 -3 -1  4 -1
+X  0 -1 -1 -1 -2 -1 -1 -1 -1 -1 -1 -1 -1 -1 -2  0  0 -2 -1 -1 -1
+"""
+
+
+def _parse_matrix(text):
+    rows = [line.split() for line in text.strip().splitlines()[1:]]
+    return np.array([[int(v) for v in row[1:]] for row in rows], dtype=np.int32)
+
+
+def _nucleic_matrix(match=2, mismatch=-3):
+    matrix = np.full((5, 5), mismatch, dtype=np.int32)
+    np.fill_diagonal(matrix, match)
+    matrix[4, :] = matrix[:, 4] = -1  # N
+    return matrix
+
+
+# kind: (alphabet, substitution matrix, gap open, gap extend)
+SCORING = {
+    "protein": (PROTEIN_ALPHABET, _parse_matrix(BLOSUM62_TEXT), 11, 1),
+    "nucleic": (NUCLEIC_ALPHABET, _nucleic_matrix(), 5, 2),
+}
+
+# Half-width of the alignment band around the seeding diagonal, and of the diagonal bins used to seed
+BAND_WIDTH = 16
+DIAGONAL_BIN = 8
+MAX_CANDIDATES = 50
+
+# Delta segments are merged into one sorted posting array once there are this many
+MAX_SEGMENTS = 8
+# Mirror refreshes parse files in a process pool above this many changed files
+REFRESH_PARALLEL_FILES = 16
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    source TEXT PRIMARY KEY,
+    stamp TEXT NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS chains (
+    -- AUTOINCREMENT: ids of removed chains are tombstones and must never be reused
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    source TEXT NOT NULL,
+    entry TEXT NOT NULL,
+    chain TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    sequence TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS chains_source ON chains (source);
+"""
+
+
+def chain_sequences(structure):
+    """
+    [(chain, kind, one-letter sequence)] of the polymer chains in the first model.
+    Ligands and water are skipped; unknown polymer residues become X (protein) or N (nucleic).
+    """
+    model = first_model(structure)
+    polymer = {k: (v[model] if isinstance(v, np.ndarray) else v) for k, v in structure.items()}
+    _, table = residue_index(polymer)
+    table = table[~table["resname"].isin(WATER_RESIDUES)]
+    chains = []
+    for chain, residues in table.groupby("chain", sort=False):
+        names = residues["resname"].str.strip().str.upper()
+        amino = names.map(THREE_TO_ONE)
+        nucleic = names.map(NUCLEIC_TO_ONE)
+        kind = "protein" if amino.notna().sum() >= nucleic.notna().sum() else "nucleic"
+        letters, unknown = (amino, "X") if kind == "protein" else (nucleic, "N")
+        # HETATM groups that are not residues of the polymer are ligands sharing the chain ID
+        keep = letters.notna() | ~residues["hetero"].to_numpy()
+        sequence = "".join(letters[keep].fillna(unknown))
+        if len(sequence) >= MIN_CHAIN_LENGTH[kind] and letters.notna().any():
+            chains.append((str(chain).strip() or "-", kind, sequence))
+    return chains
+
+
+def parse_query(text):
+    """(kind, sequence) of a raw or FASTA query; U is read as T and unknown letters as X/N"""
+    lines = [line for line in (text or "").splitlines() if not line.startswith((">", ";"))]
+    sequence = "".join(ch for ch in "".join(lines).upper() if ch.isalpha())
+    if not sequence:
+        raise ValueError("Query contains no sequence letters")
+    if set(sequence) <= set("ACGTUN"):
+        return "nucleic", sequence.replace("U", "T")
+    return "protein", "".join(ch if ch in PROTEIN_ALPHABET else "X" for ch in sequence)
+
+
+def encode(sequence, kind):
+    alphabet = SCORING[kind][0]
+    lookup = np.full(256, len(alphabet) - 1, dtype=np.int8)
+    lookup[np.frombuffer(alphabet.encode("ascii"), dtype=np.uint8)] = np.arange(len(alphabet))
+    return lookup[np.frombuffer(sequence.encode("ascii"), dtype=np.uint8)]
+
+
+def kmers(codes, kind):
+    """(k-mer id, position) of every k-mer without an unknown residue"""
+    k = KMER_LENGTH[kind]
+    size = len(SCORING[kind][0])
+    if len(codes) < k:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int32)
+    windows = np.lib.stride_tricks.sliding_window_view(codes.astype(np.int64), k)
+    ids = windows @ (size ** np.arange(k - 1, -1, -1, dtype=np.int64))
+    valid = ~(windows == size - 1).any(axis=1)
+    return ids[valid], np.flatnonzero(valid).astype(np.int32)
+
+
+def banded_smith_waterman(query, targets, diagonals, kind, band=BAND_WIDTH):
+    """
+    Local alignment scores of one encoded query against many encoded targets, each restricted
+    to a band of ±band around its diagonal (target position - query position).
+    All targets advance one query row at a time as (targets, band) arrays; gaps are affine.
+    Returns (scores, query end, target end) per target.
+    """
+    _, matrix, gap_open, gap_extend = SCORING[kind]
+    n, width = len(targets), 2 * band + 1
+    lengths = np.array([len(t) for t in targets])
+    padded = np.full((n, int(lengths.max()) + 1), -1, dtype=np.int32)
+    for i, t in enumerate(targets):
+        padded[i, :len(t)] = t
+    offsets = np.asarray(diagonals)[:, None] + np.arange(-band, band + 1)[None, :]
+    columns = np.arange(width)
+    rows = np.arange(n)[:, None]
+    neg = -(10 ** 6)
+
+    H = np.zeros((n, width), dtype=np.int32)
+    F = np.full((n, width), neg, dtype=np.int32)
+    best = np.zeros(n, dtype=np.int32)
+    best_query = np.zeros(n, dtype=np.int32)
+    best_target = np.zeros(n, dtype=np.int32)
+    for i, residue in enumerate(query):
+        position = offsets + i
+        inside = (position >= 0) & (position < lengths[:, None])
+        residues = padded[rows, np.clip(position, 0, padded.shape[1] - 1)]
+        substitution = np.where(inside, matrix[residue][np.maximum(residues, 0)], neg)
+        # Band column b in row i is target i + d + b: the diagonal predecessor is column b of the
+        # previous row, the vertical one (gap in target) column b + 1
+        H_up = np.concatenate([H[:, 1:], np.zeros((n, 1), dtype=np.int32)], axis=1)
+        F_up = np.concatenate([F[:, 1:], np.full((n, 1), neg, dtype=np.int32)], axis=1)
+        F = np.maximum(H_up - gap_open, F_up - gap_extend)
+        H0 = np.maximum(np.maximum(H + substitution, F), 0)
+        # Horizontal gaps (gap in query) within the row, as a prefix maximum:
+        # E[b] = max over c < b of H0[c] - open - (b - 1 - c) * extend
+        shifted = np.maximum.accumulate(H0 + columns * gap_extend, axis=1)
+        E = np.full((n, width), neg, dtype=np.int32)
+        E[:, 1:] = shifted[:, :-1] - gap_open - (columns[1:] - 1) * gap_extend
+        H = np.where(inside, np.maximum(H0, E), 0)
+        row_best = H.max(axis=1)
+        improved = row_best > best
+        best = np.where(improved, row_best, best)
+        best_query = np.where(improved, i, best_query)
+        best_target = np.where(improved, position[np.arange(n), H.argmax(axis=1)], best_target)
+    return best, best_query, best_target
+
+
+def self_score(codes, kind):
+    return int(SCORING[kind][1][codes, codes].sum())
+
+
+def _segment(chain_ids, sequences, kind):
+    """Sorted posting arrays (k-mer, chain, position) of one kind for the given chains"""
+    parts = [(kmers(codes, kind), chain_id) for chain_id, codes in zip(chain_ids, sequences)]
+    if not parts:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int32)
+    ids = np.concatenate([p[0][0] for p in parts])
+    chains = np.concatenate([np.full(len(p[0][0]), p[1], dtype=np.int64) for p in parts])
+    positions = np.concatenate([p[0][1] for p in parts])
+    order = np.argsort(ids, kind="stable")
+    return ids[order], chains[order], positions[order]
+
+
+def _file_chains(path):
+    """Chains of one mirror file (top-level, so a process pool can run it)"""
+    with open(path, "rb") as f:
+        data = f.read()
+    try:
+        return chain_sequences(parse_structure(data, structure_format(path)[0]))
+    except Exception:
+        # Unparseable files stay out of the index rather than failing the whole refresh
+        return []
+
+
+def mirror_entry(path):
+    """PDB ID-like label of a mirror file: pdb1abc.ent.gz -> 1ABC, 1abc.cif -> 1ABC"""
+    name = os.path.basename(path).split(".")[0]
+    if name.lower().startswith("pdb") and len(name) == 7:
+        name = name[3:]
+    return name.upper()
+
+
+class SequenceIndex:
+    """k-mer index over every chain of every indexed source, shared by all sessions"""
+
+    def __init__(self, root=STORE_DIR, mirror_dir=MIRROR_DIR):
+        self.root = root
+        self.mirror_dir = mirror_dir
+        os.makedirs(root, exist_ok=True)
+        self._path = os.path.join(root, "sequences.sqlite")
+        self._lock = threading.RLock()
+        # Built lazily on first search: kind -> list of (kmers, chains, positions) segments
+        self._segments = None
+        self._sequences = {}
+        self._removed = set()
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self._path, timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def _load(self):
+        with self._connect() as db:
+            rows = db.execute("SELECT id, source, entry, chain, kind, sequence FROM chains").fetchall()
+        self._sequences = {}
+        self._segments = {kind: [] for kind in SCORING}
+        self._removed = set()
+        self._add_segments(rows)
+
+    def _add_segments(self, rows):
+        for kind in SCORING:
+            chosen = [row for row in rows if row[4] == kind]
+            if not chosen:
+                continue
+            encoded = [encode(row[5], kind) for row in chosen]
+            for row, codes in zip(chosen, encoded):
+                self._sequences[row[0]] = (row[1], row[2], row[3], kind, codes)
+            self._segments[kind].append(_segment([row[0] for row in chosen], encoded, kind))
+            if len(self._segments[kind]) > MAX_SEGMENTS:
+                self._merge(kind)
+
+    def _merge(self, kind):
+        segments = self._segments[kind]
+        ids, chains, positions = (np.concatenate(parts) for parts in zip(*segments))
+        alive = ~np.isin(chains, list(self._removed)) if self._removed else np.ones(len(chains), dtype=bool)
+        order = np.argsort(ids[alive], kind="stable")
+        self._segments[kind] = [(ids[alive][order], chains[alive][order], positions[alive][order])]
+
+    def _ensure_loaded(self):
+        with self._lock:
+            if self._segments is None:
+                self._load()
+
+    def indexed(self):
+        """{source: stamp} of everything in the index"""
+        with self._connect() as db:
+            return dict(db.execute("SELECT source, stamp FROM sources").fetchall())
+
+    def add_chains(self, source, entry, stamp, chains):
+        """Replace the chains of one source; the in-memory index gains a delta segment"""
+        with self._lock:
+            self.remove(source)
+            with self._connect() as db:
+                db.execute("INSERT OR REPLACE INTO sources VALUES (?, ?, ?)", (source, stamp, time.time()))
+                rows = []
+                for chain, kind, sequence in chains:
+                    cursor = db.execute(
+                        "INSERT INTO chains (source, entry, chain, kind, sequence) VALUES (?, ?, ?, ?, ?)",
+                        (source, entry, chain, kind, sequence)
+                    )
+                    rows.append((cursor.lastrowid, source, entry, chain, kind, sequence))
+            if self._segments is not None:
+                self._add_segments(rows)
+
+    def add_structure(self, source, entry, structure, stamp):
+        self.add_chains(source, entry, stamp, chain_sequences(structure))
+
+    def remove(self, source):
+        with self._lock:
+            with self._connect() as db:
+                ids = [row[0] for row in db.execute("SELECT id FROM chains WHERE source = ?", (source,))]
+                db.execute("DELETE FROM chains WHERE source = ?", (source,))
+                db.execute("DELETE FROM sources WHERE source = ?", (source,))
+            if self._segments is not None:
+                # Tombstoned postings are filtered at query time and dropped at the next merge
+                self._removed.update(ids)
+                for chain_id in ids:
+                    self._sequences.pop(chain_id, None)
+
+    def on_store_record(self, pdb_id, fmt, data, digest):
+        """StructureStore listener: index each structure as it enters the store"""
+        source = f"store:{pdb_id}.{fmt}"
+        if self.indexed().get(source) == digest:
+            return
+        try:
+            structure = parse_structure(data, fmt)
+        except Exception:
+            return
+        self.add_structure(source, pdb_id, structure, digest)
+
+    def _mirror_files(self):
+        for directory, _, names in os.walk(self.mirror_dir):
+            for name in names:
+                bare = name[:-3] if name.lower().endswith(".gz") else name
+                if bare.lower().endswith(MIRROR_EXTENSIONS):
+                    yield os.path.join(directory, name)
+
+    def refresh(self, store=None, progress=None):
+        """
+        Bring the index up to date with the structure store and the mirror directory.
+        Only sources whose digest (store) or mtime and size (mirror) changed are parsed;
+        sources that disappeared are removed. Returns (added or updated, removed).
+        """
+        store = store or get_store()
+        known = self.indexed()
+        seen, changed = set(), 0
+
+        for pdb_id, fmt, digest in store.stored_entries():
+            source = f"store:{pdb_id}.{fmt}"
+            seen.add(source)
+            if known.get(source) == digest:
+                continue
+            data = store.read_digest(digest)
+            if data is None:
+                continue
+            try:
+                chains = chain_sequences(parse_structure(data, fmt))
+            except Exception:
+                chains = []
+            self.add_chains(source, pdb_id, digest, chains)
+            changed += 1
+
+        pending = []
+        for path in self._mirror_files():
+            source = f"mirror:{os.path.relpath(path, self.mirror_dir)}"
+            seen.add(source)
+            info = os.stat(path)
+            stamp = f"{info.st_mtime_ns}:{info.st_size}"
+            if known.get(source) != stamp:
+                pending.append((source, path, stamp))
+        if len(pending) > REFRESH_PARALLEL_FILES:
+            with ProcessPoolExecutor() as pool:
+                results = pool.map(_file_chains, [p[1] for p in pending], chunksize=8)
+                for i, ((source, path, stamp), chains) in enumerate(zip(pending, results)):
+                    self.add_chains(source, mirror_entry(path), stamp, chains)
+                    if progress:
+                        progress((i + 1) / len(pending))
+        else:
+            for source, path, stamp in pending:
+                self.add_chains(source, mirror_entry(path), stamp, _file_chains(path))
+        changed += len(pending)
+
+        removed = [source for source in known if source not in seen and source.startswith(("store:", "mirror:"))]
+        for source in removed:
+            self.remove(source)
+        return changed, len(removed)
+
+    def stats(self):
+        with self._connect() as db:
+            sources = db.execute("SELECT COUNT(*) FROM sources").fetchone()[0]
+            chains = dict(db.execute("SELECT kind, COUNT(*) FROM chains GROUP BY kind").fetchall())
+        return {"sources": sources, "protein": chains.get("protein", 0), "nucleic": chains.get("nucleic", 0)}
+
+    def _candidates(self, kind, codes, max_candidates):
+        """(chain ids, seeding diagonals, hit counts) of the chains sharing most k-mers on one diagonal"""
+        query_ids, query_positions = kmers(codes, kind)
+        hit_chains, hit_diagonals = [], []
+        for ids, chains, positions in self._segments[kind]:
+            lo = np.searchsorted(ids, query_ids, side="left")
+            hi = np.searchsorted(ids, query_ids, side="right")
+            counts = hi - lo
+            if counts.sum() == 0:
+                continue
+            # Expand every query k-mer into its posting range without a Python loop
+            take = np.repeat(lo - np.r_[0, np.cumsum(counts)[:-1]], counts) + np.arange(counts.sum())
+            hit_chains.append(chains[take])
+            hit_diagonals.append(positions[take] - np.repeat(query_positions, counts))
+        if not hit_chains:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        chains = np.concatenate(hit_chains)
+        diagonals = np.concatenate(hit_diagonals)
+        if self._removed:
+            alive = ~np.isin(chains, list(self._removed))
+            chains, diagonals = chains[alive], diagonals[alive]
+
+        bins = np.floor_divide(diagonals, DIAGONAL_BIN)
+        pairs, counts = np.unique(np.column_stack([chains, bins]), axis=0, return_counts=True)
+        # Best diagonal bin per chain, then the best chains overall
+        order = np.lexsort((-counts, pairs[:, 0]))
+        pairs, counts = pairs[order], counts[order]
+        first = np.r_[True, pairs[1:, 0] != pairs[:-1, 0]]
+        pairs, counts = pairs[first], counts[first]
+        top = np.argsort(-counts, kind="stable")[:max_candidates]
+        return pairs[top, 0], pairs[top, 1] * DIAGONAL_BIN + DIAGONAL_BIN // 2, counts[top]
+
+    def search(self, query, max_candidates=MAX_CANDIDATES, band=BAND_WIDTH):
+        """
+        Ranked hits for a sequence (raw or FASTA) as a DataFrame with the source, entry, chain,
+        alignment score, score relative to the query aligned to itself, and aligned ranges
+        """
+        kind, sequence = parse_query(query)
+        if len(sequence) < KMER_LENGTH[kind]:
+            raise ValueError(f"Query must be at least {KMER_LENGTH[kind]} residues long")
+        self._ensure_loaded()
+        codes = encode(sequence, kind)
+        with self._lock:
+            chain_ids, diagonals, hits = self._candidates(kind, codes, max_candidates)
+            records = [self._sequences[int(c)] for c in chain_ids]
+        columns = ["source", "entry", "chain", "length", "score", "similarity", "query_range", "target_range", "kmer_hits"]
+        if not records:
+            return pd.DataFrame(columns=columns)
+
+        scores, query_end, target_end = banded_smith_waterman(
+            codes, [r[4] for r in records], diagonals, kind, band=band
+        )
+        reference = max(self_score(codes, kind), 1)
+        # The same alignment run backwards from its end point finds where it starts
+        query_start, target_start = query_end.copy(), target_end.copy()
+        for i, record in enumerate(records):
+            if scores[i] > 0:
+                _, q, t = banded_smith_waterman(
+                    codes[:query_end[i] + 1][::-1], [record[4][:target_end[i] + 1][::-1]], [0], kind, band=band
+                )
+                query_start[i], target_start[i] = query_end[i] - q[0], target_end[i] - t[0]
+        results = pd.DataFrame({
+            "source": [r[0] for r in records],
+            "entry": [r[1] for r in records],
+            "chain": [r[2] for r in records],
+            "length": [len(r[4]) for r in records],
+            "score": scores,
+            "similarity": scores / reference,
+            "query_range": [f"{s + 1}-{e + 1}" for s, e in zip(query_start, query_end)],
+            "target_range": [f"{s + 1}-{e + 1}" for s, e in zip(target_start, target_end)],
+            "kmer_hits": hits,
+        })
+        results = results[results["score"] > 0]
+        return results.sort_values(["score", "kmer_hits"], ascending=False).reset_index(drop=True)
+
+
+_default_index = None
+_default_index_guard = threading.Lock()
+
+
+def get_sequence_index():
+    """Process-wide index, subscribed to the structure store so fetched structures are indexed on arrival"""
+    global _default_index
+    with _default_index_guard:
+        if _default_index is None:
+            _default_index = SequenceIndex()
+            get_store().subscribe(_default_index.on_store_record)
+        return _default_index
@@ -0,0 +1,602 @@
+"""
+Structure Analysis Module
+Geometric analysis of parsed structures (atom arrays from structure_io)
+
+Features:
+- k-d tree spatial index for radius queries (no all-pairs distances)
+- Residue contact maps (Cα or heavy-atom cutoff), returned sparse
+- Neighbors within a radius of any atom selection
+- Ligand detection and binding-site extraction
+- Radius of gyration (geometric or mass-weighted)
+- Optimal superposition (Kabsch) and RMSD over matched atoms
+- Shrake–Rupley solvent-accessible surface area per atom and per residue
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.spatial import cKDTree
+
+from .structure_io import WATER_RESIDUES, ION_RESIDUES
+from .worker_pool import parallel_map
+
+# Standard atomic weights (g/mol) for mass-weighted radius of gyration
+ATOMIC_MASSES = {
+    "H": 1.008, "C": 12.011, "N": 14.007, "O": 15.999, "P": 30.974, "S": 32.06, "Se": 78.971,
+    "F": 18.998, "Cl": 35.45, "Br": 79.904, "I": 126.904, "Na": 22.990, "K": 39.098,
+    "Mg": 24.305, "Ca": 40.078, "Mn": 54.938, "Fe": 55.845, "Co": 58.933, "Ni": 58.693,
+    "Cu": 63.546, "Zn": 65.38,
+}
+DEFAULT_MASS = 12.011
+
+# Bondi van der Waals radii (Å) for SASA
+VDW_RADII = {
+    "H": 1.10, "C": 1.70, "N": 1.55, "O": 1.52, "S": 1.80, "P": 1.80, "Se": 1.90,
+    "F": 1.47, "Cl": 1.75, "Br": 1.85, "I": 1.98, "Na": 2.27, "K": 2.75, "Mg": 1.73,
+    "Ca": 2.31, "Fe": 2.04, "Zn": 1.39, "Cu": 1.40, "Mn": 2.05,
+}
+DEFAULT_VDW_RADIUS = 1.80
+PROBE_RADIUS = 1.4
+SASA_POINTS = 100
+
+# Maximum residue SASA in a Gly-X-Gly tripeptide (Tien et al. 2013, theoretical), for relative exposure
+MAX_RESIDUE_SASA = {
+    "ALA": 129.0, "ARG": 274.0, "ASN": 195.0, "ASP": 193.0, "CYS": 167.0, "GLN": 225.0, "GLU": 223.0,
+    "GLY": 104.0, "HIS": 224.0, "ILE": 197.0, "LEU": 201.0, "LYS": 236.0, "MET": 224.0, "PHE": 240.0,
+    "PRO": 159.0, "SER": 155.0, "THR": 172.0, "TRP": 285.0, "TYR": 263.0, "VAL": 174.0,
+}
+
+# Atoms per SASA work unit; structures with fewer than SASA_PARALLEL_ATOMS atoms run in-process
+SASA_BATCH_ATOMS = 512
+SASA_PARALLEL_ATOMS = 20_000
+
+CONTACT_MODES = {
+    # mode: (default cutoff in Å, description)
+    "Cα": (8.0, "Cα–Cα distance"),
+    "Heavy atoms": (4.5, "closest heavy-atom distance"),
+}
+
+
+def first_model(structure):
+    """Atom mask of the first model; analysis never mixes NMR/trajectory models"""
+    return structure["model"] == structure["model"].min()
+
+
+def build_index(xyz):
+    # balanced_tree=False builds much faster on large inputs with similar query speed
+    return cKDTree(np.asarray(xyz, dtype=np.float64), balanced_tree=False, compact_nodes=False)
+
+
+def residue_index(structure):
+    """
+    Per-atom residue number (0..n_res-1) and a residue table (chain, resseq, icode, resname,
+    hetero, first atom). Residues are runs of atoms sharing model, chain, number and insertion code.
+    """
+    n = len(structure["xyz"])
+    if n == 0:
+        return np.zeros(0, dtype=np.int64), pd.DataFrame(columns=["chain", "resseq", "icode", "resname", "hetero", "first_atom"])
+    new = np.ones(n, dtype=bool)
+    new[1:] = (
+        (structure["model"][1:] != structure["model"][:-1])
+        | (structure["chain"][1:] != structure["chain"][:-1])
+        | (structure["resseq"][1:] != structure["resseq"][:-1])
+        | (structure["icode"][1:] != structure["icode"][:-1])
+    )
+    atom_residue = np.cumsum(new) - 1
+    first = np.flatnonzero(new)
+    table = pd.DataFrame({
+        "chain": structure["chain"][first],
+        "resseq": structure["resseq"][first],
+        "icode": structure["icode"][first],
+        "resname": structure["resname"][first],
+        "hetero": structure["hetero"][first],
+        "first_atom": first,
+    })
+    return atom_residue, table
+
+
+def residue_labels(table):
+    return (table["chain"] + ":" + table["resname"] + table["resseq"].astype(str) + table["icode"]).tolist()
+
+
+def contact_map(structure, mode="Cα", cutoff=None):
+    """
+    Residue–residue contacts of the first model as a symmetric sparse boolean matrix,
+    with the residue table it indexes. Only pairs within cutoff are ever enumerated.
+    """
+    cutoff = CONTACT_MODES[mode][0] if cutoff is None else cutoff
+    model = first_model(structure)
+    atom_residue, table = residue_index(structure)
+    if mode == "Cα":
+        selected = model & (structure["name"] == "CA") & (structure["element"] == "C") & ~structure["hetero"]
+    else:
+        selected = model & (structure["element"] != "H") & ~np.isin(structure["resname"], WATER_RESIDUES)
+
+    atoms = np.flatnonzero(selected)
+    n_res = len(table)
+    if len(atoms) < 2:
+        return sparse.csr_matrix((n_res, n_res), dtype=bool), table
+
+    pairs = build_index(structure["xyz"][atoms]).query_pairs(cutoff, output_type="ndarray")
+    res_i, res_j = atom_residue[atoms[pairs[:, 0]]], atom_residue[atoms[pairs[:, 1]]]
+    keep = res_i != res_j
+    rows = np.concatenate([res_i[keep], res_j[keep]])
+    cols = np.concatenate([res_j[keep], res_i[keep]])
+    contacts = sparse.coo_matrix((np.ones(len(rows), dtype=bool), (rows, cols)), shape=(n_res, n_res)).tocsr()
+    # Duplicate atom pairs for the same residue pair were summed; collapse back to True
+    contacts.data[:] = True
+    return contacts, table
+
+
+def neighbors_within(structure, selection, radius, tree=None, exclude_selection=True):
+    """
+    Atoms (first model) within radius of any atom in the boolean selection mask, with
+    the distance to the closest selected atom. tree may be a prebuilt index of the first model.
+    """
+    model_atoms = np.flatnonzero(first_model(structure))
+    if tree is None:
+        tree = build_index(structure["xyz"][model_atoms])
+    query = structure["xyz"][selection & first_model(structure)].astype(np.float64)
+    if len(query) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0)
+
+    hits = tree.query_ball_point(query, radius, return_sorted=False)
+    candidates = np.unique(np.concatenate([np.asarray(h, dtype=np.int64) for h in hits]))
+    found = model_atoms[candidates]
+    if exclude_selection:
+        found = found[~selection[found]]
+    if len(found) == 0:
+        return found, np.zeros(0)
+    # Closest selected atom for each hit, again through an index (of the selection)
+    distance, _ = build_index(query).query(structure["xyz"][found].astype(np.float64), k=1)
+    return found, distance
+
+
+def neighbor_table(structure, atoms, distance):
+    return pd.DataFrame({
+        "Chain": structure["chain"][atoms],
+        "Residue": structure["resname"][atoms],
+        "Number": structure["resseq"][atoms],
+        "Atom": structure["name"][atoms],
+        "Element": structure["element"][atoms],
+        "Distance (Å)": np.round(distance, 2),
+    }).sort_values("Distance (Å)", kind="stable").reset_index(drop=True)
+
+
+def find_ligands(structure):
+    """Hetero residues of the first model other than water and ions, one row per ligand"""
+    atom_residue, table = residue_index(structure)
+    model = first_model(structure)
+    ligand = model & structure["hetero"] & ~np.isin(structure["resname"], WATER_RESIDUES + ION_RESIDUES)
+    counts = np.bincount(atom_residue[ligand], minlength=len(table))
+    found = table[counts > 0].copy()
+    found["atoms"] = counts[counts > 0]
+    found["label"] = residue_labels(found)
+    return found.reset_index().rename(columns={"index": "residue"})
+
+
+def binding_site(structure, residue, radius=5.0, tree=None):
+    """
+    Residues with any atom within radius of ligand residue number `residue`
+    (from residue_index), with their closest distance to the ligand
+    """
+    atom_residue, table = residue_index(structure)
+    ligand_atoms = atom_residue == residue
+    atoms, distance = neighbors_within(structure, ligand_atoms, radius, tree)
+    is_solvent = np.isin(structure["resname"][atoms], WATER_RESIDUES)
+    atoms, distance = atoms[~is_solvent], distance[~is_solvent]
+
+    site = pd.DataFrame({"residue": atom_residue[atoms], "distance": distance})
+    site = site.groupby("residue", sort=False)["distance"].agg(["min", "size"]).reset_index()
+    site = site.merge(table, left_on="residue", right_index=True).sort_values("min")
+    return pd.DataFrame({
+        "Chain": site["chain"],
+        "Residue": site["resname"],
+        "Number": site["resseq"],
+        "Insertion": site["icode"],
+        "Closest (Å)": site["min"].round(2),
+        "Atoms in Range": site["size"],
+    }).reset_index(drop=True)
+
+
+def atom_masses(elements):
+    table, codes = np.unique(elements, return_inverse=True)
+    return np.array([ATOMIC_MASSES.get(e, DEFAULT_MASS) for e in table.tolist()])[codes]
+
+
+def radius_of_gyration(xyz, masses=None):
+    xyz = np.asarray(xyz, dtype=np.float64)
+    weights = np.ones(len(xyz)) if masses is None else np.asarray(masses, dtype=np.float64)
+    center = weights @ xyz / weights.sum()
+    return float(np.sqrt(weights @ ((xyz - center) ** 2).sum(axis=1) / weights.sum()))
+
+
+def kabsch(mobile, target):
+    """
+    Rotation R and translation t minimizing ||(mobile @ R.T + t) - target||
+    (Kabsch algorithm, with reflection correction)
+    """
+    mobile, target = np.asarray(mobile, dtype=np.float64), np.asarray(target, dtype=np.float64)
+    mobile_center, target_center = mobile.mean(axis=0), target.mean(axis=0)
+    H = (mobile - mobile_center).T @ (target - target_center)
+    U, _, Vt = np.linalg.svd(H)
+    d = np.sign(np.linalg.det(Vt.T @ U.T))
+    R = Vt.T @ np.diag([1.0, 1.0, d]) @ U.T
+    return R, target_center - mobile_center @ R.T
+
+
+def rmsd(a, b):
+    return float(np.sqrt(((np.asarray(a, dtype=np.float64) - np.asarray(b, dtype=np.float64)) ** 2).sum(axis=1).mean()))
+
+
+def _atom_keys(structure, mask):
+    atoms = np.flatnonzero(mask)
+    keys = np.char.add(np.char.add(np.char.add(np.char.add(
+        structure["chain"][atoms].astype("U4"), "|"), structure["resseq"][atoms].astype("U8")),
+        np.char.add(structure["icode"][atoms], "|")), structure["name"][atoms])
+    # Alternate locations repeat a key; keep the first occurrence
+    keys, first = np.unique(keys, return_index=True)
+    return keys, atoms[first]
+
+
+def match_atoms(reference, mobile, atoms="Cα"):
+    """Index pairs of atoms present in both structures (same chain, residue number and atom name)"""
+    def selection(structure):
+        mask = first_model(structure) & ~structure["hetero"]
+        if atoms == "Cα":
+            return mask & (structure["name"] == "CA")
+        if atoms == "Backbone":
+            return mask & np.isin(structure["name"], ["N", "CA", "C", "O"])
+        return mask & (structure["element"] != "H")
+
+    ref_keys, ref_atoms = _atom_keys(reference, selection(reference))
+    mob_keys, mob_atoms = _atom_keys(mobile, selection(mobile))
+    _, i, j = np.intersect1d(ref_keys, mob_keys, assume_unique=True, return_indices=True)
+    return ref_atoms[i], mob_atoms[j]
+
+
+def superpose(reference, mobile, atoms="Cα"):
+    """
+    RMSD of matched atoms before and after optimal superposition of mobile onto reference,
+    with the rotation, translation and number of matched atoms
+    """
+    ref_atoms, mob_atoms = match_atoms(reference, mobile, atoms)
+    if len(ref_atoms) < 3:
+        raise ValueError(f"Only {len(ref_atoms)} matching atoms; at least 3 are needed for superposition")
+    target, moving = reference["xyz"][ref_atoms], mobile["xyz"][mob_atoms]
+    R, t = kabsch(moving, target)
+    return {
+        "matched": len(ref_atoms),
+        "rmsd_before": rmsd(moving, target),
+        "rmsd_after": rmsd(moving.astype(np.float64) @ R.T + t, target),
+        "rotation": R,
+        "translation": t,
+    }
+
+
+def sphere_points(n=SASA_POINTS):
+    """n near-uniform unit vectors (golden-section spiral)"""
+    k = np.arange(n) + 0.5
+    z = 1.0 - 2.0 * k / n
+    r = np.sqrt(1.0 - z * z)
+    phi = np.pi * (3.0 - np.sqrt(5.0)) * k
+    return np.column_stack([r * np.cos(phi), r * np.sin(phi), z]).astype(np.float32)
+
+
+def vdw_radii(elements):
+    table, codes = np.unique(elements, return_inverse=True)
+    return np.array([VDW_RADII.get(e, DEFAULT_VDW_RADIUS) for e in table.tolist()], dtype=np.float32)[codes]
+
+
+def _sasa_batch(args):
+    """
+    Exposed fraction of the sphere points of a batch of atoms, given their (atom, neighbor)
+    pairs sorted by atom. Point c_i + R_i·u lies inside neighbor j when
+    d·u < (R_j² − |d|² − R_i²) / 2R_i with d = c_i − c_j, so each pair is one row of a
+    matrix product with the unit sphere points.
+    Indices are local: atom into the batch's centers, other into its neighbors.
+    """
+    centers, center_radii, neighbors, neighbor_radii, points, atom, other = args
+    d = (centers[atom] - neighbors[other]).astype(np.float64)
+    threshold = (neighbor_radii[other] ** 2 - np.einsum("ij,ij->i", d, d) - center_radii[atom] ** 2) / (2.0 * center_radii[atom])
+    buried = (d @ points.T.astype(np.float64)) < threshold[:, None]
+
+    exposed = np.ones((len(centers), len(points)), dtype=bool)
+    if len(atom):
+        # Points buried by any neighbor: OR over each atom's contiguous block of pairs
+        starts = np.flatnonzero(np.r_[True, atom[1:] != atom[:-1]])
+        exposed[atom[starts]] = ~np.logical_or.reduceat(buried, starts, axis=0)
+    return exposed.mean(axis=1)
+
+
+def _sasa_task(xyz, expanded, points, start, stop, atom, other):
+    # Only the batch's own atoms and the neighbors its pairs touch travel to a worker
+    neighbors, other = np.unique(other, return_inverse=True)
+    return (xyz[start:stop], expanded[start:stop], xyz[neighbors], expanded[neighbors], points,
+            atom - start, other.reshape(-1))
+
+
+def shrake_rupley(xyz, radii, probe=PROBE_RADIUS, n_points=SASA_POINTS, workers=None):
+    """
+    Solvent-accessible surface area (Å²) of each atom by the Shrake–Rupley method.
+    Overlapping atom pairs come from one k-d tree pair query; the sphere-point tests of each
+    batch of atoms are then a single matrix product. Large structures are split across the
+    shared worker pool.
+    """
+    xyz = np.ascontiguousarray(xyz, dtype=np.float32)
+    expanded = np.asarray(radii, dtype=np.float64) + probe
+    points = sphere_points(n_points)
+    n = len(xyz)
+    if n == 0:
+        return np.zeros(0)
+
+    pairs = build_index(xyz).query_pairs(2.0 * expanded.max(), output_type="ndarray")
+    gap = np.linalg.norm(xyz[pairs[:, 0]] - xyz[pairs[:, 1]], axis=1)
+    pairs = pairs[gap < expanded[pairs[:, 0]] + expanded[pairs[:, 1]]]
+    atom = np.concatenate([pairs[:, 0], pairs[:, 1]])
+    other = np.concatenate([pairs[:, 1], pairs[:, 0]])
+    order = np.argsort(atom, kind="stable")
+    atom, other = atom[order], other[order]
+    bounds = np.searchsorted(atom, np.arange(0, n + SASA_BATCH_ATOMS, SASA_BATCH_ATOMS).clip(max=n))
+
+    tasks = [
+        _sasa_task(xyz, expanded, points, start, min(start + SASA_BATCH_ATOMS, n), atom[lo:hi], other[lo:hi])
+        for start, lo, hi in zip(range(0, n, SASA_BATCH_ATOMS), bounds[:-1], bounds[1:])
+    ]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or n < SASA_PARALLEL_ATOMS:
+        fractions = [_sasa_batch(task) for task in tasks]
+    else:
+        fractions = parallel_map(_sasa_batch, tasks, chunksize=max(1, len(tasks) // (workers * 4)))
+    return np.concatenate(fractions) * 4.0 * np.pi * expanded ** 2
+
+
+def sasa(structure, probe=PROBE_RADIUS, n_points=SASA_POINTS, include_hydrogens=False):
+    """
+    Per-atom SASA over the first model (waters excluded) as a full-length array (NaN for
+    excluded atoms), and a per-residue table with absolute and relative exposure
+    """
+    atom_residue, table = residue_index(structure)
+    included = first_model(structure) & ~np.isin(structure["resname"], WATER_RESIDUES)
+    if not include_hydrogens:
+        included &= structure["element"] != "H"
+
+    atoms = np.flatnonzero(included)
+    per_atom = np.full(len(structure["xyz"]), np.nan)
+    per_atom[atoms] = shrake_rupley(structure["xyz"][atoms], vdw_radii(structure["element"][atoms]), probe, n_points)
+
+    polar = np.isin(structure["element"][atoms], ["N", "O"])
+    residues = atom_residue[atoms]
+    total = np.bincount(residues, per_atom[atoms], minlength=len(table))
+    polar_area = np.bincount(residues, np.where(polar, per_atom[atoms], 0.0), minlength=len(table))
+    present = np.bincount(residues, minlength=len(table)) > 0
+
+    max_area = table["resname"].map(MAX_RESIDUE_SASA).to_numpy(dtype=np.float64)
+    per_residue = pd.DataFrame({
+        "Chain": table["chain"],
+        "Residue": table["resname"],
+        "Number": table["resseq"],
+        "Insertion": table["icode"],
+        "SASA (Å²)": total.round(2),
+        "Polar (Å²)": polar_area.round(2),
+        "Apolar (Å²)": (total - polar_area).round(2),
+        "Relative (%)": (100.0 * total / max_area).round(1),
+    })[present].reset_index(drop=True)
+    return per_atom, per_residue
+
+
+def exposure_per_atom(structure, per_atom):
+    """
+    Relative exposure (0–100) for colouring: each atom gets its residue's relative SASA,
+    or its own exposed fraction for residues without a reference maximum (ligands, nucleotides)
+    """
+    atom_residue, table = residue_index(structure)
+    valid = ~np.isnan(per_atom)
+    total = np.bincount(atom_residue[valid], per_atom[valid], minlength=len(table))
+    max_area = table["resname"].map(MAX_RESIDUE_SASA).to_numpy(dtype=np.float64)
+    residue_exposure = 100.0 * total / max_area
+
+    sphere_area = 4.0 * np.pi * (vdw_radii(structure["element"]).astype(np.float64) + PROBE_RADIUS) ** 2
+    exposure = residue_exposure[atom_residue]
+    fallback = np.isnan(exposure)
+    exposure[fallback] = 100.0 * np.nan_to_num(per_atom[fallback]) / sphere_area[fallback]
+    return np.clip(exposure, 0.0, 100.0).astype(np.float32)
+
+
+# DSSP electrostatic H-bond model: q1·q2·f = 0.42e · 0.20e · 332 kcal·Å/mol, bond below -0.5 kcal/mol
+HBOND_COUPLING = 0.084 * 332.0
+HBOND_ENERGY_CUTOFF = -0.5
+HBOND_CA_RANGE = 9.0
+PEPTIDE_BOND_MAX = 2.5
+BEND_ANGLE = 70.0
+
+# Assignment priority, lowest first; later codes overwrite earlier ones
+SS_PRIORITY = ["S", "T", "I", "G", "E", "B", "H"]
+SS_NAMES = {
+    "H": "α-helix", "G": "3₁₀-helix", "I": "π-helix", "E": "β-strand", "B": "β-bridge",
+    "T": "Turn", "S": "Bend", "-": "Coil",
+}
+# PDB HELIX record classes
+HELIX_CLASSES = {"H": 1, "I": 3, "G": 5}
+
+
+def backbone(structure):
+    """
+    Residue-level backbone arrays (N, CA, C, O) for residues of the first model with a
+    complete backbone, and their rows in the residue table. Modified amino acids (HETATM
+    records such as MSE) count as protein when they have all four backbone atoms.
+    """
+    atom_residue, table = residue_index(structure)
+    protein = first_model(structure) & ~np.isin(structure["resname"], WATER_RESIDUES)
+    coords = {}
+    for name in ("N", "CA", "C", "O"):
+        xyz = np.full((len(table), 3), np.nan)
+        # Reversed, so the first alternate location is the one that sticks
+        atoms = np.flatnonzero(protein & (structure["name"] == name))[::-1]
+        xyz[atom_residue[atoms]] = structure["xyz"][atoms]
+        coords[name] = xyz
+    complete = ~np.isnan(np.hstack(list(coords.values()))).any(axis=1)
+    rows = np.flatnonzero(complete)
+    return {name: xyz[rows] for name, xyz in coords.items()}, rows, table
+
+
+def backbone_hbonds(bb, resnames):
+    """
+    DSSP backbone H-bonds as (acceptor C=O residue, donor N-H residue, energy) arrays over
+    the compact backbone, plus the chain-segment id of every residue. Amide H atoms are
+    placed along the C=O bisector of the preceding peptide, as DSSP does.
+    """
+    N, CA, C, O = bb["N"], bb["CA"], bb["C"], bb["O"]
+    m = len(N)
+    link = np.zeros(m, dtype=bool)
+    link[1:] = np.linalg.norm(C[:-1] - N[1:], axis=1) < PEPTIDE_BOND_MAX
+    segment = np.cumsum(~link)
+
+    H = np.full((m, 3), np.nan)
+    co = C[:-1] - O[:-1]
+    H[1:] = N[1:] + co / np.linalg.norm(co, axis=1)[:, None]
+    # No amide H: chain starts, breaks and proline
+    H[~link | (resnames == "PRO")] = np.nan
+
+    if m < 2:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0), segment
+    pairs = build_index(CA).query_pairs(HBOND_CA_RANGE, output_type="ndarray")
+    acceptor = np.concatenate([pairs[:, 0], pairs[:, 1]])
+    donor = np.concatenate([pairs[:, 1], pairs[:, 0]])
+    keep = (np.abs(acceptor - donor) > 1) & ~np.isnan(H[donor, 0])
+    acceptor, donor = acceptor[keep], donor[keep]
+
+    def dist(a, b):
+        return np.linalg.norm(a - b, axis=1)
+
+    energy = HBOND_COUPLING * (
+        1.0 / dist(O[acceptor], N[donor]) + 1.0 / dist(C[acceptor], H[donor])
+        - 1.0 / dist(O[acceptor], H[donor]) - 1.0 / dist(C[acceptor], N[donor])
+    )
+    bonded = energy < HBOND_ENERGY_CUTOFF
+    return acceptor[bonded], donor[bonded], energy[bonded], segment
+
+
+def assign_secondary_structure(structure):
+    """
+    DSSP-style secondary structure (H, G, I, E, B, T, S, -) for every residue of the
+    residue table (blank for residues without a protein backbone), and the H-bond table.
+    Turns, helices, bridges and ladders are all set-membership tests on the H-bond list;
+    β-bulges are not modelled.
+    """
+    bb, rows, table = backbone(structure)
+    m = len(rows)
+    codes = np.full(len(table), "", dtype="U1")
+    resnames = table["resname"].to_numpy()[rows]
+    acceptor, donor, energy, segment = backbone_hbonds(bb, resnames)
+    ss = np.full(m, "-", dtype="U1")
+
+    keys = np.unique(acceptor * m + donor)
+
+    def hbond(a, d):
+        valid = (a >= 0) & (a < m) & (d >= 0) & (d < m)
+        return valid & np.isin(np.where(valid, a * m + d, -1), keys)
+
+    def same_segment(i, j):
+        valid = (i >= 0) & (i < m) & (j >= 0) & (j < m)
+        return valid & (segment[np.clip(i, 0, m - 1)] == segment[np.clip(j, 0, m - 1)])
+
+    def mark(starts, length):
+        covered = (starts[:, None] + np.arange(length)[None, :]).ravel()
+        return np.unique(covered[covered < m])
+
+    index = np.arange(m)
+    layers = {}
+
+    # Bends: CA(i-2)→CA(i)→CA(i+2) direction change above BEND_ANGLE
+    inner = index[2:-2] if m > 4 else np.zeros(0, dtype=np.int64)
+    inner = inner[same_segment(inner - 2, inner + 2)]
+    v1, v2 = bb["CA"][inner] - bb["CA"][inner - 2], bb["CA"][inner + 2] - bb["CA"][inner]
+    cos = np.einsum("ij,ij->i", v1, v2) / (np.linalg.norm(v1, axis=1) * np.linalg.norm(v2, axis=1))
+    layers["S"] = inner[np.degrees(np.arccos(np.clip(cos, -1, 1))) > BEND_ANGLE]
+
+    # n-turns: H-bond from C=O(i) to N-H(i+n) within one chain segment
+    turns = {n: hbond(index, index + n) & same_segment(index, index + n) for n in (3, 4, 5)}
+    layers["T"] = np.unique(np.concatenate([mark(np.flatnonzero(turns[n]) + 1, n - 1) for n in turns]))
+
+    # Minimal helices: two consecutive n-turns at i-1 and i cover residues i..i+n-1.
+    # 3₁₀ and π helices are only assigned where they do not overlap an α-helix.
+    is_alpha = np.zeros(m, dtype=bool)
+    for code, n in (("H", 4), ("G", 3), ("I", 5)):
+        starts = np.flatnonzero(turns[n][:-1] & turns[n][1:]) + 1
+        if code != "H" and len(starts):
+            span = np.minimum(starts[:, None] + np.arange(n)[None, :], m - 1)
+            starts = starts[~is_alpha[span].any(axis=1)]
+        layers[code] = mark(starts, n)
+        if code == "H":
+            is_alpha[layers[code]] = True
+
+    # Bridges between residues i < j that are not sequence neighbours
+    pairs = build_index(bb["CA"]).query_pairs(HBOND_CA_RANGE, output_type="ndarray") if m > 1 else np.zeros((0, 2), dtype=np.int64)
+    i, j = pairs.min(axis=1), pairs.max(axis=1)
+    far = (j - i > 2) | (segment[i] != segment[j])
+    i, j = i[far], j[far]
+    flanked = same_segment(i - 1, i + 1) & same_segment(j - 1, j + 1)
+    parallel = flanked & ((hbond(i - 1, j) & hbond(j, i + 1)) | (hbond(j - 1, i) & hbond(i, j + 1)))
+    antiparallel = flanked & ((hbond(i, j) & hbond(j, i)) | (hbond(i - 1, j + 1) & hbond(j - 1, i + 1)))
+
+    strand, bridge = [], []
+    for is_type, step in ((parallel, 1), (antiparallel, -1)):
+        bi, bj = i[is_type], j[is_type]
+        bridge_keys = bi * m + bj
+        # A bridge with a same-type neighbour bridge forms a ladder (E); otherwise it is isolated (B)
+        laddered = np.isin((bi + 1) * m + (bj + step), bridge_keys) | np.isin((bi - 1) * m + (bj - step), bridge_keys)
+        strand += [bi[laddered], bj[laddered]]
+        bridge += [bi[~laddered], bj[~laddered]]
+    layers["E"] = np.unique(np.concatenate(strand)) if strand else np.zeros(0, dtype=np.int64)
+    layers["B"] = np.setdiff1d(np.unique(np.concatenate(bridge)), layers["E"]) if bridge else np.zeros(0, dtype=np.int64)
+
+    for code in SS_PRIORITY:
+        ss[layers[code]] = code
+    codes[rows] = ss
+
+    hbonds = pd.DataFrame({
+        "Acceptor (C=O)": table["chain"].to_numpy()[rows[acceptor]] + ":" + resnames[acceptor] + table["resseq"].to_numpy()[rows[acceptor]].astype(str),
+        "Donor (N-H)": table["chain"].to_numpy()[rows[donor]] + ":" + resnames[donor] + table["resseq"].to_numpy()[rows[donor]].astype(str),
+        "Separation": donor - acceptor,
+        "Energy (kcal/mol)": energy.round(2),
+    })
+    return codes, table, hbonds
+
+
+def _record_residue(table, row):
+    return table["resname"][row], table["chain"][row] or " ", int(table["resseq"][row]), table["icode"][row] or " "
+
+
+def secondary_structure_records(codes, table):
+    """PDB HELIX/SHEET records for runs of helix (H, G, I) and strand (E) residues"""
+    helices, strands = [], []
+    chain = table["chain"].to_numpy()
+    start = 0
+    for k in range(1, len(codes) + 1):
+        if k < len(codes) and codes[k] == codes[start] and chain[k] == chain[start]:
+            continue
+        code = codes[start]
+        if code in HELIX_CLASSES:
+            helices.append((start, k - 1, HELIX_CLASSES[code]))
+        elif code == "E" and k - start >= 2:
+            strands.append((start, k - 1))
+        start = k
+
+    records = []
+    for n, (first, last, helix_class) in enumerate(helices, 1):
+        res1, ch1, seq1, ic1 = _record_residue(table, first)
+        res2, ch2, seq2, ic2 = _record_residue(table, last)
+        records.append(
+            f"HELIX  {n % 1000:3d} {n % 1000:>3} {res1:>3} {ch1} {seq1:4d}{ic1} {res2:>3} {ch2} {seq2:4d}{ic2}{helix_class:2d}"
+            f"{'':30} {last - first + 1:5d}"
+        )
+    for n, (first, last) in enumerate(strands, 1):
+        res1, ch1, seq1, ic1 = _record_residue(table, first)
+        res2, ch2, seq2, ic2 = _record_residue(table, last)
+        records.append(
+            f"SHEET  {1:3d} {f'S{n % 100}':>3} 1 {res1:>3} {ch1}{seq1:4d}{ic1} {res2:>3} {ch2}{seq2:4d}{ic2} 0"
+        )
+    return records
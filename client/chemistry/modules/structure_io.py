@@ -0,0 +1,425 @@
+"""
+Structure I/O Module
+Server-side parsing of PDB/mmCIF/XYZ files into NumPy atom arrays
+
+Features:
+- Vectorized fixed-column PDB parsing
+- mmCIF _atom_site loop parsing
+- XYZ parsing
+- Streaming gzip decompression of .pdb.gz / .cif.gz files
+- Compact binary columnar encoding (MMTF-style fixed-point, delta and dictionary codecs)
+- Level-of-detail reduction (first model, chain selection, solvent/ion stripping, Cα trace)
+- Serialization of the reduced model back to PDB (or mmCIF when PDB limits are exceeded)
+"""
+
+import io
+import re
+import zlib
+
+import numpy as np
+
+# Auto level of detail: thresholds on the atom count after chain selection
+LOD_STRIP_SOLVENT_ABOVE = 20_000
+LOD_CA_TRACE_ABOVE = 150_000
+
+LOD_LEVELS = ["Auto", "Full", "No Solvent/Ions", "Cα Trace"]
+
+WATER_RESIDUES = ["HOH", "WAT", "DOD", "H2O", "SOL", "TIP", "TIP3"]
+ION_RESIDUES = [
+    "NA", "K", "LI", "RB", "CS", "CL", "BR", "IOD", "F", "MG", "CA", "SR", "BA", "ZN", "MN", "FE", "FE2",
+    "CU", "CU1", "CO", "NI", "CD", "HG", "PB", "AL", "SO4", "PO4", "NO3", "NH4",
+]
+
+# gzip inflation: chunk size, and a ceiling against decompression bombs
+DECOMPRESS_CHUNK_BYTES = 1 << 20
+MAX_DECOMPRESSED_BYTES = 1 << 30
+
+# Binary columnar encoding ("bcs"): magic tag and fixed-point scales
+BINARY_FORMAT = "chemlab-structure/1"
+COORD_SCALE = 1000
+OCCUPANCY_SCALE = 100
+BFACTOR_SCALE = 100
+
+# Column order shared by every parser; "hetero" marks HETATM records
+ATOM_FIELDS = ["hetero", "name", "altloc", "resname", "chain", "resseq", "icode", "xyz", "occupancy", "bfactor", "element", "model"]
+
+
+def _as_bytes(data):
+    return data.encode("utf-8", errors="replace") if isinstance(data, str) else bytes(data)
+
+
+def _column(u8, start, stop):
+    # Fixed-width column slice (0-based, end exclusive) of an (N, 80) uint8 record array
+    width = stop - start
+    return np.char.strip(np.ascontiguousarray(u8[:, start:stop]).view(f"S{width}").ravel())
+
+
+def _to_float(col, default=0.0):
+    col = np.where(col == b"", str(default).encode(), col)
+    return col.astype(np.float64)
+
+
+def _element_from_name(names):
+    # Atom names without an element column: first letter of the stripped name ("1HB" -> "H")
+    stripped = np.char.lstrip(names, "0123456789")
+    return np.char.upper(np.char.ljust(stripped, 1).astype("U1"))
+
+
+def parse_pdb(data):
+    """
+    Parse PDB text/bytes into atom arrays.
+    Records are cut into fixed columns for all lines at once, so parsing cost is a
+    handful of array operations regardless of atom count.
+    """
+    lines = np.array(_as_bytes(data).split(b"\n"), dtype="S80")
+    is_atom = np.char.startswith(lines, b"ATOM  ") | np.char.startswith(lines, b"HETATM")
+    is_model = np.char.startswith(lines, b"MODEL ")
+    model_of_line = np.maximum(np.cumsum(is_model), 1)
+    ss_records = [line.decode() for line in lines[np.char.startswith(lines, b"HELIX ") | np.char.startswith(lines, b"SHEET ")]]
+
+    records = lines[is_atom]
+    u8 = records.view(np.uint8).reshape(len(records), 80)
+
+    names = _column(u8, 12, 16).astype("U4")
+    elements = _column(u8, 76, 78).astype("U2")
+    blank = elements == ""
+    if blank.any():
+        elements[blank] = _element_from_name(names[blank])
+
+    resseq = _column(u8, 22, 26)
+    structure = {
+        "hetero": np.char.startswith(records, b"HETATM"),
+        "name": names,
+        "altloc": _column(u8, 16, 17).astype("U1"),
+        "resname": _column(u8, 17, 20).astype("U3"),
+        "chain": _column(u8, 21, 22).astype("U1"),
+        "resseq": np.where(resseq == b"", b"0", resseq).astype(np.int32),
+        "icode": _column(u8, 26, 27).astype("U1"),
+        "xyz": np.column_stack([_to_float(_column(u8, a, a + 8)) for a in (30, 38, 46)]).astype(np.float32),
+        "occupancy": _to_float(_column(u8, 54, 60), 1.0).astype(np.float32),
+        "bfactor": _to_float(_column(u8, 60, 66)).astype(np.float32),
+        "element": np.char.capitalize(elements),
+        "model": model_of_line[is_atom].astype(np.int32),
+    }
+    structure["ss_records"] = ss_records
+    return structure
+
+
+# CIF token: a quoted string closes only at a quote followed by whitespace (so C5' is one bare token)
+_CIF_TOKEN = re.compile(r"""'(?:[^']|'(?=\S))*'|"(?:[^"]|"(?=\S))*"|\S+""")
+
+
+def _cif_tokens(lines, n_columns):
+    text = "\n".join(lines)
+    if '"' not in text and "'" not in text:
+        tokens = np.array(text.split(), dtype=object)
+    else:
+        tokens = np.array(_CIF_TOKEN.findall(text), dtype=object)
+        quoted = np.array([t[0] in "'\"" and len(t) > 1 and t[-1] == t[0] for t in tokens], dtype=bool)
+        tokens[quoted] = [t[1:-1] for t in tokens[quoted]]
+    return tokens.reshape(-1, n_columns)
+
+
+def parse_mmcif(data):
+    """Parse the _atom_site loop of an mmCIF file into atom arrays"""
+    lines = _as_bytes(data).decode("utf-8", errors="replace").splitlines()
+    columns, rows, in_loop = [], [], False
+    for i, line in enumerate(lines):
+        stripped = line.strip()
+        if stripped.startswith("_atom_site."):
+            columns.append(stripped.split()[0][len("_atom_site."):])
+            in_loop = True
+        elif in_loop:
+            # Values run until the next category, loop or comment
+            end = i
+            while end < len(lines) and not lines[end].startswith(("_", "loop_", "#", "data_")):
+                end += 1
+            rows = [l for l in lines[i:end] if l.strip()]
+            break
+    if not columns:
+        raise ValueError("No _atom_site records found in mmCIF file")
+
+    table = _cif_tokens(rows, len(columns))
+    index = {name: j for j, name in enumerate(columns)}
+
+    def field(*names, default=""):
+        for name in names:
+            if name in index:
+                col = table[:, index[name]].astype(str)
+                return np.where(np.isin(col, ["?", "."]), default, col)
+        return np.full(len(table), default, dtype="U1")
+
+    def number(*names, default=0.0):
+        col = field(*names, default=str(default))
+        return col.astype(np.float64)
+
+    elements = field("type_symbol").astype("U2")
+    names = field("label_atom_id", "auth_atom_id").astype("U4")
+    blank = elements == ""
+    if blank.any():
+        elements[blank] = _element_from_name(names[blank])
+
+    return {
+        "hetero": field("group_PDB") == "HETATM",
+        "name": names,
+        "altloc": field("label_alt_id").astype("U1"),
+        # Chemical component IDs run to 5 characters (3 only in fixed-column PDB files)
+        "resname": field("auth_comp_id", "label_comp_id").astype("U5"),
+        "chain": field("auth_asym_id", "label_asym_id"),
+        "resseq": number("auth_seq_id", "label_seq_id").astype(np.int32),
+        "icode": field("pdbx_PDB_ins_code").astype("U1"),
+        "xyz": np.column_stack([number(f"Cartn_{axis}") for axis in "xyz"]).astype(np.float32),
+        "occupancy": number("occupancy", default=1.0).astype(np.float32),
+        "bfactor": number("B_iso_or_equiv").astype(np.float32),
+        "element": np.char.capitalize(elements),
+        "model": number("pdbx_PDB_model_num", default=1).astype(np.int32),
+        "ss_records": [],
+    }
+
+
+def parse_xyz(data):
+    """Parse the first frame of an XYZ file (atom count, comment, element x y z lines)"""
+    lines = _as_bytes(data).decode("utf-8", errors="replace").splitlines()
+    n_atoms = int(lines[0].split()[0])
+    table = np.array([line.split()[:4] for line in lines[2:2 + n_atoms]])
+    n = len(table)
+    return {
+        "hetero": np.ones(n, dtype=bool),
+        "name": table[:, 0].astype("U4"),
+        "altloc": np.full(n, "", dtype="U1"),
+        "resname": np.full(n, "UNL", dtype="U3"),
+        "chain": np.full(n, "A", dtype="U1"),
+        "resseq": np.ones(n, dtype=np.int32),
+        "icode": np.full(n, "", dtype="U1"),
+        "xyz": table[:, 1:4].astype(np.float32),
+        "occupancy": np.ones(n, dtype=np.float32),
+        "bfactor": np.zeros(n, dtype=np.float32),
+        "element": np.char.capitalize(table[:, 0].astype("U2")),
+        "model": np.ones(n, dtype=np.int32),
+        "ss_records": [],
+    }
+
+
+def is_gzip(data):
+    return bytes(data[:2]) == b"\x1f\x8b"
+
+
+def gunzip(source, chunk_bytes=DECOMPRESS_CHUNK_BYTES, limit=MAX_DECOMPRESSED_BYTES):
+    """
+    Inflate gzip data given as bytes or a file-like object, one chunk at a time,
+    so only the compressed chunk in flight and the growing output are held
+    """
+    stream = io.BytesIO(source) if isinstance(source, (bytes, bytearray, memoryview)) else source
+    inflater = zlib.decompressobj(wbits=31)
+    out, size = [], 0
+    for chunk in iter(lambda: stream.read(chunk_bytes), b""):
+        block = inflater.decompress(chunk)
+        size += len(block)
+        if size > limit:
+            raise ValueError(f"Decompressed structure exceeds {limit / 1e6:.0f} MB")
+        out.append(block)
+        # Concatenated gzip members (e.g. split archives) continue in unused_data
+        while inflater.eof and inflater.unused_data:
+            rest = inflater.unused_data
+            inflater = zlib.decompressobj(wbits=31)
+            out.append(inflater.decompress(rest))
+    out.append(inflater.flush())
+    return b"".join(out)
+
+
+def structure_format(filename):
+    """
+    (format, compressed) for a structure filename, e.g.
+    "1abc.cif.gz" -> ("cif", True); unknown extensions fall back to PDB
+    """
+    name = filename.lower()
+    compressed = name.endswith(".gz")
+    if compressed:
+        name = name[:-3]
+    ext = name.rsplit(".", 1)[-1] if "." in name else ""
+    if ext in ("cif", "mmcif"):
+        return "cif", compressed
+    if ext in PARSERS:
+        return ext, compressed
+    return "pdb", compressed
+
+
+def _dictionary_encode(values):
+    # Few distinct residue/atom names: store each once plus a small integer code per atom
+    table, codes = np.unique(values, return_inverse=True)
+    dtype = np.uint8 if len(table) <= 0xFF else np.uint16 if len(table) <= 0xFFFF else np.uint32
+    return table, codes.astype(dtype)
+
+
+def to_binary(structure):
+    """
+    Compact columnar encoding of a structure (MMTF-style codecs, zipped NumPy arrays):
+    coordinates as delta-encoded fixed-point integers, strings dictionary-encoded,
+    residue numbers and model numbers delta-encoded. Lossless at PDB precision.
+    """
+    columns = {"format": np.array(BINARY_FORMAT)}
+    fixed = np.round(structure["xyz"].astype(np.float64) * COORD_SCALE).astype(np.int32)
+    # Neighbouring atoms are close in space, so deltas are small and compress well
+    columns["xyz_delta"] = np.diff(fixed, axis=0, prepend=np.zeros((1, 3), dtype=np.int32))
+    columns["occupancy"] = np.round(structure["occupancy"] * OCCUPANCY_SCALE).astype(np.int16)
+    columns["bfactor"] = np.round(structure["bfactor"] * BFACTOR_SCALE).astype(np.int32)
+    columns["resseq_delta"] = np.diff(structure["resseq"].astype(np.int32), prepend=np.int32(0))
+    columns["model_delta"] = np.diff(structure["model"].astype(np.int32), prepend=np.int32(0))
+    columns["hetero"] = np.packbits(structure["hetero"])
+    for field in ("name", "altloc", "resname", "chain", "icode", "element"):
+        columns[f"{field}_table"], columns[f"{field}_codes"] = _dictionary_encode(structure[field])
+    columns["ss_records"] = np.array(structure.get("ss_records", []), dtype=str)
+
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **columns)
+    return buffer.getvalue()
+
+
+def from_binary(data):
+    """Decode a structure written by to_binary"""
+    with np.load(io.BytesIO(_as_bytes(data)), allow_pickle=False) as columns:
+        if "format" not in columns or str(columns["format"]) != BINARY_FORMAT:
+            raise ValueError("Not a binary columnar structure file")
+        n = len(columns["xyz_delta"])
+        structure = {
+            "hetero": np.unpackbits(columns["hetero"], count=n).astype(bool),
+            "xyz": (np.cumsum(columns["xyz_delta"], axis=0, dtype=np.int64) / COORD_SCALE).astype(np.float32),
+            "occupancy": (columns["occupancy"] / OCCUPANCY_SCALE).astype(np.float32),
+            "bfactor": (columns["bfactor"] / BFACTOR_SCALE).astype(np.float32),
+            "resseq": np.cumsum(columns["resseq_delta"], dtype=np.int64).astype(np.int32),
+            "model": np.cumsum(columns["model_delta"], dtype=np.int64).astype(np.int32),
+            "ss_records": columns["ss_records"].tolist(),
+        }
+        for field in ("name", "altloc", "resname", "chain", "icode", "element"):
+            structure[field] = columns[f"{field}_table"][columns[f"{field}_codes"]]
+    return structure
+
+
+PARSERS = {
+    "pdb": parse_pdb,
+    "cif": parse_mmcif,
+    "xyz": parse_xyz,
+    "bcs": from_binary,
+}
+
+
+def parse_structure(data, fmt):
+    """Parse any supported format; gzip-compressed input is detected and inflated first"""
+    if not isinstance(data, str) and is_gzip(data):
+        data = gunzip(data)
+    return PARSERS[fmt](data)
+
+
+def atom_count(structure):
+    return len(structure["xyz"])
+
+
+def lod_mask(structure, level="Auto", chains=None):
+    """
+    Atoms kept by the level-of-detail policy, and a description of each step applied.
+    Only the first model is kept; "Auto" strips solvent/ions above
+    LOD_STRIP_SOLVENT_ABOVE atoms and collapses to a Cα/P trace above LOD_CA_TRACE_ABOVE.
+    """
+    steps = []
+    mask = structure["model"] == structure["model"].min()
+    if structure["model"].max() > structure["model"].min():
+        steps.append("first model only")
+
+    if chains:
+        mask &= np.isin(structure["chain"], list(chains))
+        steps.append(f"chains {', '.join(chains)}")
+
+    if level == "Full":
+        return mask, steps
+
+    if level == "No Solvent/Ions" or level == "Cα Trace" or (level == "Auto" and mask.sum() > LOD_STRIP_SOLVENT_ABOVE):
+        solvent = np.isin(structure["resname"], WATER_RESIDUES) | (structure["hetero"] & np.isin(structure["resname"], ION_RESIDUES))
+        if (mask & solvent).any():
+            mask &= ~solvent
+            steps.append("waters/ions removed")
+
+    if level == "Cα Trace" or (level == "Auto" and mask.sum() > LOD_CA_TRACE_ABOVE):
+        polymer = ~structure["hetero"]
+        trace = polymer & (((structure["name"] == "CA") & (structure["element"] == "C")) | (structure["name"] == "P"))
+        mask &= trace
+        steps.append("Cα/P trace")
+
+    return mask, steps
+
+
+def subset(structure, mask):
+    reduced = {field: structure[field][mask] for field in ATOM_FIELDS}
+    reduced["ss_records"] = structure.get("ss_records", [])
+    return reduced
+
+
+def _columns(structure):
+    # Python lists are much faster than NumPy scalars inside the per-atom formatting loop
+    x, y, z = structure["xyz"].T
+    return zip(
+        structure["hetero"].tolist(), structure["name"].tolist(), structure["altloc"].tolist(),
+        structure["resname"].tolist(), structure["chain"].tolist(), structure["resseq"].tolist(),
+        structure["icode"].tolist(), x.tolist(), y.tolist(), z.tolist(), structure["occupancy"].tolist(),
+        structure["bfactor"].tolist(), structure["element"].tolist(), structure["model"].tolist(),
+    )
+
+
+def to_pdb(structure):
+    """
+    PDB text of a structure (≤ 99,999 atoms per model, single-character chain IDs, 3-character residue names).
+    Several models are written as MODEL/ENDMDL blocks.
+    """
+    lines = list(structure.get("ss_records", []))
+    multi_model = len(structure["model"]) > 0 and structure["model"].max() > structure["model"].min()
+    current, serial = None, 0
+    for het, name, alt, res, chain, seq, icode, x, y, z, occ, b, element, model in _columns(structure):
+        if multi_model and model != current:
+            if current is not None:
+                lines.append("ENDMDL")
+            lines.append(f"MODEL     {model:4d}")
+            current, serial = model, 0
+        serial += 1
+        # Four-character names start in column 13, shorter ones in column 14
+        name = name if len(name) == 4 else f" {name:<3}"
+        lines.append(
+            f"{'HETATM' if het else 'ATOM  '}{serial % 100000:5d} {name}{alt:1}{res:>3} {chain:1}{seq:4d}{icode:1}   "
+            f"{x:8.3f}{y:8.3f}{z:8.3f}{occ:6.2f}{b:6.2f}          {element:>2}"
+        )
+    if multi_model:
+        lines.append("ENDMDL")
+    lines.append("END")
+    return "\n".join(lines)
+
+
+def _cif_value(value):
+    if not value:
+        return "?"
+    if value[0] in "'\"_#$;[" or " " in value:
+        return f'"{value}"'
+    return value
+
+
+def to_mmcif(structure, name="structure"):
+    """Minimal mmCIF (_atom_site only); no limits on atom count or chain ID length"""
+    header = [f"data_{name}", "loop_"] + [f"_atom_site.{column}" for column in (
+        "group_PDB", "id", "type_symbol", "label_atom_id", "label_alt_id", "label_comp_id", "auth_asym_id",
+        "auth_seq_id", "pdbx_PDB_ins_code", "Cartn_x", "Cartn_y", "Cartn_z", "occupancy", "B_iso_or_equiv",
+        "pdbx_PDB_model_num",
+    )]
+    rows = [
+        f"{'HETATM' if het else 'ATOM'} {i + 1} {element or '?'} {_cif_value(atom)} {alt or '.'} {res or '?'} {chain or '?'} "
+        f"{seq} {icode or '?'} {x:.3f} {y:.3f} {z:.3f} {occ:.2f} {b:.2f} {model}"
+        for i, (het, atom, alt, res, chain, seq, icode, x, y, z, occ, b, element, model) in enumerate(_columns(structure))
+    ]
+    return "\n".join(header + rows + ["#"])
+
+
+def serialize(structure):
+    """Viewer payload: PDB when it can represent the model(s), mmCIF otherwise"""
+    per_model = np.bincount(structure["model"]).max() if atom_count(structure) else 0
+    fits_columns = atom_count(structure) == 0 or (
+        np.char.str_len(structure["chain"]).max() <= 1 and np.char.str_len(structure["resname"]).max() <= 3
+    )
+    if per_model <= 99_999 and fits_columns:
+        return to_pdb(structure), "pdb"
+    return to_mmcif(structure), "cif"
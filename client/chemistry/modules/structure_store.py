@@ -0,0 +1,311 @@
+"""
+Structure Store Module
+Local content-addressed cache for RCSB structure files
+
+Features:
+- Blobs stored once by SHA-256, gzip-compressed, indexed by (PDB ID, format) in SQLite
+- Structures downloaded from RCSB as .gz and kept compressed (shared pooled, rate-limited client)
+- Conditional revalidation (ETag / Last-Modified) after a freshness window
+- Stale copies served when the network or RCSB is unavailable
+- Size-bounded LRU eviction (bundled entries are pinned)
+- Pre-seeded offline bundle directory (plain or .gz files)
+- One fetch per structure, however many sessions ask at once
+- Listeners notified of every structure entering the store (e.g. the sequence index)
+"""
+
+import gzip
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+
+from .http_client import get_client
+
+RCSB_URL = "https://files.rcsb.org/download/{pdb_id}.{fmt}.gz"
+
+STORE_DIR = os.environ.get("CHEMLAB_STRUCTURE_DIR", os.path.join(os.path.expanduser("~"), ".chemlab", "structures"))
+BUNDLE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "structure_bundle")
+
+# Stored copies are used without asking RCSB again for this long
+REVALIDATE_AFTER = 7 * 24 * 3600
+MAX_STORE_BYTES = 512 * 1024 * 1024
+REQUEST_TIMEOUT = (5, 30)  # (connect, read) seconds
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+# Structures the 3D Visualizer offers as examples (the default view and the input placeholder)
+BUNDLE_EXAMPLES = ["1BNA", "1CRN", "6VXX"]
+
+PDB_ID_PATTERN = re.compile(r"^[0-9][A-Za-z0-9]{3}$")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    pdb_id TEXT NOT NULL,
+    format TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    pinned INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (pdb_id, format)
+);
+CREATE INDEX IF NOT EXISTS entries_lru ON entries (pinned, accessed_at);
+"""
+
+
+def _split_gzip(raw):
+    """(plain bytes, gzip bytes or None) for a blob that may or may not be gzipped"""
+    if raw[:2] == GZIP_MAGIC:
+        return gzip.decompress(raw), raw
+    return raw, None
+
+
+def normalize_pdb_id(pdb_id):
+    pdb_id = (pdb_id or "").strip().upper()
+    if not PDB_ID_PATTERN.match(pdb_id):
+        raise ValueError(f"'{pdb_id}' is not a valid PDB ID (4 characters, starting with a digit)")
+    return pdb_id
+
+
+class StructureStore:
+    """On-disk structure cache shared by every session of the app process"""
+
+    def __init__(self, root=STORE_DIR, bundle_dir=BUNDLE_DIR, max_bytes=MAX_STORE_BYTES):
+        self.root = root
+        self.bundle_dir = bundle_dir
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        self._index = os.path.join(root, "index.sqlite")
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self._listeners = []
+        with self._connect() as db:
+            # WAL lets sessions read the index while another one records a fetch
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self._index, timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def _key_lock(self, key):
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _object_path(self, digest):
+        return os.path.join(self.root, "objects", digest[:2], digest[2:])
+
+    def _write_object(self, data, compressed=None):
+        """
+        Store a blob gzip-compressed; returns (digest of the plain content, stored size).
+        compressed is the already-gzipped form of data, when the caller has one.
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            if compressed is None:
+                # mtime=0 keeps the object bytes identical for identical content
+                compressed = gzip.compress(data, compresslevel=6, mtime=0)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(compressed)
+            os.replace(tmp, path)
+        return digest, os.path.getsize(path)
+
+    def _read_object(self, digest):
+        try:
+            with open(self._object_path(digest), "rb") as f:
+                stored = f.read()
+        except FileNotFoundError:
+            return None
+        # Objects written before compression was introduced are plain
+        return gzip.decompress(stored) if stored[:2] == GZIP_MAGIC else stored
+
+    def _lookup(self, pdb_id, fmt):
+        with self._connect() as db:
+            return db.execute(
+                "SELECT digest, etag, last_modified, fetched_at, pinned FROM entries WHERE pdb_id = ? AND format = ?",
+                (pdb_id, fmt)
+            ).fetchone()
+
+    def _record(self, pdb_id, fmt, data, etag=None, last_modified=None, pinned=False, compressed=None):
+        digest, size = self._write_object(data, compressed)
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (pdb_id, fmt, digest, size, etag, last_modified, now, now, int(pinned))
+            )
+        self.evict()
+        for listener in list(self._listeners):
+            try:
+                listener(pdb_id, fmt, data, digest)
+            except Exception:
+                # A failing listener must not lose a fetch that is already stored
+                pass
+
+    def subscribe(self, listener):
+        """Call listener(pdb_id, fmt, data, digest) whenever a structure is recorded"""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def _touch(self, pdb_id, fmt, revalidated=False):
+        column = "accessed_at = ?, fetched_at = ?" if revalidated else "accessed_at = ?"
+        now = time.time()
+        params = (now, now) if revalidated else (now,)
+        with self._connect() as db:
+            db.execute(f"UPDATE entries SET {column} WHERE pdb_id = ? AND format = ?", params + (pdb_id, fmt))
+
+    def _from_bundle(self, pdb_id, fmt):
+        for name in (f"{pdb_id}.{fmt}.gz", f"{pdb_id}.{fmt}"):
+            path = os.path.join(self.bundle_dir, name)
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    return _split_gzip(f.read())
+        return None, None
+
+    def _fetch(self, pdb_id, fmt, etag=None, last_modified=None):
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return get_client().get(RCSB_URL.format(pdb_id=pdb_id, fmt=fmt), headers=headers, timeout=REQUEST_TIMEOUT)
+
+    def get(self, pdb_id, fmt="pdb"):
+        """
+        Structure file as bytes, plus where it came from:
+        "cache", "revalidated", "bundle", "network" or "stale" (network or RCSB failed).
+        Raises LookupError if RCSB has no such entry.
+        """
+        pdb_id = normalize_pdb_id(pdb_id)
+        # Concurrent requests for the same structure wait for the first one's fetch
+        with self._key_lock((pdb_id, fmt)):
+            row = self._lookup(pdb_id, fmt)
+            data = self._read_object(row[0]) if row else None
+
+            if data is not None and time.time() - row[3] < REVALIDATE_AFTER:
+                self._touch(pdb_id, fmt)
+                return data, "cache"
+
+            if data is None:
+                bundled, compressed = self._from_bundle(pdb_id, fmt)
+                if bundled is not None:
+                    self._record(pdb_id, fmt, bundled, pinned=True, compressed=compressed)
+                    return bundled, "bundle"
+
+            try:
+                response = self._fetch(pdb_id, fmt, *(row[1:3] if data is not None else ()))
+            except requests.RequestException:
+                if data is not None:
+                    self._touch(pdb_id, fmt)
+                    return data, "stale"
+                raise
+
+            if response.status_code == 304 and data is not None:
+                self._touch(pdb_id, fmt, revalidated=True)
+                return data, "revalidated"
+            if response.status_code >= 500 and data is not None:
+                # RCSB still failing after the client's retries: an outage, like a network error
+                self._touch(pdb_id, fmt)
+                return data, "stale"
+            if response.status_code == 404:
+                raise LookupError(f"PDB entry {pdb_id} ({fmt}) not found")
+            response.raise_for_status()
+
+            content, compressed = _split_gzip(response.content)
+            self._record(
+                pdb_id, fmt, content,
+                response.headers.get("ETag"), response.headers.get("Last-Modified"),
+                pinned=bool(row and row[4]), compressed=compressed
+            )
+            return content, "network"
+
+    def evict(self):
+        """Drop least recently used unpinned entries until the store fits max_bytes"""
+        with self._connect() as db:
+            total = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            victims = db.execute(
+                "SELECT pdb_id, format, digest, size FROM entries WHERE pinned = 0 ORDER BY accessed_at"
+            ).fetchall()
+            removed = []
+            for pdb_id, fmt, digest, size in victims:
+                if total <= self.max_bytes:
+                    break
+                db.execute("DELETE FROM entries WHERE pdb_id = ? AND format = ?", (pdb_id, fmt))
+                removed.append(digest)
+                total -= size
+            # Objects are shared by content; delete only those no entry refers to any more
+            for digest in set(removed):
+                if not db.execute("SELECT 1 FROM entries WHERE digest = ? LIMIT 1", (digest,)).fetchone():
+                    try:
+                        os.remove(self._object_path(digest))
+                    except FileNotFoundError:
+                        pass
+
+    def entries(self):
+        with self._connect() as db:
+            return db.execute(
+                "SELECT pdb_id, format, size, fetched_at, accessed_at, pinned FROM entries ORDER BY accessed_at DESC"
+            ).fetchall()
+
+    def stored_entries(self):
+        """(pdb_id, format, digest) of every entry, without touching access times"""
+        with self._connect() as db:
+            return db.execute("SELECT pdb_id, format, digest FROM entries").fetchall()
+
+    def read_digest(self, digest):
+        """Stored content by digest, or None once evicted"""
+        return self._read_object(digest)
+
+    def stats(self):
+        with self._connect() as db:
+            count, size = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {"entries": count, "bytes": size, "max_bytes": self.max_bytes}
+
+
+_default_store = None
+_default_store_guard = threading.Lock()
+
+
+def get_store():
+    """Process-wide store, so every Streamlit session shares one cache"""
+    global _default_store
+    with _default_store_guard:
+        if _default_store is None:
+            _default_store = StructureStore()
+        return _default_store
+
+
+def seed_bundle(pdb_ids, fmt="pdb", bundle_dir=BUNDLE_DIR):
+    """Download structures into the offline bundle directory (run once, online)"""
+    os.makedirs(bundle_dir, exist_ok=True)
+    for pdb_id in pdb_ids:
+        pdb_id = normalize_pdb_id(pdb_id)
+        response = get_client().get(RCSB_URL.format(pdb_id=pdb_id, fmt=fmt), timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        content, compressed = _split_gzip(response.content)
+        with open(os.path.join(bundle_dir, f"{pdb_id}.{fmt}.gz"), "wb") as f:
+            f.write(compressed or gzip.compress(content, compresslevel=9, mtime=0))
+        print(f"Seeded {pdb_id}.{fmt}.gz ({len(content):,} bytes uncompressed)")
+
+
+if __name__ == '__main__':
+    # python -m modules.structure_store [PDB ID ...]   (default: the visualizer examples)
+    seed_bundle(sys.argv[1:] or BUNDLE_EXAMPLES)
@@ -0,0 +1,55 @@
+"""
+Structure Viewer Module
+Persistent 3Dmol viewer component for Streamlit
+
+Features:
+- The viewer iframe survives reruns; the model is sent only when it changes
+- Style, highlight, surface, background and spin changes travel as a small scene dict
+- The browser diffs the scene and applies only the parts that changed
+- A reloaded page re-requests the model it is missing
+"""
+
+import hashlib
+import json
+import os
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "viewer_frontend")
+
+_component = components.declare_component("structure_viewer", path=FRONTEND_DIR)
+
+
+def model_id(*parts):
+    """Stable identifier of a viewer payload, from everything that determines its text"""
+    return hashlib.sha256(json.dumps(parts, default=str).encode("utf-8")).hexdigest()[:32]
+
+
+def scene(style, highlights=(), surface=None, background="#0e1117", spin=False):
+    """
+    Scene description applied on top of the loaded model.
+    style and surface are 3Dmol style specs; highlights is a list of (selection, style).
+    """
+    return {
+        "style": style,
+        "highlights": [list(h) for h in highlights],
+        "surface": surface,
+        "background": background,
+        "spin": bool(spin),
+    }
+
+
+def structure_viewer(model_key, load_model, scene, height=600, key="structure_viewer"):
+    """
+    Render the persistent viewer. load_model() -> (text, format, frames, interval) is
+    only called when the browser does not already hold the model identified by model_key.
+    """
+    state = st.session_state.get(key)
+    state = state if isinstance(state, dict) else {}
+    model = None
+    if state.get("loaded") != model_key:
+        text, fmt, frames, interval = load_model()
+        model = {"text": text, "format": fmt, "frames": frames, "interval": interval}
+    return _component(model_id=model_key, model=model, scene=scene, height=height, key=key, default=None)
+
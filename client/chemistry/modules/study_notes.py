@@ -5,53 +5,107 @@ Note-taking feature for recording study content
 Features:
 - Note creation, modification, deletion (CRUD)
 - Category tag support
-- Sorting by date
-- Auto-save based on JSON file
+- Full-text search over titles and content (ranked, prefix matching, highlighted snippets)
+- Sorting by date, one page of collapsed previews at a time (full text loaded when a note is opened)
+- Saved note by note to a shared SQLite store (see notes_store.py), one notebook per user
 """
 
-import streamlit as st
-import json
+import html
 import os
-from datetime import datetime
 
-NOTES_FILE = "study_notes.json"
+import streamlit as st
+
+from .notes_store import get_note_store, DEFAULT_USER
+
+# Rendered note cards kept across reruns and sessions
+CARD_CACHE_SIZE = 2000
+
+CATEGORIES = ["General Chemistry", "Organic Chemistry", "Physical Chemistry", "Analytical Chemistry", "Experiment", "Other"]
+
+
+def _current_user():
+    """Signed-in user's email when the app has authentication configured, otherwise the notebook name typed here"""
+    try:
+        if st.user.is_logged_in:
+            return st.user.email
+    except (AttributeError, KeyError):
+        pass
+    return st.text_input(
+        "👤 Notebook", value=os.environ.get("CHEMLAB_NOTES_USER", DEFAULT_USER), key="notes_user",
+        help="Notes are kept per notebook name"
+    ).strip() or DEFAULT_USER
+
+
+def _card(title_html, category, date, body_html):
+    """Card style container for one note (title and body already HTML)"""
+    return f"""
+    <div style="
+        background-color: #262730;
+        padding: 1.5rem;
+        border-radius: 10px;
+        margin-bottom: 1rem;
+        border-left: 5px solid #4A9EFF;
+    ">
+        <h4 style="margin-top: 0; color: #FFFFFF;">{title_html}</h4>
+        <span style="
+            background-color: #4A9EFF;
+            color: white;
+            padding: 0.2rem 0.6rem;
+            border-radius: 15px;
+            font-size: 0.8rem;
+            margin-right: 0.5rem;
+        ">{html.escape(category)}</span>
+        <span style="color: #aaaaaa; font-size: 0.8rem;">{date}</span>
+        <hr style="margin: 0.5rem 0; border-color: #444;">
+        <p style="white-space: pre-wrap; color: #dddddd;">{body_html}</p>
+    </div>
+    """
+
 
-def load_notes():
-    if os.path.exists(NOTES_FILE):
-        with open(NOTES_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return []
+@st.cache_data(max_entries=CARD_CACHE_SIZE)
+def card_html(note_id, version, expanded, _note, _load):
+    """
+    Card of a page note, collapsed (its preview) or expanded (full content from _load()).
+    Keyed by note ID and version: an edited note is rendered again, an unchanged one never is.
+    """
+    content = _load() if expanded else _note["content"] + ("…" if _note["truncated"] else "")
+    return _card(html.escape(_note["title"]), _note["category"], _note["date"], html.escape(content))
+
+
+def _toggle(note_id):
+    opened = st.session_state.setdefault("notes_open", set())
+    opened.symmetric_difference_update({note_id})
+
+
+def _note_buttons(store, user, note, expandable):
+    col_open, col_del, _ = st.columns([1, 1, 8])
+    if expandable:
+        opened = note["id"] in st.session_state.get("notes_open", set())
+        col_open.button("▴ Less" if opened else "▾ More", key=f"open_{note['id']}", on_click=_toggle, args=(note["id"],))
+    if col_del.button("Delete", key=f"del_{note['id']}"):
+        store.delete(user, note['id'])
+        st.session_state.get("notes_open", set()).discard(note["id"])
+        st.rerun()
 
-def save_notes(notes):
-    with open(NOTES_FILE, "w", encoding="utf-8") as f:
-        json.dump(notes, f, ensure_ascii=False, indent=2)
 
 def show():
     st.title("📝 Study Notes")
     st.markdown("### My Chemistry Study Notes")
-    
-    # Load notes data
-    if 'notes' not in st.session_state:
-        st.session_state.notes = load_notes()
+    store = get_note_store()
+    user = _current_user()
     
     # New note writing area (Expandable)
     with st.expander("✍️ Write New Note", expanded=False):
         with st.form("new_note_form"):
             new_title = st.text_input("Title")
-            new_category = st.selectbox("Category", ["General Chemistry", "Organic Chemistry", "Physical Chemistry", "Analytical Chemistry", "Experiment", "Other"])
+            new_category = st.selectbox("Category", CATEGORIES)
             new_content = st.text_area("Content", height=150)
             submitted = st.form_submit_button("Save")
             
             if submitted and new_title and new_content:
-                new_note = {
-                    "id": datetime.now().strftime("%Y%m%d%H%M%S"),
-                    "title": new_title,
-                    "category": new_category,
-                    "content": new_content,
-                    "date": datetime.now().strftime("%Y-%m-%d %H:%M")
-                }
-                st.session_state.notes.insert(0, new_note) # Add latest at top
-                save_notes(st.session_state.notes)
+                store.add(user, new_title, new_category, new_content)
+                # Back to the first page, where the new note is
+                st.session_state["notes_cursors"] = []
                 st.success("Note saved successfully!")
                 st.rerun()
 
@@ -59,50 +113,57 @@ def show():
     
     # Note filtering
     col1, col2 = st.columns([3, 1])
+    with col1:
+        search_text = st.text_input(
+            "🔎 Search Notes", placeholder="Ex: titration, sn2 mech", key="notes_search",
+            help="Matches words in titles and content; word beginnings are enough"
+        )
     with col2:
         filter_cat = st.selectbox(
             "Filter Category", 
-            ["All"] + ["General Chemistry", "Organic Chemistry", "Physical Chemistry", "Analytical Chemistry", "Experiment", "Other"]
+            ["All"] + CATEGORIES
         )
     
-    # Display note list
-    filtered_notes = st.session_state.notes
-    if filter_cat != "All":
-        filtered_notes = [n for n in st.session_state.notes if n['category'] == filter_cat]
+    # Display note list: best matches first when searching, otherwise one page at a time, newest first
+    category = None if filter_cat == "All" else filter_cat
+    if search_text.strip():
+        results = store.search(user, search_text, category)
+        st.caption(f"{len(results)} matching notes")
+        if not results:
+            st.info("No matching notes.")
+        for note in results:
+            st.markdown(_card(note["title_html"], note["category"], note["date"], note["snippet_html"]), unsafe_allow_html=True)
+            _note_buttons(store, user, note, expandable=False)
+        return
+
+    # A new notebook or filter starts again at the first page
+    if st.session_state.get("notes_view") != (user, category):
+        st.session_state["notes_view"] = (user, category)
+        st.session_state["notes_cursors"] = []
+    cursors = st.session_state["notes_cursors"]
+    notes, next_cursor = store.page(user, category, before=cursors[-1] if cursors else None)
+    while not notes and cursors:
+        # Every note of this page was deleted: step back to the nearest page that still has some
+        cursors.pop()
+        notes, next_cursor = store.page(user, category, before=cursors[-1] if cursors else None)
 
-    if not filtered_notes:
+    if not notes and store.count(user, category) == 0:
         st.info("No notes written yet.")
-    else:
-        for i, note in enumerate(filtered_notes):
-            with st.container():
-                # Card style container
-                st.markdown(f"""
-                <div style="
-                    background-color: #262730;
-                    padding: 1.5rem;
-                    border-radius: 10px;
-                    margin-bottom: 1rem;
-                    border-left: 5px solid #4A9EFF;
-                ">
-                    <h4 style="margin-top: 0; color: #FFFFFF;">{note['title']}</h4>
-                    <span style="
-                        background-color: #4A9EFF;
-                        color: white;
-                        padding: 0.2rem 0.6rem;
-                        border-radius: 15px;
-                        font-size: 0.8rem;
-                        margin-right: 0.5rem;
-                    ">{note['category']}</span>
-                    <span style="color: #aaaaaa; font-size: 0.8rem;">{note['date']}</span>
-                    <hr style="margin: 0.5rem 0; border-color: #444;">
-                    <p style="white-space: pre-wrap; color: #dddddd;">{note['content']}</p>
-                </div>
-                """, unsafe_allow_html=True)
-                
-                # Delete button
-                col_del, _ = st.columns([1, 10])
-                with col_del:
-                    if st.button("Delete", key=f"del_{note['id']}"):
-                        st.session_state.notes = [n for n in st.session_state.notes if n['id'] != note['id']]
-                        save_notes(st.session_state.notes)
-                        st.rerun()
+        return
+    opened = st.session_state.setdefault("notes_open", set())
+    for note in notes:
+        expanded = note["id"] in opened
+        # Full content is read only for opened notes, and only when their card is not cached yet
+        st.markdown(
+            card_html(note["id"], note["version"], expanded, _note=note,
+                      _load=lambda note_id=note["id"]: (store.get(user, note_id) or {}).get("content", "")),
+            unsafe_allow_html=True
+        )
+        _note_buttons(store, user, note, expandable=note["truncated"])
+
+    col_prev, col_page, col_next = st.columns([1, 2, 1])
+    col_prev.button("◀ Newer", on_click=cursors.pop, disabled=not cursors, use_container_width=True)
+    col_page.caption(f"Page {len(cursors) + 1}")
+    col_next.button(
+        "Older ▶", on_click=cursors.append, args=(next_cursor,), disabled=next_cursor is None, use_container_width=True
+    )
@@ -0,0 +1,299 @@
+"""
+Trajectory Module
+Multi-model PDB ensembles and multi-frame XYZ trajectories backed by memory-mapped coordinates
+
+Features:
+- Frame offsets indexed once per file (content-hashed, kept on disk)
+- Coordinates unpacked once into a float32 .npy and memory-mapped afterwards
+- Topology (names, residues, chains) parsed from the first frame only
+- Single-frame and strided-subset access without touching the other frames
+- Per-frame analysis hooks evaluated chunk by chunk over the memory map
+- Size-bounded LRU eviction of the on-disk files
+"""
+
+import mmap
+import os
+import re
+import threading
+
+import numpy as np
+
+from .structure_io import parse_structure, gunzip, is_gzip
+
+TRAJECTORY_DIR = os.environ.get(
+    "CHEMLAB_TRAJECTORY_DIR", os.path.join(os.path.expanduser("~"), ".chemlab", "trajectories")
+)
+
+MAX_TRAJECTORY_BYTES = 2 * 1024 * 1024 * 1024
+
+# Frames unpacked (or analysed) per pass; bounds the memory held besides the memory map
+FRAME_CHUNK = 64
+
+_MODEL_LINE = re.compile(rb"^MODEL ", re.MULTILINE)
+_ATOM_LINE = (b"ATOM  ", b"HETATM")
+
+
+def _frame_ranges(starts, total):
+    ends = np.r_[starts[1:], total]
+    return np.column_stack([starts, ends]).astype(np.int64)
+
+
+def index_pdb_frames(buffer):
+    """(start, end) byte offsets of every MODEL block; a file without MODEL records is one frame"""
+    starts = np.array([m.start() for m in _MODEL_LINE.finditer(buffer)], dtype=np.int64)
+    if len(starts) == 0:
+        starts = np.zeros(1, dtype=np.int64)
+    # Header records (HELIX/SHEET, ...) before the first MODEL belong to frame 1
+    starts[0] = 0
+    return _frame_ranges(starts, len(buffer))
+
+
+def index_xyz_frames(buffer):
+    """
+    (start, end) byte offsets of every XYZ frame (atom count line, comment line, atom lines).
+    Line starts are found in one vectorized pass; frames are then walked header to header.
+    """
+    data = np.frombuffer(buffer, dtype=np.uint8)
+    line_starts = np.r_[0, np.flatnonzero(data == 10) + 1]
+    line_starts = line_starts[line_starts < len(data)]
+    starts, line = [], 0
+    while line < len(line_starts):
+        end = line_starts[line + 1] if line + 1 < len(line_starts) else len(data)
+        header = bytes(buffer[line_starts[line]:end]).split()
+        if not header:
+            line += 1
+            continue
+        starts.append(line_starts[line])
+        line += int(header[0]) + 2
+    return _frame_ranges(np.array(starts, dtype=np.int64), len(data))
+
+
+def _pdb_frame_xyz(block):
+    lines = np.array(block.split(b"\n"), dtype="S80")
+    records = lines[np.char.startswith(lines, _ATOM_LINE[0]) | np.char.startswith(lines, _ATOM_LINE[1])]
+    u8 = records.view(np.uint8).reshape(len(records), 80)
+    # Columns 31-54: three 8-character coordinates
+    columns = np.ascontiguousarray(u8[:, 30:54]).view("S8").reshape(len(records), 3)
+    return columns.astype(np.float32)
+
+
+def _xyz_frame_xyz(block):
+    lines = block.split(b"\n")
+    n_atoms = int(lines[0].split()[0])
+    body = lines[2:2 + n_atoms]
+    tokens = b" ".join(body).split()
+    if len(tokens) == 4 * n_atoms:
+        return np.array(tokens).reshape(n_atoms, 4)[:, 1:].astype(np.float32)
+    # Extra columns (charges, velocities): fall back to per-line splitting
+    return np.array([line.split()[1:4] for line in body], dtype=np.float32)
+
+
+FRAME_INDEXERS = {"pdb": index_pdb_frames, "xyz": index_xyz_frames}
+FRAME_READERS = {"pdb": _pdb_frame_xyz, "xyz": _xyz_frame_xyz}
+
+
+class Trajectory:
+    """
+    Frames of one file, sharing the topology of the first frame.
+    Coordinates live in a (frames, atoms, 3) float32 memory map built on first open.
+    """
+
+    def __init__(self, digest, fmt, root=TRAJECTORY_DIR):
+        self.digest = digest
+        self.format = fmt
+        self.root = root
+        self.source_path = os.path.join(root, f"{digest}.{fmt}")
+        self.offsets_path = os.path.join(root, f"{digest}.offsets.npy")
+        self.coords_path = os.path.join(root, f"{digest}.xyz.npy")
+        self.offsets = np.load(self.offsets_path)
+        self.coordinates = np.load(self.coords_path, mmap_mode="r")
+        with open(self.source_path, "rb") as f:
+            self.topology = parse_structure(f.read(int(self.offsets[0, 1])), fmt)
+        if fmt == "pdb":
+            # Only the first model's atoms are the topology of every frame
+            first = self.topology["model"] == self.topology["model"].min()
+            self.topology = {k: (v[first] if isinstance(v, np.ndarray) else v) for k, v in self.topology.items()}
+
+    @property
+    def n_frames(self):
+        return self.coordinates.shape[0]
+
+    @property
+    def n_atoms(self):
+        return self.coordinates.shape[1]
+
+    def frame(self, index):
+        """Structure dict of one frame: shared topology, that frame's coordinates"""
+        structure = dict(self.topology)
+        structure["xyz"] = np.array(self.coordinates[index])
+        structure["model"] = np.ones(self.n_atoms, dtype=np.int32)
+        return structure
+
+    def frames(self, start=0, stop=None, stride=1, atoms=None):
+        """
+        Strided subset as one multi-model structure (models numbered 1..k), optionally
+        restricted to the atoms in the boolean mask `atoms`
+        """
+        atoms = np.ones(self.n_atoms, dtype=bool) if atoms is None else atoms
+        selected = range(self.n_frames)[start:stop:stride]
+        xyz = np.asarray(self.coordinates[start:stop:stride][:, atoms]).reshape(-1, 3)
+        structure = {
+            k: (np.tile(v[atoms], len(selected)) if isinstance(v, np.ndarray) and v.ndim == 1 else v)
+            for k, v in self.topology.items()
+        }
+        structure["xyz"] = xyz
+        structure["model"] = np.repeat(np.arange(1, len(selected) + 1, dtype=np.int32), int(atoms.sum()))
+        return structure
+
+    def analyse(self, hook, stride=1, chunk=FRAME_CHUNK):
+        """Per-frame values of hook(xyz_chunk, topology, reference) over every stride-th frame"""
+        reference = np.asarray(self.coordinates[0], dtype=np.float64)
+        frames = np.arange(0, self.n_frames, stride)
+        values = [
+            hook(np.asarray(self.coordinates[frames[i:i + chunk]], dtype=np.float64), self.topology, reference)
+            for i in range(0, len(frames), chunk)
+        ]
+        return frames, np.concatenate(values)
+
+
+_build_locks = {}
+_build_guard = threading.Lock()
+
+
+def _build(path, fmt, digest, root, progress=None):
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        offsets = FRAME_INDEXERS[fmt](buffer)
+        reader = FRAME_READERS[fmt]
+        first = reader(buffer[offsets[0, 0]:offsets[0, 1]])
+        coords_tmp = os.path.join(root, f"{digest}.xyz.{os.getpid()}.tmp.npy")
+        coords = np.lib.format.open_memmap(coords_tmp, mode="w+", dtype=np.float32, shape=(len(offsets), len(first), 3))
+        for i, (start, end) in enumerate(offsets):
+            xyz = first if i == 0 else reader(buffer[start:end])
+            if len(xyz) != len(first):
+                del coords
+                os.remove(coords_tmp)
+                raise ValueError(f"Frame {i + 1} has {len(xyz)} atoms, frame 1 has {len(first)}; frames must share one topology")
+            coords[i] = xyz
+            if progress and i % FRAME_CHUNK == 0:
+                progress(i / len(offsets))
+        coords.flush()
+        del coords
+    np.save(os.path.join(root, f"{digest}.offsets.npy"), offsets)
+    os.replace(coords_tmp, os.path.join(root, f"{digest}.xyz.npy"))
+
+
+def _digest_lock(digest):
+    with _build_guard:
+        return _build_locks.setdefault(digest, threading.Lock())
+
+
+def is_indexed(digest, root=TRAJECTORY_DIR):
+    """True once the frame index and coordinate memory map of a file are on disk"""
+    return os.path.exists(os.path.join(root, f"{digest}.xyz.npy"))
+
+
+def build_trajectory(data, fmt, digest, root=TRAJECTORY_DIR, progress=None, max_bytes=MAX_TRAJECTORY_BYTES):
+    """
+    Write file content `data` (bytes, optionally gzipped), its frame index and the coordinate
+    memory map to root, unless already there; progress(fraction) is called while unpacking
+    """
+    if fmt not in FRAME_INDEXERS:
+        raise ValueError(f"Trajectories are supported for {', '.join(FRAME_INDEXERS)} files")
+    os.makedirs(root, exist_ok=True)
+    with _digest_lock(digest):
+        if is_indexed(digest, root):
+            return
+        path = os.path.join(root, f"{digest}.{fmt}")
+        if not os.path.exists(path):
+            with open(f"{path}.tmp", "wb") as f:
+                f.write(gunzip(data) if is_gzip(data) else data)
+            os.replace(f"{path}.tmp", path)
+        _build(path, fmt, digest, root, progress)
+    evict(root, max_bytes, keep=(digest,))
+
+
+def open_trajectory(data, fmt, digest, root=TRAJECTORY_DIR, progress=None, max_bytes=MAX_TRAJECTORY_BYTES):
+    """
+    Trajectory for file content `data` (bytes, optionally gzipped) identified by its digest.
+    The first call builds its files in root (build_trajectory); later calls (any session)
+    only reopen the memory map.
+    """
+    build_trajectory(data, fmt, digest, root, progress, max_bytes)
+    with _digest_lock(digest):
+        # The coordinate file's mtime is the last use, for evict()
+        os.utime(os.path.join(root, f"{digest}.xyz.npy"))
+        return Trajectory(digest, fmt, root)
+
+
+def evict(root=TRAJECTORY_DIR, max_bytes=MAX_TRAJECTORY_BYTES, keep=()):
+    """
+    Delete the files of least recently opened trajectories until root fits max_bytes.
+    Trajectories in keep, or being built, stay; open memory maps stay readable (POSIX).
+    """
+    if not os.path.isdir(root):
+        return
+    sizes, used = {}, {}
+    for entry in os.scandir(root):
+        if not entry.is_file() or ".tmp" in entry.name:
+            continue
+        digest = entry.name.split(".", 1)[0]
+        stat = entry.stat()
+        sizes[digest] = sizes.get(digest, 0) + stat.st_size
+        if entry.name.endswith(".xyz.npy"):
+            used[digest] = stat.st_mtime
+    total = sum(sizes.values())
+    for digest in sorted(sizes, key=lambda d: used.get(d, 0.0)):
+        if total <= max_bytes:
+            break
+        lock = _digest_lock(digest)
+        if digest in keep or not lock.acquire(blocking=False):
+            continue
+        try:
+            for name in os.listdir(root):
+                if name.split(".", 1)[0] == digest and ".tmp" not in name:
+                    try:
+                        os.remove(os.path.join(root, name))
+                    except OSError:
+                        # Mapped by another process on a platform that refuses to delete it
+                        pass
+        finally:
+            lock.release()
+        total -= sizes[digest]
+
+
+def count_frames(data, fmt):
+    """Cheap frame count from the raw text, to decide whether trajectory mode applies"""
+    if fmt == "pdb":
+        return max(1, len(_MODEL_LINE.findall(data)))
+    if fmt == "xyz":
+        return len(index_xyz_frames(data))
+    return 1
+
+
+# Per-frame analysis hooks: name -> f(xyz (frames, atoms, 3), topology, reference (atoms, 3)) -> (frames,)
+def _rmsd_to_first(xyz, topology, reference):
+    mobile = xyz - xyz.mean(axis=1, keepdims=True)
+    target = reference - reference.mean(axis=0)
+    # Batched Kabsch: one 3x3 SVD per frame
+    H = np.einsum("fai,aj->fij", mobile, target)
+    U, S, Vt = np.linalg.svd(H)
+    d = np.sign(np.linalg.det(np.einsum("fij,fjk->fik", U, Vt)))
+    S[:, -1] *= d
+    e0 = (mobile ** 2).sum(axis=(1, 2)) + (target ** 2).sum()
+    return np.sqrt(np.maximum(e0 - 2.0 * S.sum(axis=1), 0.0) / xyz.shape[1])
+
+
+def _radius_of_gyration(xyz, topology, reference):
+    centered = xyz - xyz.mean(axis=1, keepdims=True)
+    return np.sqrt((centered ** 2).sum(axis=2).mean(axis=1))
+
+
+def _end_to_end(xyz, topology, reference):
+    return np.linalg.norm(xyz[:, -1] - xyz[:, 0], axis=1)
+
+
+FRAME_ANALYSES = {
+    "RMSD to Frame 1 (Å)": _rmsd_to_first,
+    "Radius of Gyration (Å)": _radius_of_gyration,
+    "First–Last Atom Distance (Å)": _end_to_end,
+}
@@ -0,0 +1,50 @@
+"""
+Typeahead Module
+Text input with as-you-type suggestions for Streamlit
+
+Features:
+- Keystrokes reported to Python (debounced), suggestions rendered under the input
+- Arrow keys / Enter / click to pick a suggestion, Escape to dismiss
+- Enter and picked suggestions reported as a submit, once each
+- Text can be set from Python (e.g. by a shortcut button)
+"""
+
+import os
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "typeahead_frontend")
+
+_component = components.declare_component("typeahead", path=FRONTEND_DIR)
+
+
+def typeahead(label, suggest, placeholder="", hint="", value=None, key="typeahead"):
+    """
+    Render the input. suggest(text) -> [{"label", "value", "detail"}] is called for the
+    current text on every rerun. value={"text", "nonce"} replaces the text once per nonce.
+    Returns (text, submitted); submitted is True on the one rerun after Enter or a pick.
+    """
+    state = st.session_state.get(key)
+    state = state if isinstance(state, dict) else {}
+    text = state.get("text", "")
+
+    prefill_key = f"{key}_prefill"
+    prefill = st.session_state.get(prefill_key)
+    if value is not None and (prefill is None or prefill["nonce"] != value["nonce"]):
+        prefill = st.session_state[prefill_key] = {"nonce": value["nonce"], "text": value["text"], "after": state.get("nonce")}
+    if prefill and state.get("nonce") == prefill["after"]:
+        # Nothing typed since the text was set from Python
+        text = prefill["text"]
+
+    suggestions = suggest(text) if text.strip() and not state.get("submit") else []
+    _component(
+        label=label, placeholder=placeholder, hint=hint, suggestions=suggestions, for_text=text,
+        value=value, key=key, default=None
+    )
+
+    handled_key = f"{key}_handled"
+    submitted = bool(state.get("submit")) and st.session_state.get(handled_key) != state.get("nonce")
+    if submitted:
+        st.session_state[handled_key] = state["nonce"]
+    return text, submitted
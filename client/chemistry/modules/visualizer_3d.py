@@ -4,16 +4,487 @@ PyMOL Lite style 3D structure visualization tool
 
 Features:
 - PDB file upload
-- Fetch structure by PDB ID (RCSB PDB)
+- Fetch structure by PDB ID (RCSB PDB), cached in a local structure store
+- Server-side parsing with level-of-detail reduction for large models
+- Gzip-compressed (.pdb.gz/.cif.gz) and compact binary (.bcs) structure files
 - Various rendering styles (Cartoon, Stick, Sphere)
 - Surface visualization
+- Structure analysis: contact maps, neighbor search, binding sites, radius of gyration, RMSD
+- Solvent-accessible surface area (Shrake–Rupley) with exposure-coloured surface
+- DSSP-style hydrogen bonds and secondary structure, used for cartoons when the file has none
+- Sequence search over the local structure store and PDB mirror (k-mer index, banded alignment)
+- Multi-model ensembles and XYZ trajectories: frame stepping, in-browser animation, per-frame analysis
 - Rotation and zoom interaction
+- Persistent viewer: style, colour, surface and camera changes never resend the structure
 """
 
 import streamlit as st
-import py3Dmol
-from stmol import showmol
-import requests
+import hashlib
+import os
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+from scipy import sparse
+from .structure_store import get_store
+from .structure_viewer import structure_viewer, scene, model_id
+from .structure_io import (
+    LOD_LEVELS, parse_structure, lod_mask, subset, serialize, atom_count,
+    gunzip, structure_format, to_binary
+)
+from .sequence_index import get_sequence_index
+from .trajectory import FRAME_ANALYSES, build_trajectory, count_frames, is_indexed, open_trajectory
+from .structure_analysis import (
+    CONTACT_MODES, first_model, build_index, residue_index, contact_map, neighbors_within, neighbor_table,
+    find_ligands, binding_site, atom_masses, radius_of_gyration, superpose,
+    PROBE_RADIUS, SASA_POINTS, sasa, exposure_per_atom,
+    SS_NAMES, assign_secondary_structure, secondary_structure_records
+)
+
+# Residue contact maps larger than this are drawn as a scatter of contacts instead of an image
+CONTACT_IMAGE_RESIDUES = 1500
+CONTACT_SCATTER_POINTS = 200_000
+
+SS_SOURCES = ["Auto", "From File", "Assigned (DSSP-style)"]
+
+# Atoms × frames sent to the browser for one animation; the stride is raised to stay under it
+MAX_ANIMATION_ATOM_FRAMES = 2_000_000
+
+STORE_SOURCE_LABELS = {
+    "cache": "📦 Served from the local structure store",
+    "revalidated": "📦 Served from the local structure store (confirmed current with RCSB)",
+    "bundle": "📦 Served from the offline structure bundle",
+    "network": "🌐 Downloaded from RCSB and saved to the local structure store",
+    "stale": "⚠️ RCSB unreachable - showing the stored copy",
+}
+
+
+@st.cache_data(show_spinner="Parsing structure...", max_entries=8)
+def parsed_structure(digest, file_format, _data):
+    # Keyed by content hash; the raw text itself is not hashed again by Streamlit
+    return parse_structure(_data, file_format)
+
+
+@st.cache_data(max_entries=8)
+def binary_structure(digest, file_format, _structure):
+    return to_binary(_structure)
+
+
+@st.cache_data(max_entries=16)
+def reduced_model(digest, file_format, level, chains, overrides_key, _structure, _overrides=None):
+    """
+    Model text actually sent to the browser, after level-of-detail reduction.
+    _overrides replaces structure fields (exposure in the B-factor column, assigned
+    HELIX/SHEET records); overrides_key identifies them in the cache.
+    """
+    if _overrides:
+        _structure = dict(_structure, **_overrides)
+    mask, steps = lod_mask(_structure, level, chains)
+    text, model_format = serialize(subset(_structure, mask))
+    return text, model_format, int(mask.sum()), steps
+
+
+@st.cache_resource(max_entries=8)
+def spatial_index(digest, _structure):
+    """k-d tree over the first model, shared by every neighbor query on this structure"""
+    return build_index(_structure["xyz"][first_model(_structure)])
+
+
+@st.cache_data(show_spinner="Computing solvent-accessible surface...", max_entries=8)
+def surface_area(digest, probe, n_points, _structure):
+    per_atom, per_residue = sasa(_structure, probe, n_points)
+    return per_atom, per_residue, exposure_per_atom(_structure, per_atom)
+
+
+@st.cache_data(max_entries=8)
+def frame_count(digest, file_format, _data):
+    return count_frames(_data, file_format)
+
+
+def index_trajectory(digest, file_format, data):
+    """Build the frame index and coordinate memory map on first use, with a progress bar (kept out of the cache)"""
+    if is_indexed(digest):
+        return
+    progress = st.progress(0.0, text="Indexing frames...")
+    try:
+        build_trajectory(data, file_format, digest, progress=lambda f: progress.progress(f, text="Indexing frames..."))
+    finally:
+        progress.empty()
+
+
+@st.cache_resource(max_entries=4)
+def trajectory(digest, file_format, _data):
+    """Frame index and coordinate memory map, built once per file and shared by all sessions"""
+    return open_trajectory(_data, file_format, digest)
+
+
+@st.cache_data(show_spinner="Preparing animation...", max_entries=4)
+def animation_model(digest, start, stop, stride, level, chains, _trajectory):
+    """Strided frames as one multi-model payload; level of detail is decided on frame 1"""
+    mask, steps = lod_mask(_trajectory.frame(start), level, chains)
+    frames = _trajectory.frames(start, stop, stride, atoms=mask)
+    text, model_format = serialize(frames)
+    return text, model_format, int(mask.sum()), steps
+
+
+@st.cache_data(show_spinner="Analysing frames...", max_entries=16)
+def frame_analysis(digest, name, stride, _trajectory):
+    return _trajectory.analyse(FRAME_ANALYSES[name], stride)
+
+
+def trajectory_panel(digest, traj):
+    """
+    Frame controls. Returns (frame index, animation settings or None); only the chosen
+    frame, or the strided subset being animated, is ever sent to the browser.
+    """
+    with st.expander(f"🎞️ Trajectory ({traj.n_frames:,} frames × {traj.n_atoms:,} atoms)", expanded=True):
+        mode = st.radio("Mode", ["Single Frame", "Animate"], horizontal=True, key="traj_mode")
+        frame = st.slider("Frame", 1, traj.n_frames, 1, key="traj_frame") - 1
+        animation = None
+        if mode == "Animate":
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                first, last = st.slider("Frame Range", 1, traj.n_frames, (1, traj.n_frames), key="traj_range")
+            with col2:
+                stride = st.number_input("Stride", 1, traj.n_frames, max(1, traj.n_frames // 100), key="traj_stride")
+            with col3:
+                fps = st.slider("Frames per Second", 1, 30, 10, key="traj_fps")
+            # Keep the payload bounded however long the trajectory is
+            needed = int(np.ceil((last - first + 1) * traj.n_atoms / MAX_ANIMATION_ATOM_FRAMES))
+            if needed > stride:
+                st.caption(f"Stride raised to {needed} to keep the animation under {MAX_ANIMATION_ATOM_FRAMES:,} atom-frames")
+                stride = needed
+            animation = (first - 1, last, int(stride), fps)
+
+        st.markdown("**Per-Frame Analysis**")
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            analyses = st.multiselect("Quantities", list(FRAME_ANALYSES), default=[], key="traj_analyses")
+        with col2:
+            analysis_stride = st.number_input("Every n-th Frame", 1, traj.n_frames, max(1, traj.n_frames // 1000), key="traj_analysis_stride")
+        if analyses:
+            fig = go.Figure()
+            for name in analyses:
+                frames, values = frame_analysis(digest, name, int(analysis_stride), traj)
+                fig.add_trace(go.Scatter(x=frames + 1, y=values, mode="lines", name=name))
+            fig.add_vline(x=frame + 1, line_dash="dash", line_color="gray")
+            fig.update_layout(height=350, xaxis_title="Frame", yaxis_title="Value")
+            st.plotly_chart(fig, use_container_width=True)
+    return frame, animation
+
+
+@st.cache_data(show_spinner="Assigning secondary structure...", max_entries=8)
+def secondary_structure(digest, _structure):
+    codes, table, hbonds = assign_secondary_structure(_structure)
+    return codes, table, hbonds, secondary_structure_records(codes, table)
+
+
+@st.cache_data(show_spinner="Computing contacts...", max_entries=16)
+def residue_contacts(digest, mode, cutoff, _structure):
+    return contact_map(_structure, mode, cutoff)
+
+
+def _highlight(chain_residues):
+    """py3Dmol selections for {chain: [residue numbers]}"""
+    return [
+        {**({'chain': chain} if chain.strip() else {}), 'resi': sorted(set(residues))}
+        for chain, residues in chain_residues.items() if residues
+    ]
+
+
+def _contact_map_tab(digest, structure):
+    col1, col2 = st.columns(2)
+    with col1:
+        mode = st.radio("Contact Definition", list(CONTACT_MODES), horizontal=True,
+                        help=", ".join(f"{m}: {d}" for m, (_, d) in CONTACT_MODES.items()))
+    with col2:
+        cutoff = st.slider("Cutoff (Å)", 3.0, 15.0, CONTACT_MODES[mode][0], 0.5)
+
+    contacts, table = residue_contacts(digest, mode, cutoff, structure)
+    upper = sparse.triu(contacts, k=1).tocoo()
+    n_res = contacts.shape[0]
+    st.write(f"**{upper.nnz:,}** residue contacts among **{n_res:,}** residues")
+    if upper.nnz == 0:
+        st.info("No contacts at this cutoff.")
+        return
+
+    labels = (table["chain"] + ":" + table["resname"] + table["resseq"].astype(str)).to_numpy()
+    if n_res <= CONTACT_IMAGE_RESIDUES:
+        fig = px.imshow(contacts.toarray().astype(np.uint8), color_continuous_scale=[[0, "white"], [1, "#1f77b4"]],
+                        labels=dict(x="Residue", y="Residue", color="Contact"))
+        fig.update_layout(coloraxis_showscale=False, height=600)
+    else:
+        # Only contacts are drawn, so the figure scales with contact count rather than n_res²
+        step = max(1, upper.nnz // CONTACT_SCATTER_POINTS)
+        rows, cols = upper.row[::step], upper.col[::step]
+        fig = go.Figure(go.Scattergl(x=np.concatenate([cols, rows]), y=np.concatenate([rows, cols]), mode="markers",
+                                     marker=dict(size=2, color="#1f77b4")))
+        fig.update_layout(height=600, xaxis_title="Residue index", yaxis_title="Residue index",
+                          yaxis=dict(autorange="reversed", scaleanchor="x"))
+        if step > 1:
+            st.caption(f"Showing 1 in {step} contacts ({len(rows):,} of {upper.nnz:,})")
+    st.plotly_chart(fig, use_container_width=True)
+
+    pairs = pd.DataFrame({"Residue 1": labels[upper.row], "Residue 2": labels[upper.col]})
+    st.download_button("📥 Download Contact List (CSV)", pairs.to_csv(index=False), f"contacts_{mode}_{cutoff:g}A.csv", "text/csv")
+
+
+def _neighbors_tab(digest, structure):
+    model = first_model(structure)
+    chains = np.unique(structure["chain"][model]).tolist()
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        chain = st.selectbox("Chain", chains, key="nb_chain")
+    in_chain = model & (structure["chain"] == chain)
+    with col2:
+        numbers = np.unique(structure["resseq"][in_chain]).tolist()
+        resseq = st.selectbox("Residue Number", numbers, key="nb_resseq")
+    in_residue = in_chain & (structure["resseq"] == resseq)
+    with col3:
+        atom = st.selectbox("Atom", ["(whole residue)"] + structure["name"][in_residue].tolist(), key="nb_atom")
+    with col4:
+        radius = st.slider("Radius (Å)", 1.0, 20.0, 5.0, 0.5, key="nb_radius")
+
+    selection = in_residue if atom == "(whole residue)" else in_residue & (structure["name"] == atom)
+    atoms, distance = neighbors_within(structure, selection, radius, spatial_index(digest, structure))
+    atom_residue = residue_index(structure)[0]
+    st.write(f"**{len(atoms):,}** atoms within {radius:g} Å ({len(np.unique(atom_residue[atoms]))} residues)")
+    st.dataframe(neighbor_table(structure, atoms, distance), use_container_width=True, height=300)
+
+    if st.checkbox("Highlight in viewer", key="nb_highlight"):
+        found = {}
+        for c, r in zip(structure["chain"][atoms].tolist(), structure["resseq"][atoms].tolist()):
+            found.setdefault(c, []).append(r)
+        return _highlight(found) + _highlight({chain: [resseq]})
+    return []
+
+
+def _binding_site_tab(digest, structure):
+    ligands = find_ligands(structure)
+    if ligands.empty:
+        st.info("No ligands (non-water, non-ion hetero groups) in this structure.")
+        return []
+    col1, col2 = st.columns(2)
+    with col1:
+        choice = st.selectbox("Ligand", range(len(ligands)), key="bs_ligand",
+                              format_func=lambda i: f"{ligands['label'][i]} ({ligands['atoms'][i]} atoms)")
+    with col2:
+        radius = st.slider("Site Radius (Å)", 2.0, 12.0, 5.0, 0.5, key="bs_radius")
+
+    ligand = ligands.iloc[choice]
+    site = binding_site(structure, int(ligand["residue"]), radius, spatial_index(digest, structure))
+    st.write(f"**{len(site)}** residues within {radius:g} Å of {ligand['label']}")
+    st.dataframe(site, use_container_width=True, height=300)
+    st.download_button("📥 Download Binding Site (CSV)", site.to_csv(index=False),
+                       f"binding_site_{ligand['resname']}{ligand['resseq']}.csv", "text/csv")
+
+    if st.checkbox("Highlight in viewer", value=True, key="bs_highlight"):
+        found = {}
+        for c, r in zip(site["Chain"].tolist(), site["Number"].tolist()):
+            found.setdefault(c, []).append(r)
+        return _highlight(found) + _highlight({ligand["chain"]: [int(ligand["resseq"])]})
+    return []
+
+
+def _geometry_tab(structure):
+    model = first_model(structure)
+    mass_weighted = st.checkbox("Mass-weighted", value=True)
+    rows = []
+    for chain in [None] + np.unique(structure["chain"][model]).tolist():
+        mask = model if chain is None else model & (structure["chain"] == chain)
+        masses = atom_masses(structure["element"][mask]) if mass_weighted else None
+        rows.append({
+            "Selection": "All chains" if chain is None else f"Chain {chain or '(blank)'}",
+            "Atoms": int(mask.sum()),
+            "Residues": len(residue_index(subset(structure, mask))[1]),
+            "Rg (Å)": round(radius_of_gyration(structure["xyz"][mask], masses), 3),
+        })
+    st.metric("Radius of Gyration", f"{rows[0]['Rg (Å)']:.2f} Å")
+    st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+
+
+def _superposition_tab(digest, structure):
+    col1, col2 = st.columns(2)
+    with col1:
+        other_id = st.text_input("Compare with PDB ID", max_chars=4, key="sp_pdb_id")
+        other_file = st.file_uploader("...or upload a structure", type=['pdb', 'cif', 'xyz', 'gz', 'bcs'], key="sp_file")
+    with col2:
+        atoms = st.radio("Atoms Matched", ["Cα", "Backbone", "Heavy atoms"], key="sp_atoms",
+                         help="Atoms are paired by chain, residue number and atom name")
+
+    other_data, other_format = None, 'pdb'
+    try:
+        if other_file:
+            other_format, compressed = structure_format(other_file.name)
+            other_data = gunzip(other_file) if compressed else other_file.getvalue()
+        elif other_id:
+            other_data = get_store().get(other_id, "pdb")[0]
+    except (ValueError, LookupError) as e:
+        st.error(f"❌ {e}")
+    except Exception as e:
+        st.error(f"❌ Could not load comparison structure: {e}")
+    if other_data is None:
+        st.info("👆 Choose a second structure to superpose onto the current one.")
+        return
+
+    other = parsed_structure(hashlib.sha256(other_data).hexdigest(), other_format, other_data)
+    try:
+        result = superpose(structure, other, atoms)
+    except ValueError as e:
+        st.error(f"❌ {e}")
+        return
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Matched Atoms", f"{result['matched']:,}")
+    col2.metric("RMSD (as deposited)", f"{result['rmsd_before']:.3f} Å")
+    col3.metric("RMSD (superposed)", f"{result['rmsd_after']:.3f} Å")
+    with st.expander("Optimal Transformation (Kabsch)"):
+        st.write("Rotation matrix")
+        st.dataframe(pd.DataFrame(result["rotation"], columns=["x", "y", "z"]).round(4), hide_index=True)
+        st.write(f"Translation: {np.round(result['translation'], 3).tolist()} Å")
+
+
+def _surface_area_tab(digest, structure):
+    col1, col2 = st.columns(2)
+    with col1:
+        probe = st.slider("Probe Radius (Å)", 0.5, 3.0, PROBE_RADIUS, 0.1, help="1.4 Å corresponds to water")
+    with col2:
+        n_points = st.select_slider("Points per Atom", [50, 100, 200, 500, 1000], value=SASA_POINTS,
+                                    help="More points: smoother, more accurate, slower")
+    if not st.toggle("Compute SASA", key="sasa_on"):
+        st.caption("Shrake–Rupley rolling-probe surface over the first model (waters and hydrogens excluded).")
+        return None
+
+    per_atom, per_residue, exposure = surface_area(digest, probe, n_points, structure)
+    total = np.nansum(per_atom)
+    polar = per_residue["Polar (Å²)"].sum()
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Total SASA", f"{total:,.0f} Å²")
+    col2.metric("Polar", f"{polar:,.0f} Å² ({100 * polar / total:.0f}%)" if total else "0 Å²")
+    col3.metric("Apolar", f"{total - polar:,.0f} Å²")
+
+    per_chain = per_residue.groupby("Chain")[["SASA (Å²)", "Polar (Å²)", "Apolar (Å²)"]].sum().round(1)
+    st.dataframe(per_chain, use_container_width=True)
+    st.dataframe(per_residue, use_container_width=True, height=300, hide_index=True)
+    st.download_button("📥 Download Per-Residue SASA (CSV)", per_residue.to_csv(index=False), "sasa_per_residue.csv", "text/csv")
+
+    if st.checkbox("Colour surface by exposure", value=True, key="sasa_color"):
+        st.caption("🔴 exposed → ⚪ → 🔵 buried (relative SASA per residue)")
+        return f"sasa-{probe}-{n_points}", exposure
+    return None
+
+
+def _secondary_structure_tab(digest, structure):
+    codes, table, hbonds, records = secondary_structure(digest, structure)
+    assigned = codes != ""
+    if not assigned.any():
+        st.info("No protein backbone (N, CA, C, O) found in this structure.")
+        return
+
+    counts = pd.Series(codes[assigned]).value_counts()
+    composition = pd.DataFrame({
+        "Type": [f"{SS_NAMES[c]} ({c})" for c in counts.index],
+        "Residues": counts.values,
+        "Fraction (%)": (100 * counts.values / assigned.sum()).round(1),
+    })
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Helix (H/G/I)", f"{100 * np.isin(codes[assigned], ['H', 'G', 'I']).mean():.1f}%")
+    col2.metric("Strand (E/B)", f"{100 * np.isin(codes[assigned], ['E', 'B']).mean():.1f}%")
+    col3.metric("Backbone H-bonds", f"{len(hbonds):,}")
+    st.dataframe(composition, use_container_width=True, hide_index=True)
+
+    for chain in pd.unique(table["chain"][assigned]):
+        in_chain = assigned & (table["chain"].to_numpy() == chain)
+        st.markdown(f"**Chain {chain or '(blank)'}** (residues {table['resseq'][in_chain].min()}–{table['resseq'][in_chain].max()})")
+        st.code("".join(codes[in_chain]), language=None)
+
+    with st.expander(f"Backbone Hydrogen Bonds ({len(hbonds):,})"):
+        st.dataframe(hbonds, use_container_width=True, height=300, hide_index=True)
+        st.download_button("📥 Download H-Bonds (CSV)", hbonds.to_csv(index=False), "backbone_hbonds.csv", "text/csv")
+    st.caption(f"{len(records)} HELIX/SHEET records generated · "
+               "H α-helix · G 3₁₀ · I π · E strand · B bridge · T turn · S bend · - coil")
+
+
+def analysis_panel(digest, structure):
+    """
+    Analysis tabs; returns py3Dmol selections to highlight in the viewer, and
+    (key, per-atom exposure) when the surface should be coloured by exposure
+    """
+    st.markdown("### 🔬 Structure Analysis")
+    tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs(
+        ["Contact Map", "Neighbors", "Binding Sites", "Geometry", "Superposition", "Surface Area", "Secondary Structure"]
+    )
+    highlight = []
+    with tab1:
+        _contact_map_tab(digest, structure)
+    with tab2:
+        highlight += _neighbors_tab(digest, structure)
+    with tab3:
+        highlight += _binding_site_tab(digest, structure)
+    with tab4:
+        _geometry_tab(structure)
+    with tab5:
+        _superposition_tab(digest, structure)
+    with tab6:
+        exposure = _surface_area_tab(digest, structure)
+    with tab7:
+        _secondary_structure_tab(digest, structure)
+    return highlight, exposure
+
+
+def _index_upload(name, digest, structure):
+    """Uploaded structures join the sequence index too (they are searchable, not re-openable)"""
+    index = get_sequence_index()
+    source = f"upload:{digest}"
+    if index.indexed().get(source) != digest:
+        index.add_structure(source, name, structure, digest)
+
+
+def _sequence_search_tab():
+    """Sequence query against every locally indexed chain; returns the source to open, if any"""
+    index = get_sequence_index()
+    query = st.text_area(
+        "Query Sequence (one-letter code or FASTA)",
+        placeholder=">query\nMKTAYIAKQRQISFVKSHFSRQLEERLGLIEVQAPILSRVGDGTQDNLSG",
+        height=120, key="seq_query"
+    )
+    col1, col2 = st.columns([1, 1])
+    with col1:
+        run = st.button("🔎 Search Sequence", use_container_width=True)
+    with col2:
+        if st.button("🔄 Rescan Store and Mirror", use_container_width=True,
+                     help=f"Index structures stored earlier and files in the mirror directory ({index.mirror_dir})"):
+            with st.spinner("Updating sequence index..."):
+                changed, removed = index.refresh()
+            st.success(f"✅ Index updated: {changed} sources added or changed, {removed} removed")
+    stats = index.stats()
+    st.caption(f"🧬 Indexed: {stats['sources']} structures, {stats['protein']} protein and {stats['nucleic']} nucleic acid chains")
+
+    if run:
+        try:
+            st.session_state["seq_hits"] = index.search(query)
+        except ValueError as e:
+            st.error(f"❌ {e}")
+            st.session_state.pop("seq_hits", None)
+
+    hits = st.session_state.get("seq_hits")
+    if hits is None:
+        return None
+    if hits.empty:
+        st.info("No indexed chain shares a k-mer seed with this sequence.")
+        return None
+    st.dataframe(
+        hits.head(25).style.format({"similarity": "{:.1%}"}),
+        use_container_width=True, hide_index=True
+    )
+    openable = hits[hits["source"].str.startswith(("store:", "mirror:"))].head(25)
+    if openable.empty:
+        return None
+    labels = [f"{row.entry} chain {row.chain} (score {row.score})" for row in openable.itertuples()]
+    choice = st.selectbox("Hit", range(len(labels)), format_func=lambda i: labels[i], key="seq_hit")
+    if st.button("📂 Open Structure", key="seq_open"):
+        return openable.iloc[choice]["source"]
+    return None
+
 
 def show():
     st.title("🧬 3D Visualizer")
@@ -40,13 +511,19 @@ def show():
         
         spin = st.checkbox("Auto Spin", value=False)
         bgcolor = st.color_picker("Background Color", "#0e1117")
+        
+        # Subscribes the sequence index to the store, so every fetch is indexed on arrival
+        get_sequence_index()
+        store_stats = get_store().stats()
+        st.caption(f"📦 Structure store: {store_stats['entries']} entries, {store_stats['bytes'] / 1e6:.1f} / {store_stats['max_bytes'] / 1e6:.0f} MB")
 
     # Input method selection (Tabs)
-    tab1, tab2 = st.tabs(["Search PDB ID", "File Upload"])
+    tab1, tab2, tab3 = st.tabs(["Search PDB ID", "File Upload", "Sequence Search"])
     
     pdb_id = None
     uploaded_file = None
     pdb_data = None
+    file_format = 'pdb'
     
     with tab1:
         col1, col2 = st.columns([3, 1])
@@ -63,24 +540,63 @@ def show():
                 pdb_id = pdb_input
 
     with tab2:
-        uploaded_file = st.file_uploader("Upload PDB/CIF/XYZ File", type=['pdb', 'cif', 'xyz'])
+        uploaded_file = st.file_uploader(
+            "Upload PDB/CIF/XYZ File (optionally .gz), or a binary .bcs structure",
+            type=['pdb', 'cif', 'xyz', 'gz', 'bcs'],
+            # A new upload replaces whatever was opened by ID or sequence search
+            on_change=lambda: st.session_state.pop("vis_source", None)
+        )
+
+    with tab3:
+        opened = _sequence_search_tab()
+
+    # The opened structure is kept across reruns (widget changes would otherwise drop it)
+    if pdb_id:
+        st.session_state["vis_source"] = f"store:{pdb_id.strip().upper()}.pdb"
+    elif opened:
+        st.session_state["vis_source"] = opened
+    source_key = st.session_state.get("vis_source")
+    pdb_id = None
+    mirror_path = None
+    if source_key and source_key.startswith("store:"):
+        pdb_id, file_format = source_key[len("store:"):].rsplit(".", 1)
+    elif source_key and source_key.startswith("mirror:"):
+        mirror_path = os.path.join(get_sequence_index().mirror_dir, source_key[len("mirror:"):])
 
     # Rendering logic
     if pdb_id:
         try:
-            url = f"https://files.rcsb.org/view/{pdb_id}.pdb"
-            response = requests.get(url)
-            if response.status_code == 200:
-                pdb_data = response.text
-                st.success(f"✅ Structure loaded successfully: **{pdb_id}**")
-            else:
-                st.error("❌ Invalid PDB ID.")
+            data, source = get_store().get(pdb_id, file_format)
+            pdb_data = data
+            st.success(f"✅ Structure loaded successfully: **{pdb_id.upper()}**")
+            st.caption(STORE_SOURCE_LABELS[source])
+        except (ValueError, LookupError):
+            st.error("❌ Invalid PDB ID.")
+            st.session_state.pop("vis_source", None)
         except Exception as e:
             st.error(f"❌ Network error: {e}")
-            
+            st.session_state.pop("vis_source", None)
+
+    elif mirror_path:
+        file_format, compressed = structure_format(mirror_path)
+        try:
+            with open(mirror_path, "rb") as f:
+                pdb_data = f.read()
+            pdb_data = gunzip(pdb_data) if compressed else pdb_data
+            pdb_id = os.path.basename(mirror_path).split(".")[0]
+            st.success(f"✅ Structure loaded from the mirror: **{os.path.basename(mirror_path)}**")
+        except OSError as e:
+            st.error(f"❌ Could not read mirror file: {e}")
+            st.session_state.pop("vis_source", None)
+
     elif uploaded_file:
-        pdb_data = uploaded_file.getvalue().decode("utf-8")
-        st.success(f"✅ File loaded successfully: **{uploaded_file.name}**")
+        file_format, compressed = structure_format(uploaded_file.name)
+        try:
+            # Inflated chunk by chunk straight from the upload buffer
+            pdb_data = gunzip(uploaded_file) if compressed else uploaded_file.getvalue()
+            st.success(f"✅ File loaded successfully: **{uploaded_file.name}**")
+        except Exception as e:
+            st.error(f"❌ Could not decompress file: {e}")
     
     else:
         # Default example (DNA)
@@ -89,59 +605,137 @@ def show():
             # Basic DNA structure example data
             pdb_id = "1BNA" # B-DNA
             try:
-                pdb_data = requests.get(f"https://files.rcsb.org/view/{pdb_id}.pdb").text
-            except:
-                pass
+                pdb_data = get_store().get(pdb_id, "pdb")[0]
+            except Exception as e:
+                st.warning(
+                    f"⚠️ The example structure {pdb_id} is neither in the local structure store nor reachable "
+                    f"on RCSB ({e}). Upload a file, or seed the offline bundle: python -m modules.structure_store"
+                )
 
     # Viewer rendering
     if pdb_data:
         try:
-            # Viewer size setting
-            view = py3Dmol.view(width=800, height=600)
-            
-            # Add structure data
-            file_format = 'pdb'
-            if uploaded_file and uploaded_file.name.endswith('.cif'):
-                file_format = 'cif'
-            elif uploaded_file and uploaded_file.name.endswith('.xyz'):
-                file_format = 'xyz'
-                
-            view.addModel(pdb_data, file_format)
-            
-            # Apply style
-            view.setStyle({'cartoon': {'color': 'spectrum'}}) # Init
-            
+            # Parse once on the server and send only the atoms worth drawing
+            digest = hashlib.sha256(pdb_data).hexdigest()
+            file_digest = digest
+            traj, animation = None, None
+            if file_format in ("pdb", "xyz") and frame_count(digest, file_format, pdb_data) > 1:
+                try:
+                    index_trajectory(digest, file_format, pdb_data)
+                    traj = trajectory(digest, file_format, pdb_data)
+                except ValueError as e:
+                    st.warning(f"⚠️ Showing the first model only: {e}")
+            if traj is not None:
+                frame, animation = trajectory_panel(digest, traj)
+                # Everything downstream (level of detail, analysis) works on the current frame
+                structure = traj.frame(frame)
+                digest = f"{digest}:{frame}"
+            else:
+                structure = parsed_structure(digest, file_format, pdb_data)
+            if uploaded_file and not source_key:
+                _index_upload(uploaded_file.name, file_digest, structure)
+            all_chains = [c for c in np.unique(structure["chain"]).tolist() if c.strip()]
+
+            with st.expander("🔍 Level of Detail", expanded=atom_count(structure) > 20000):
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    lod_level = st.selectbox("Detail Level", LOD_LEVELS, index=0,
+                                             help="Auto strips solvent and, for very large models, reduces to a Cα trace")
+                with col2:
+                    chains = st.multiselect("Chains", all_chains, default=[],
+                                            help="Leave empty to show all chains") if len(all_chains) > 1 else []
+                with col3:
+                    ss_source = st.selectbox("Secondary Structure", SS_SOURCES, index=0,
+                                             help="Auto uses the file's HELIX/SHEET records and assigns them when missing")
+
+            # The viewer sits above the analysis panel but shows the panel's selections
+            viewer_slot = st.container()
+            highlight, exposure = analysis_panel(digest, structure)
+            overrides, overrides_key = {}, []
+            if exposure:
+                overrides["bfactor"] = exposure[1]
+                overrides_key.append(exposure[0])
+            # Cartoons need HELIX/SHEET records; assign them when the file has none
+            if ss_source == "Assigned (DSSP-style)" or (ss_source == "Auto" and not structure.get("ss_records")):
+                overrides["ss_records"] = secondary_structure(digest, structure)[3]
+                overrides_key.append("dssp")
+
+            if animation:
+                model_text, model_format, shown_atoms, lod_steps = animation_model(
+                    file_digest, *animation[:3], lod_level, tuple(chains), traj
+                )
+            else:
+                model_text, model_format, shown_atoms, lod_steps = reduced_model(
+                    digest, file_format, lod_level, tuple(chains), tuple(overrides_key), structure, overrides
+                )
+            total_atoms = atom_count(structure)
+            if animation:
+                n_shown = len(range(*animation[:3]))
+                viewer_slot.caption(f"🎞️ Animating {n_shown:,} frames (every {animation[2]}) at {animation[3]} fps")
+            if shown_atoms < total_atoms:
+                viewer_slot.caption(f"🔍 Rendering {shown_atoms:,} of {total_atoms:,} atoms ({', '.join(lod_steps)})")
+            else:
+                viewer_slot.caption(f"🔍 Rendering all {total_atoms:,} atoms")
+            if "Cα/P trace" in lod_steps:
+                viewer_slot.caption("💡 Cα traces have no side chains - Cartoon or Sphere styles show them best.")
+
+            if shown_atoms == 0:
+                viewer_slot.warning("⚠️ No atoms left at this level of detail.")
+                return
+
+            # Option labels read "spectrum (Rainbow)"; 3Dmol wants the first word
+            color_name = color_scheme.split(" ")[0]
+            colorscheme = f'{color_name}Carbon' if color_name == 'element' else color_name
             if style_options == "Cartoon (Protein)":
-                view.setStyle({'cartoon': {'color': color_scheme}})
+                style = {'cartoon': {'color': color_name}}
             elif style_options == "Stick (Compound)":
-                view.setStyle({'stick': {'colorscheme': f'{color_scheme}Carbon' if color_scheme == 'element' else color_scheme}})
+                style = {'stick': {'colorscheme': colorscheme}}
             elif style_options == "Sphere (Space Fill)":
-                view.setStyle({'sphere': {'colorscheme': f'{color_scheme}Carbon' if color_scheme == 'element' else color_scheme}})
-            elif style_options == "Line (Line)":
-                view.setStyle({'line': {'colorscheme': f'{color_scheme}Carbon' if color_scheme == 'element' else color_scheme}})
-                
-            # Add surface
-            if show_surface:
-                view.addSurface(py3Dmol.VDW, {'opacity': surface_opacity, 'color': 'white'})
-                
-            # Apply settings
-            view.setBackgroundColor(bgcolor)
-            view.zoomTo()
-            if spin:
-                view.spin(True)
+                style = {'sphere': {'colorscheme': colorscheme}}
             else:
-                view.spin(False)
+                style = {'line': {'colorscheme': colorscheme}}
 
-            # Display in Streamlit
-            showmol(view, height=600, width=800)
+            surface = None
+            if exposure:
+                # Exposure was written into the B-factor column; min > max reverses rwb (exposed = red)
+                surface = {'opacity': surface_opacity if show_surface else 0.9,
+                           'colorscheme': {'prop': 'b', 'gradient': 'rwb', 'min': 100, 'max': 0}}
+            elif show_surface:
+                surface = {'opacity': surface_opacity, 'color': 'white'}
+
+            highlights = [(selection, {'stick': {'colorscheme': 'orangeCarbon', 'radius': 0.25}}) for selection in highlight]
+            model_key = model_id(digest, lod_level, chains, overrides_key, animation[:3] if animation else None)
+
+            # Display in Streamlit: the model text is only sent when the browser lacks this model_key
+            with viewer_slot:
+                structure_viewer(
+                    model_key,
+                    lambda: (model_text, model_format, bool(animation), int(1000 / animation[3]) if animation else 0),
+                    scene(style, highlights, surface, bgcolor, spin),
+                    height=600,
+                )
             
-            # Download button
-            st.download_button(
-                label="📥 Download PDB File",
-                data=pdb_data,
-                file_name=f"{pdb_id if pdb_id else 'structure'}.pdb",
-                mime="text/plain"
-            )
+            # Download buttons
+            base_name = pdb_id if pdb_id else 'structure'
+            col1, col2 = viewer_slot.columns(2)
+            with col1:
+                st.download_button(
+                    label=f"📥 Download {file_format.upper()} File",
+                    data=pdb_data,
+                    file_name=f"{base_name}.{file_format}",
+                    mime="application/octet-stream" if file_format == 'bcs' else "text/plain"
+                )
+            with col2:
+                # Trajectories are not re-encoded: that would unpack every frame again
+                if file_format != 'bcs' and traj is None:
+                    compact = binary_structure(digest, file_format, structure)
+                    st.download_button(
+                        label=f"📦 Download Compact Binary (.bcs, {len(compact) / 1e3:,.0f} kB)",
+                        data=compact,
+                        file_name=f"{base_name}.bcs",
+                        mime="application/octet-stream",
+                        help="Columnar binary encoding; loads several times faster than PDB/mmCIF text"
+                    )
 
         except Exception as e:
             st.error(f"❌ Rendering error: {e}")
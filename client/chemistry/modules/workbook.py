@@ -0,0 +1,160 @@
+"""
+Workbook Reader Module
+Shared streaming Excel reader (Data Analyzer, engineering/read_excel.py)
+
+Features:
+- Worksheet listing straight from the workbook index (no sheet is parsed; chart sheets skipped)
+- Read-only, row-streaming parsing of a single sheet or cell range
+- Chunked DataFrames for bounded-memory conversion
+- Content hash for caching parsed sheets
+"""
+
+import hashlib
+import io
+import os
+import zipfile
+import xml.etree.ElementTree as ET
+
+import pandas as pd
+
+# Rows materialized as Python tuples before they are packed into a DataFrame chunk
+DEFAULT_CHUNK_ROWS = 50_000
+
+_SPREADSHEET_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_RELATIONSHIPS_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_PACKAGE_RELATIONSHIPS_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+
+def _open(source):
+    # Paths are opened by the parser itself; bytes and uploads are read from memory
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return source
+
+
+def _is_legacy_xls(source):
+    name = source if isinstance(source, (str, os.PathLike)) else getattr(source, "name", "")
+    return str(name).lower().endswith(".xls")
+
+
+def file_digest(source, block_size=1 << 20):
+    """SHA-256 of a workbook given as a path, bytes or file-like object"""
+    h = hashlib.sha256()
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        h.update(source)
+        return h.hexdigest()
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            for block in iter(lambda: f.read(block_size), b""):
+                h.update(block)
+        return h.hexdigest()
+    source.seek(0)
+    for block in iter(lambda: source.read(block_size), b""):
+        h.update(block)
+    source.seek(0)
+    return h.hexdigest()
+
+
+def list_sheets(source):
+    """
+    Worksheet names in workbook order, read from xl/workbook.xml and its relationships only.
+    Chart sheets (and dialog or macro sheets) have no cells to read and are left out.
+    """
+    if _is_legacy_xls(source):
+        return pd.ExcelFile(_open(source)).sheet_names
+    with zipfile.ZipFile(_open(source)) as archive:
+        root = ET.fromstring(archive.read("xl/workbook.xml"))
+        try:
+            relationships = ET.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+        except KeyError:
+            relationships = None
+    sheets = list(root.iter(f"{_SPREADSHEET_NS}sheet"))
+    if relationships is None:
+        return [sheet.get("name") for sheet in sheets]
+    types = {
+        rel.get("Id"): rel.get("Type", "")
+        for rel in relationships.iter(f"{_PACKAGE_RELATIONSHIPS_NS}Relationship")
+    }
+    return [
+        sheet.get("name") for sheet in sheets
+        if types.get(sheet.get(f"{_RELATIONSHIPS_NS}id"), "").endswith("/worksheet")
+    ]
+
+
+def _column_names(header, width):
+    names, seen = [], {}
+    for i in range(width):
+        value = header[i] if header is not None and i < len(header) else None
+        name = f"Unnamed: {i}" if value is None or value == "" else str(value)
+        # Same de-duplication as pandas: "x", "x.1", "x.2", ...
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def iter_sheet_chunks(source, sheet=None, cell_range=None, header=True, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Stream one sheet as DataFrame chunks of at most chunk_rows rows.
+    The workbook is opened read-only, so only the current chunk of rows is held as
+    Python objects. cell_range is an Excel reference such as "A1:D500" or "B:F".
+    """
+    if _is_legacy_xls(source):
+        # .xls (BIFF) has no streaming reader; fall back to a whole-sheet parse
+        df = pd.read_excel(_open(source), sheet_name=sheet or 0, header=0 if header else None)
+        for start in range(0, len(df), chunk_rows):
+            yield df.iloc[start:start + chunk_rows]
+        return
+
+    from openpyxl import load_workbook
+    from openpyxl.utils import range_boundaries
+
+    workbook = load_workbook(_open(source), read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet] if sheet else workbook.worksheets[0]
+        bounds = {}
+        if cell_range:
+            min_col, min_row, max_col, max_row = range_boundaries(cell_range.upper())
+            bounds = dict(min_row=min_row, max_row=max_row, min_col=min_col, max_col=max_col)
+
+        rows = worksheet.iter_rows(values_only=True, **bounds)
+        header_row = next(rows, None) if header else None
+        names = _column_names(header_row, len(header_row or ()))
+
+        buffer, blank_run, emitted = [], 0, False
+        for row in rows:
+            if all(value is None for value in row):
+                # Interior blank rows are kept (as in pandas); trailing ones are dropped
+                blank_run += 1
+                continue
+            buffer.extend([()] * blank_run)
+            blank_run = 0
+            buffer.append(row)
+            if len(buffer) >= chunk_rows:
+                yield _to_frame(buffer, names, header_row)
+                buffer, emitted = [], True
+        if buffer or not emitted:
+            yield _to_frame(buffer, names, header_row)
+    finally:
+        workbook.close()
+
+
+def _to_frame(rows, names, header_row):
+    width = max([len(names)] + [len(r) for r in rows])
+    if width > len(names):
+        # Rows wider than the header get "Unnamed: i" columns, as in pandas
+        names[:] = _column_names(header_row, width)
+    padded = [tuple(r) + (None,) * (width - len(r)) for r in rows]
+    return pd.DataFrame.from_records(padded, columns=names[:width], coerce_float=True)
+
+
+def read_sheet(source, sheet=None, cell_range=None, header=True):
+    """Whole sheet (or cell range) as one DataFrame, parsed in streamed chunks"""
+    chunks = list(iter_sheet_chunks(source, sheet, cell_range, header))
+    df = chunks[0] if len(chunks) == 1 else pd.concat(chunks, ignore_index=True)
+    return df.infer_objects()
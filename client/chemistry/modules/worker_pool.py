@@ -0,0 +1,39 @@
+"""
+Worker Pool Module
+Process pool shared by the CPU-bound batch computations (bootstrap refits, kinetics and
+spectra fits, solvent-accessible surface)
+
+Features:
+- One pool per app process, started on first use and reused by every session
+- Replaced after a worker dies, shut down when the process exits
+"""
+
+import atexit
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+_pool = None
+_pool_guard = threading.Lock()
+
+
+def parallel_map(func, tasks, chunksize=1):
+    """
+    list(map(func, tasks)) on the shared process pool, so a computation does not pay for
+    starting the workers again
+    """
+    global _pool
+    with _pool_guard:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1)
+            atexit.register(_pool.shutdown)
+        pool = _pool
+    try:
+        return list(pool.map(func, tasks, chunksize=chunksize))
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory): the next call starts a new pool
+        with _pool_guard:
+            if _pool is pool:
+                _pool = None
+        raise
@@ -1,29 +1,397 @@
-import pandas as pd
+"""
+Workbook conversion tool for the engineering part lists
+
+Converts every sheet of every matching workbook to CSV, Parquet and/or text:
+
+    python read_excel.py                                  # "3D Asset/**/*.xlsx" -> excel_data/, text
+    python read_excel.py "data/*.xlsx" -o out -f csv parquet -j 4
+
+- Sheets are streamed in row chunks (never a whole workbook in memory)
+- Workbooks are converted in parallel, one per worker process
+- Incremental: a manifest in the output directory records each workbook's content hash;
+  unchanged workbooks are skipped, and outputs of deleted workbooks are removed
+- Outputs are written to temporary files and renamed, so an interrupted run leaves
+  no half-written sheet and converts that workbook again next time
+"""
+
+import argparse
 import glob
+import importlib.util
+import json
 import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+WORKBOOK_MODULE = os.path.join(HERE, "..", "chemistry", "modules", "workbook.py")
+
+
+def _load_workbook_module():
+    """
+    Shared streaming workbook reader (also used by the chemistry Data Analyzer), loaded from its
+    file: the modules package imports Streamlit, and sys.path is left as it was
+    """
+    spec = importlib.util.spec_from_file_location("chemlab_workbook", WORKBOOK_MODULE)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+_workbook = _load_workbook_module()
+DEFAULT_CHUNK_ROWS = _workbook.DEFAULT_CHUNK_ROWS
+file_digest = _workbook.file_digest
+iter_sheet_chunks = _workbook.iter_sheet_chunks
+list_sheets = _workbook.list_sheets
+DEFAULT_INPUTS = [os.path.join(HERE, "3D Asset", "**", "*.xlsx")]
+DEFAULT_OUTPUT_DIR = os.path.join(HERE, "excel_data")
+
+FORMATS = {"csv": ".csv", "parquet": ".parquet", "text": ".txt"}
+MANIFEST_NAME = "manifest.json"
+MANIFEST_FORMAT = "chemlab-excel-manifest/1"
+
+_UNSAFE_NAME = re.compile(r'[\\/:*?"<>|\x00-\x1f]')
+
+
+def safe_name(name):
+    """Sheet name usable as a file name"""
+    return _UNSAFE_NAME.sub("_", name).strip(" .") or "sheet"
+
+
+def _glob_base(pattern):
+    """Directory part of a glob pattern before its first wildcard"""
+    parts = []
+    for part in os.path.normpath(pattern).split(os.sep):
+        if glob.has_magic(part):
+            break
+        parts.append(part)
+    base = os.sep.join(parts)
+    return base if os.path.isdir(base) else os.path.dirname(base)
+
+
+def find_workbooks(patterns):
+    """
+    {workbook: output stem} for every workbook matching a glob pattern (** recurses), Excel lock
+    files left out. The stem is the path below the directory shared by all the patterns' fixed
+    parts, without extension (kept only where two workbooks would otherwise share a stem),
+    so stems are unique and stay put between runs with the same patterns.
+    """
+    bases = [os.path.abspath(_glob_base(pattern) or ".") for pattern in patterns]
+    root = os.path.commonpath(bases) if bases else os.getcwd()
+    paths = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern, recursive=True)):
+            path = os.path.abspath(path)
+            if os.path.isfile(path) and not os.path.basename(path).startswith("~$") and path not in paths:
+                paths.append(path)
+    stems = {path: os.path.splitext(os.path.relpath(path, root))[0] for path in paths}
+    counts = {}
+    for stem in stems.values():
+        counts[stem] = counts.get(stem, 0) + 1
+    # "parts.xls" next to "parts.xlsx": both keep their extension
+    return {path: os.path.relpath(path, root) if counts[stem] > 1 else stem for path, stem in stems.items()}
+
+
+class _SchemaDrift(Exception):
+    """A column typed from the first chunk holds values of a wider kind in a later one"""
+
+    def __init__(self, column, kind):
+        super().__init__(column)
+        self.column = column
+        self.kind = kind
+
+
+def _is_missing(value):
+    return value is None or value != value
+
+
+def _is_integral(value):
+    return _is_missing(value) or isinstance(value, int) or (isinstance(value, float) and value.is_integer())
+
+
+def _is_number(value):
+    return _is_missing(value) or isinstance(value, (int, float))
+
+
+def _integral(column):
+    """Every value of the column is a whole number or blank"""
+    if column.dtype.kind in "biu":
+        return True
+    if column.dtype.kind == "f":
+        # Blanks make a whole-number column float64; inf % 1 is NaN, so it is not integral
+        return bool((column.dropna() % 1 == 0).all())
+    return column.dtype.kind == "O" and bool(column.map(_is_integral).all())
+
+
+def _numeric(column):
+    return column.dtype.kind in "biuf" or (column.dtype.kind == "O" and bool(column.map(_is_number).all()))
+
 
-def process_excel():
-    files = glob.glob('c:/Users/sgko1/Desktop/doodle/simvex/client/engineering/3D Asset/*.xlsx')
-    if not files:
+# Column kinds, narrowest first; a drifting column is widened to the next kind that holds it
+_KIND_TYPES = {"integer": "int64", "number": "float64", "text": "string"}
+
+
+class _SheetWriter:
+    """Streams DataFrame chunks of one sheet into one output file"""
+
+    def __init__(self, path, fmt, kinds=None):
+        self.path = path
+        self.fmt = fmt
+        self.kinds = dict(kinds or {})
+        self.partial = path + ".part"
+        self._file = None
+        self._parquet = None
+        self._columns = None
+        self._widths = None
+
+    def _kind(self, name, column):
+        if name in self.kinds:
+            return self.kinds[name]
+        if len(column) == 0:
+            return "text"
+        if _integral(column):
+            return "integer"
+        return "number" if _numeric(column) else "text"
+
+    def _typed(self, df):
+        """
+        The chunk with the column kinds fixed by the first chunk: integers as nullable Int64,
+        numbers as float64, the rest as str (blanks as None), so every format and every chunk
+        size writes a column the same way
+        """
+        if self._columns is None:
+            self._columns = {name: self._kind(name, df[name]) for name in df.columns}
+        df = df.reindex(columns=list(self._columns))
+        for name, kind in self._columns.items():
+            column = df[name]
+            if kind == "integer":
+                if not _integral(column):
+                    raise _SchemaDrift(name, "number" if _numeric(column) else "text")
+                if column.dtype.kind == "O":
+                    column = column.map(lambda value: None if _is_missing(value) else int(value))
+                df[name] = column.astype("Int64")
+            elif kind == "number":
+                if not _numeric(column):
+                    raise _SchemaDrift(name, "text")
+                df[name] = column.astype("float64")
+            else:
+                df[name] = column.map(lambda value: None if _is_missing(value) else str(value))
+        return df
+
+    def write(self, df, first):
+        df = self._typed(df)
+        if self.fmt == "parquet":
+            self._write_parquet(df)
+            return
+        if self._file is None:
+            self._file = open(self.partial, "w", encoding="utf-8", newline="")
+        if self.fmt == "csv":
+            df.to_csv(self._file, header=first, index=False)
+        else:
+            self._write_text(df, first)
+
+    def _write_text(self, df, first):
+        # Cells go to a scratch file as JSON rows; close() pads them to the widest cell of each column
+        # in the whole sheet, so the layout does not depend on the chunk size
+        # Blank cells are written the same way (empty) whatever the column kind
+        cells = [
+            ["" if blank else str(value) for value, blank in zip(df[name].astype(object), df[name].isna())]
+            for name in df.columns
+        ]
+        rows = ([[str(name) for name in df.columns]] if first else []) + [list(row) for row in zip(*cells)]
+        if self._widths is None:
+            self._widths = [0] * len(df.columns)
+        for row in rows:
+            self._widths = [max(width, len(cell)) for width, cell in zip(self._widths, row)]
+            self._file.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+    def _pad_text(self):
+        with open(self.partial, encoding="utf-8") as scratch, \
+                open(self.partial + ".txt", "w", encoding="utf-8", newline="") as out:
+            for line in scratch:
+                out.write(" ".join(cell.rjust(width) for cell, width in zip(json.loads(line), self._widths)) + "\n")
+        os.replace(self.partial + ".txt", self.partial)
+
+    def _write_parquet(self, df):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self._parquet is None:
+            schema = pa.schema([(name, pa.type_for_alias(_KIND_TYPES[kind])) for name, kind in self._columns.items()])
+            self._parquet = pq.ParquetWriter(self.partial, schema)
+        self._parquet.write_table(pa.Table.from_pandas(df, schema=self._parquet.schema, preserve_index=False))
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            if self.fmt == "text":
+                self._pad_text()
+        if self._parquet is not None:
+            self._parquet.close()
+        os.replace(self.partial, self.path)
+
+    def abort(self):
+        for handle in (self._file, self._parquet):
+            if handle is not None:
+                handle.close()
+        for partial in (self.partial, self.partial + ".txt"):
+            if os.path.exists(partial):
+                os.remove(partial)
+
+
+def convert_workbook(path, stem, output_dir, formats, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Convert every sheet of one workbook (run in a worker process).
+    Returns {"outputs": [relative paths], "sheets": n, "rows": n}.
+    """
+    outputs, rows = [], 0
+    sheets = list_sheets(path)
+    for sheet in sheets:
+        target = os.path.join(output_dir, stem, safe_name(sheet))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        kinds = {}
+        while True:
+            writers = [_SheetWriter(target + FORMATS[fmt], fmt, kinds) for fmt in formats]
+            sheet_rows = 0
+            try:
+                for i, df in enumerate(iter_sheet_chunks(path, sheet, chunk_rows=chunk_rows)):
+                    sheet_rows += len(df)
+                    for writer in writers:
+                        writer.write(df, first=(i == 0))
+            except _SchemaDrift as drift:
+                # Rare (an integer column gaining fractions, or a numeric one text, after the first chunk):
+                # stream the sheet again with that column widened, rather than dropping its values
+                for writer in writers:
+                    writer.abort()
+                kinds[drift.column] = drift.kind
+                continue
+            except BaseException:
+                for writer in writers:
+                    writer.abort()
+                raise
+            break
+        for writer in writers:
+            writer.close()
+            outputs.append(os.path.relpath(writer.path, output_dir))
+        rows += sheet_rows
+    return {"outputs": outputs, "sheets": len(sheets), "rows": rows}
+
+
+def load_manifest(output_dir):
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("format") == MANIFEST_FORMAT:
+            return manifest
+    return {"format": MANIFEST_FORMAT, "workbooks": {}}
+
+
+def save_manifest(output_dir, manifest):
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    with open(path + ".part", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, ensure_ascii=False)
+    os.replace(path + ".part", path)
+
+
+def _remove_outputs(output_dir, outputs):
+    for relative in outputs:
+        path = os.path.join(output_dir, relative)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _up_to_date(entry, digest, stem, formats, output_dir):
+    return (
+        entry is not None
+        and entry["digest"] == digest
+        and entry.get("stem") == stem
+        and set(formats) <= set(entry["formats"])
+        and all(os.path.exists(os.path.join(output_dir, relative)) for relative in entry["outputs"])
+    )
+
+
+def convert(patterns=None, output_dir=DEFAULT_OUTPUT_DIR, formats=("text",), workers=None, force=False,
+            chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Convert changed workbooks; returns (converted, unchanged, failed) counts"""
+    output_dir = os.path.abspath(output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    stems = find_workbooks(patterns or DEFAULT_INPUTS)
+    workbooks = sorted(stems)
+    manifest = load_manifest(output_dir)
+    entries = manifest["workbooks"]
+
+    # Outputs of workbooks that no longer exist
+    for path in [path for path in entries if not os.path.exists(path)]:
+        _remove_outputs(output_dir, entries.pop(path)["outputs"])
+        print(f"Removed outputs of deleted {path}")
+
+    pending, unchanged = {}, 0
+    for path in workbooks:
+        digest = file_digest(path)
+        if not force and _up_to_date(entries.get(path), digest, stems[path], formats, output_dir):
+            unchanged += 1
+            print(f"Unchanged: {os.path.relpath(path)}")
+        else:
+            pending[path] = digest
+    if not workbooks:
         print("No Excel files found.")
-        return
-    
-    # Sort by modification time to get the latest one
-    files.sort(key=os.path.getmtime, reverse=True)
-    f = files[0]
-    print(f"Processing: {f}")
-    
-    try:
-        df_dict = pd.read_excel(f, sheet_name=None)
-        output = 'c:/Users/sgko1/Desktop/doodle/simvex/client/engineering/excel_data.txt'
-        with open(output, 'w', encoding='utf-8') as out:
-            for sheet_name, df in df_dict.items():
-                out.write(f"Sheet: {sheet_name}\n")
-                out.write(df.to_string())
-                out.write("\n\n")
-        print(f"Successfully wrote to {output}")
-    except Exception as e:
-        print(f"Error: {e}")
+
+    converted = failed = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(convert_workbook, path, stems[path], output_dir, list(formats), chunk_rows): path
+            for path in pending
+        }
+        started = time.perf_counter()
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"Error: {os.path.relpath(path)}: {e}")
+                continue
+            previous = entries.get(path)
+            if previous:
+                # Sheets renamed or removed since the last run
+                _remove_outputs(output_dir, set(previous["outputs"]) - set(result["outputs"]))
+            entries[path] = {
+                "digest": pending[path],
+                "stem": stems[path],
+                "formats": list(formats),
+                "outputs": result["outputs"],
+                "converted_at": time.time(),
+            }
+            # Saved after every workbook, so an interrupted run keeps what it finished
+            save_manifest(output_dir, manifest)
+            converted += 1
+            print(f"Converted: {os.path.relpath(path)} ({result['sheets']} sheets, {result['rows']} rows, "
+                  f"{time.perf_counter() - started:.1f}s elapsed)")
+    save_manifest(output_dir, manifest)
+    return converted, unchanged, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert Excel workbooks to CSV, Parquet or text, skipping unchanged ones.")
+    parser.add_argument("inputs", nargs="*", help="glob patterns of workbooks (default: '3D Asset/**/*.xlsx')")
+    parser.add_argument("-o", "--output-dir", default=DEFAULT_OUTPUT_DIR, help="output directory (default: excel_data/)")
+    parser.add_argument("-f", "--formats", nargs="+", choices=list(FORMATS), default=["text"], help="output formats")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="convert every workbook, changed or not")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS, help="rows streamed per chunk")
+    args = parser.parse_args(argv)
+    if "parquet" in args.formats and importlib.util.find_spec("pyarrow") is None:
+        parser.error("Parquet output needs pyarrow (pip install pyarrow)")
+
+    converted, unchanged, failed = convert(
+        args.inputs, args.output_dir, args.formats, args.workers, args.force, args.chunk_rows
+    )
+    print(f"{converted} converted, {unchanged} unchanged, {failed} failed -> {os.path.abspath(args.output_dir)}")
+    return 1 if failed else 0
+
 
 if __name__ == '__main__':
-    process_excel()
+    sys.exit(main())